@@ -0,0 +1,209 @@
+import io
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from collections import namedtuple
+from pathlib import Path, PurePosixPath
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# While indexing a compressed tar, small members are kept in memory so they
+# never have to be decompressed again (ExpDetails and daily value files are tiny)
+SMALL_MEMBER_BYTES = 1024 * 1024
+SMALL_MEMBERS_TOTAL_BYTES = 64 * 1024 * 1024
+
+MemberStat = namedtuple("MemberStat", ["st_size", "st_mtime_ns"])
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def is_archive(path):
+    name = str(path).lower()
+    return name.endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+class Archive:
+    """Read-only index of a zip or tar archive.
+
+    Zip files are read through their central directory, so every member can
+    be opened directly. Tar members are indexed once; for uncompressed tars
+    members are then read by seeking to their offset. Compressed tars cannot
+    be seeked cheaply, so small members are kept from the indexing pass.
+    Nothing is ever extracted to disk.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        st = self.path.stat()
+        self.mtime_ns = st.st_mtime_ns
+        self._lock = threading.Lock()
+        self._small = {}
+        self.children = {"": (set(), set())}
+        self.sizes = {}
+
+        if zipfile.is_zipfile(self.path):
+            self._zip = zipfile.ZipFile(self.path)
+            self._tar = None
+            for info in self._zip.infolist():
+                self._add(info.filename, info.is_dir(), info.file_size)
+        else:
+            self._zip = None
+            self._tar = tarfile.open(self.path)
+            compressed = not str(self.path).lower().endswith(".tar")
+            self._tar_members = {}
+            kept = 0
+            for info in self._tar:
+                name = info.name
+                self._add(name, info.isdir(), info.size)
+                if info.isfile():
+                    self._tar_members[name.strip("/")] = info
+                    if compressed and info.size <= SMALL_MEMBER_BYTES and kept < SMALL_MEMBERS_TOTAL_BYTES:
+                        self._small[name.strip("/")] = self._tar.extractfile(info).read()
+                        kept += info.size
+
+    def _add(self, name, is_dir, size):
+        name = name.strip("/")
+        if not name:
+            return
+        parts = PurePosixPath(name).parts
+        for i in range(len(parts)):
+            parent = "/".join(parts[:i])
+            child = parts[i]
+            dirs, files = self.children.setdefault(parent, (set(), set()))
+            if i < len(parts) - 1 or is_dir:
+                dirs.add(child)
+                self.children.setdefault("/".join(parts[:i + 1]), (set(), set()))
+            else:
+                files.add(child)
+        if not is_dir:
+            self.sizes[name] = size
+
+    def read(self, member):
+        if member in self._small:
+            return self._small[member]
+        with self._lock:
+            if self._zip is not None:
+                return self._zip.read(member)
+            if member not in self._tar_members:
+                raise FileNotFoundError(f"{member} not found in {self.path.name}")
+            return self._tar.extractfile(self._tar_members[member]).read()
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+
+
+def open_archive(path):
+    """Return the (cached) Archive index for a file, re-indexing it if it changed."""
+    key = os.path.abspath(path)
+    mtime_ns = os.stat(key).st_mtime_ns
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None or archive.mtime_ns != mtime_ns:
+            if archive is not None:
+                archive.close()
+            archive = _archives[key] = Archive(key)
+        return archive
+
+
+class ArchivePath:
+    """A pathlib-like handle to a folder or file inside an archive.
+
+    Supports the subset of Path used by the loaders: name, suffix, parent,
+    '/', exists, is_dir, stat, open, read_bytes and read_text.
+    """
+
+    __slots__ = ("archive_path", "member")
+
+    def __init__(self, archive_path, member=""):
+        self.archive_path = Path(archive_path)
+        self.member = str(member).strip("/")
+
+    @property
+    def archive(self):
+        return open_archive(self.archive_path)
+
+    @property
+    def name(self):
+        return posixpath.basename(self.member) if self.member else self.archive_path.name
+
+    @property
+    def suffix(self):
+        return PurePosixPath(self.name).suffix
+
+    @property
+    def parent(self):
+        return ArchivePath(self.archive_path, posixpath.dirname(self.member))
+
+    def __truediv__(self, other):
+        return ArchivePath(self.archive_path, posixpath.join(self.member, str(other)))
+
+    def __str__(self):
+        return str(self.archive_path / self.member) if self.member else str(self.archive_path)
+
+    def __repr__(self):
+        return f"ArchivePath({str(self.archive_path)!r}, {self.member!r})"
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ArchivePath)
+            and self.archive_path == other.archive_path
+            and self.member == other.member
+        )
+
+    def __lt__(self, other):
+        return (str(self.archive_path), self.member) < (str(other.archive_path), other.member)
+
+    def __hash__(self):
+        return hash((self.archive_path, self.member))
+
+    def is_dir(self):
+        return self.member in self.archive.children
+
+    def exists(self):
+        return self.is_dir() or self.member in self.archive.sizes
+
+    def listing(self):
+        """(dirs, files) name tuples of this folder."""
+        if not self.is_dir():
+            raise FileNotFoundError(f"No folder {self.member!r} in {self.archive_path.name}")
+        dirs, files = self.archive.children[self.member]
+        return tuple(sorted(dirs)), tuple(sorted(files))
+
+    def stat(self):
+        archive = self.archive
+        return MemberStat(archive.sizes.get(self.member, 0), archive.mtime_ns)
+
+    def read_bytes(self):
+        return self.archive.read(self.member)
+
+    def read_text(self, encoding="utf-8"):
+        return self.read_bytes().decode(encoding)
+
+    def open(self, mode="r", encoding="utf-8"):
+        data = self.read_bytes()
+        if "b" in mode:
+            return io.BytesIO(data)
+        return io.StringIO(data.decode(encoding))
+
+
+def as_source_path(path):
+    """Turn a path that may point into an archive into a Path or ArchivePath.
+
+    'cohort.zip' and 'cohort.zip/IP75' both resolve to ArchivePaths.
+    """
+    if isinstance(path, ArchivePath):
+        return path
+    path = Path(path)
+    for i in range(len(path.parts), 0, -1):
+        prefix = Path(*path.parts[:i])
+        if is_archive(prefix):
+            return ArchivePath(prefix, "/".join(path.parts[i:]))
+        if prefix.exists():
+            break
+    return path
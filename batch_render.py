@@ -0,0 +1,180 @@
+import argparse
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+
+from cache import LRUCache, content_hash
+from data_loader import find_animal_folders, find_day_folders
+from external_values import ROLLING_WINDOW, load_daily_values_files
+from plotter import external_figure, weights_figure
+from sessions import SessionTable
+
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+
+DEFAULT_OPTION_SETS = (
+    {"show_regression": False, "mark_outliers": False, "z_thresh": 3.0},
+    {"show_regression": True, "mark_outliers": True, "z_thresh": 3.0},
+)
+
+
+def option_set_tag(options):
+    """Short file name tag for one set of plot options, e.g. 'reg_outliers3.0'."""
+    parts = []
+    if options.get("show_regression"):
+        method = options.get("regression", "linear")
+        parts.append("reg" if method == "linear" else f"reg_{method}")
+    if options.get("mark_outliers"):
+        parts.append(f"outliers{options.get('z_thresh', 3.0)}")
+        if options.get("outlier_method") == "rolling":
+            parts.append(f"rolling{options.get('window', ROLLING_WINDOW)}")
+    return "_".join(parts) or "plain"
+
+
+def _save_figure(draw, output_dir, stem, formats, cache=None, key_parts=()):
+    """Write one figure in every format, reusing cached renders when possible.
+
+    draw is only called when at least one format is not in the cache.
+    """
+    fig = None
+    paths = []
+    for fmt in formats:
+        key = content_hash("figure", stem, *key_parts, fmt=fmt)
+        data = cache.get(key) if cache is not None else None
+        if data is None:
+            if fig is None:
+                # Figures are built without pyplot, so no global state is involved
+                fig = draw()
+                fig.tight_layout()
+            buf = io.BytesIO()
+            fig.savefig(buf, format=fmt)
+            data = buf.getvalue()
+            if cache is not None:
+                cache.put(key, data, persist=True)
+
+        path = Path(output_dir) / f"{stem}.{fmt}"
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+def _weights_figure(animal, table):
+    fig = weights_figure(table)
+    fig.axes[0].set_title(f"{animal} - Mouse Weight Over Time")
+    return fig
+
+
+def _external_figure(animal, table, values, options):
+    fig, _ = external_figure(table, values, **options)
+    fig.axes[0].set_title(f"{animal} - Weight vs External Value")
+    return fig
+
+
+def render_animal(animal_folder, output_dir, formats=("png",), daily_filename=None,
+                  option_sets=DEFAULT_OPTION_SETS, cache_dir=None):
+    """Render the figures of one animal to image files.
+
+    Args:
+        animal_folder: Folder containing the animal's day folders
+        output_dir: Folder the image files are written to
+        formats: Image formats understood by savefig, e.g. ("png", "svg")
+        daily_filename: Name of the per-day external values file. When None,
+            only the weight vs days figure is rendered.
+        option_sets: Dicts of plot_weight_vs_external options, one figure each
+        cache_dir: Optional folder of rendered figures keyed by a hash of the
+            data and options; unchanged figures are copied instead of rendered
+
+    Returns:
+        List of written file paths
+    """
+    animal_folder = Path(animal_folder)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    animal = animal_folder.name
+    cache = LRUCache(max_bytes=FIGURE_CACHE_BYTES, spill_dir=cache_dir) if cache_dir else None
+
+    table = SessionTable.from_day_folders(find_day_folders(animal_folder), animal)
+
+    paths = _save_figure(
+        lambda: _weights_figure(animal, table),
+        output_dir, f"{animal}_weight_vs_days", formats,
+        cache, (table.weights, table.dates)
+    )
+
+    if daily_filename:
+        values = np.asarray(load_daily_values_files(table, daily_filename), dtype=float)
+        for options in option_sets:
+            stem = f"{animal}_weight_vs_external_{option_set_tag(options)}"
+            paths.extend(_save_figure(
+                lambda: _external_figure(animal, table, values, options),
+                output_dir, stem, formats,
+                cache, (table.weights, values, options)
+            ))
+
+    return paths
+
+
+def init_worker():
+    """Process pool initializer: render without a display."""
+    matplotlib.use("Agg")
+
+
+def render_cohort(cohort_path, output_dir, formats=("png",), daily_filename=None,
+                  option_sets=DEFAULT_OPTION_SETS, max_workers=None, cache_dir=None):
+    """Render the figures of every animal in a cohort using a process pool.
+
+    An animal that fails (e.g. a day without BW) is reported and the other
+    animals are still rendered.
+
+    Returns:
+        (results, failures): dict mapping animal names to lists of written
+        file paths, and dict mapping the failed animals to their error message
+    """
+    animals = find_animal_folders(cohort_path)
+    max_workers = max_workers or min(len(animals), os.cpu_count() or 1)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as pool:
+        futures = {
+            animal.name: pool.submit(
+                render_animal, animal, output_dir, tuple(formats),
+                daily_filename, tuple(option_sets), cache_dir
+            )
+            for animal in animals
+        }
+        results, failures = {}, {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                failures[name] = str(e)
+        return results, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render weight figures for every animal of a cohort."
+    )
+    parser.add_argument("cohort", help="Folder containing one folder per animal")
+    parser.add_argument("output", help="Folder the figures are written to")
+    parser.add_argument("--formats", nargs="+", default=["png"], help="e.g. png svg")
+    parser.add_argument("--daily-file", help="Per-day external values file name")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", help="Reuse figures rendered in earlier runs")
+    args = parser.parse_args(argv)
+
+    results, failures = render_cohort(
+        args.cohort, args.output, formats=args.formats,
+        daily_filename=args.daily_file, max_workers=args.workers,
+        cache_dir=args.cache_dir
+    )
+    for animal, paths in results.items():
+        print(f"{animal}: {len(paths)} files")
+    for animal, message in failures.items():
+        print(f"{animal}: failed ({message})")
+
+
+if __name__ == "__main__":
+    main()
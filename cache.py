@@ -0,0 +1,189 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def content_hash(*parts, **options):
+    """Hash arrays, strings, numbers and nested sequences plus keyword options.
+
+    Arrays are hashed by dtype, shape and raw bytes, so equal data gives equal
+    keys no matter where it came from.
+    """
+    h = hashlib.blake2b(digest_size=20)
+
+    def feed(obj):
+        if isinstance(obj, np.ndarray):
+            if obj.dtype == object:
+                feed(obj.tolist())
+                return
+            h.update(f"nd{obj.dtype.str}{obj.shape}".encode())
+            h.update(np.ascontiguousarray(obj).tobytes())
+        elif isinstance(obj, (list, tuple)):
+            h.update(f"seq{len(obj)}(".encode())
+            for item in obj:
+                feed(item)
+            h.update(b")")
+        elif isinstance(obj, dict):
+            feed(sorted(obj.items(), key=lambda kv: str(kv[0])))
+        elif isinstance(obj, bytes):
+            h.update(b"b" + len(obj).to_bytes(8, "little") + obj)
+        else:
+            h.update(f"{type(obj).__name__}:{obj!r};".encode())
+
+    feed(parts)
+    feed(options)
+    return h.hexdigest()
+
+
+def file_fingerprint(paths):
+    """(path, size, mtime_ns) tuples identifying the current version of files."""
+    out = []
+    for path in paths:
+        # Path and ArchivePath objects provide stat(); plain strings use os.stat
+        st = path.stat() if hasattr(path, "stat") else os.stat(path)
+        out.append((str(path), st.st_size, st.st_mtime_ns))
+    return out
+
+
+def _sizeof(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class LRUCache:
+    """In-memory LRU cache with a memory cap and an optional disk spill folder.
+
+    Entries evicted from memory are pickled to spill_dir (when given) and are
+    read back on the next miss. put(..., persist=True) writes through to disk
+    right away, so the disk tier can be shared between processes or runs.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or bool(self.spill_dir and self._spill_path(key).exists())
+
+    def _spill_path(self, key):
+        return self.spill_dir / f"{key}.pkl"
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        if self.spill_dir:
+            path = self._spill_path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.PickleError, EOFError):
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                self._insert(key, value, spill=False)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value, persist=False):
+        self._insert(key, value, spill=True)
+        if persist:
+            self._spill(key, value)
+
+    def _insert(self, key, value, spill):
+        size = _sizeof(value)
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                old_key, (old_value, old_size) = self._entries.popitem(last=False)
+                self.current_bytes -= old_size
+                evicted.append((old_key, old_value))
+
+        if self.spill_dir and spill and size > self.max_bytes:
+            evicted.append((key, value))
+        for old_key, old_value in evicted:
+            self._spill(old_key, old_value)
+
+    def _spill(self, key, value):
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        if path.exists():
+            return
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except (OSError, pickle.PickleError, TypeError, AttributeError):
+            tmp.unlink(missing_ok=True)
+
+    def get_or_compute(self, key, compute):
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+        }
+
+    def summary(self):
+        """Short human-readable description of the counters."""
+        hits = self.hits + self.disk_hits
+        return (
+            f"Cache: {hits} hits, {self.misses} misses, "
+            f"{len(self._entries)} entries ({self.current_bytes / 1e6:.1f} MB)"
+        )
+
+
+# Shared cache for loaded data and computed statistics
+default_cache = LRUCache()
@@ -0,0 +1,370 @@
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+from scipy.fft import irfft, next_fast_len, rfft
+from scipy.stats import false_discovery_control, t as t_dist
+
+from exporters import write_delimited
+from plotter import new_figure
+from external_values import to_datetime64
+from sessions import SessionTable, as_weights_and_dates
+
+WEIGHT_NAME = "Weight (%)"
+FDR_ALPHA = 0.05
+
+# Larger matrices are drawn without the value in every cell
+MAX_ANNOTATED = 20
+
+CORRELATION_HEADER = ("variable_a", "variable_b", "n", "r", "p", "q")
+
+# Default lag range of the lagged correlation, in calendar days either way
+MAX_LAG = 7
+
+
+def pearson_p(r, n):
+    """Two-sided p-values of Pearson r computed from n pairs (t-test, n - 2 dof)."""
+    r = np.asarray(r, dtype=float)
+    df = np.asarray(n, dtype=float) - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = r * np.sqrt(df / (1.0 - r ** 2))
+        p = 2 * t_dist.sf(np.abs(t), df)
+    p = np.where(np.abs(r) == 1.0, 0.0, p)
+    return np.where(np.isnan(r), np.nan, p)
+
+
+def pearson_matrix(data):
+    """Pearson r, p-value and sample size of every pair of columns at once.
+
+    Every pair uses the rows where both of its columns are finite
+    (pairwise-complete), so a variable that is missing on some days does
+    not remove those days from the other pairs. All sums are matrix
+    products over the validity masks, so the whole matrix is computed in
+    one pass without a loop over pairs.
+
+    Args:
+        data: Array of shape (n_days, n_variables)
+
+    Returns:
+        (r, p, n): arrays of shape (n_variables, n_variables); r and p are
+        NaN for pairs with fewer than 3 shared days or a constant column
+    """
+    data = np.asarray(data, dtype=float)
+    if data.ndim != 2:
+        raise ValueError("Expected a 2D array with one column per variable")
+
+    valid = np.isfinite(data)
+    mask = valid.astype(float)
+    # Centring first keeps the sums of squares accurate for large offsets
+    counts = valid.sum(axis=0)
+    means = np.where(valid, data, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    x = np.where(valid, data - means, 0.0)
+
+    n = mask.T @ mask
+    sx = x.T @ mask            # sum of column i over the rows where column j is valid
+    sxx = (x * x).T @ mask
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx ** 2 / n
+        var_j = var_i.T
+        r = cov / np.sqrt(var_i * var_j)
+        r = np.clip(r, -1.0, 1.0)
+        r[(n < 3) | (var_i <= 0) | (var_j <= 0)] = np.nan
+    p = pearson_p(r, n)
+    np.fill_diagonal(r, np.where(counts >= 3, 1.0, np.nan))
+    np.fill_diagonal(p, np.nan)
+    return r, p, n.astype(int)
+
+
+def fdr_bh(p_values):
+    """Benjamini-Hochberg adjusted p-values (q-values); NaN entries are skipped."""
+    p_values = np.asarray(p_values, dtype=float)
+    q = np.full(p_values.shape, np.nan)
+    finite = np.isfinite(p_values)
+    if finite.any():
+        q[finite] = false_discovery_control(p_values[finite], method="bh")
+    return q
+
+
+class CorrelationMatrix:
+    """Correlations between the weight and several external variables.
+
+    r, p, q (Benjamini-Hochberg adjusted p) and n are square arrays in the
+    order of names, with the weight first. The FDR correction is applied
+    over the distinct pairs (upper triangle), i.e. every test shown once.
+    """
+
+    def __init__(self, names, r, p, n):
+        self.names = tuple(names)
+        self.r = r
+        self.p = p
+        self.n = n
+        upper = np.triu_indices(len(self.names), 1)
+        self.q = np.full(p.shape, np.nan)
+        self.q[upper] = fdr_bh(p[upper])
+        self.q.T[upper] = self.q[upper]
+
+    def significant(self, alpha=FDR_ALPHA):
+        """Boolean matrix of pairs with q < alpha."""
+        return np.nan_to_num(self.q, nan=1.0) < alpha
+
+    def rows(self):
+        """Yield (variable_a, variable_b, n, r, p, q) for every distinct pair."""
+        for i, j in zip(*np.triu_indices(len(self.names), 1)):
+            yield (
+                self.names[i], self.names[j], int(self.n[i, j]),
+                float(self.r[i, j]), float(self.p[i, j]), float(self.q[i, j])
+            )
+
+
+def correlate_variables(weights, values, names):
+    """Correlate the weight and every external variable with each other.
+
+    Args:
+        weights: Weights, or a SessionTable
+        values: Array of shape (n_days, n_variables), days in the order of
+            the weights
+        names: Name of every variable
+
+    Returns:
+        CorrelationMatrix with the weight as the first variable
+    """
+    weights, _ = as_weights_and_dates(weights)
+    weights = np.asarray(weights, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    if len(values) != len(weights):
+        raise ValueError(
+            f"Got {len(weights)} days but {len(values)} rows of external values"
+        )
+    if values.shape[1] != len(names):
+        raise ValueError(f"Got {values.shape[1]} variables but {len(names)} names")
+
+    r, p, n = pearson_matrix(np.column_stack([weights, values]))
+    return CorrelationMatrix((WEIGHT_NAME,) + tuple(names), r, p, n)
+
+
+def calendar_grid(values, dates, codes, n_rows):
+    """Place values on a (n_rows, n_days) grid of consecutive calendar days.
+
+    Days without a session are NaN, so positions along a row are real day
+    offsets. If a row has several values on one day the last one is used.
+
+    Returns:
+        (grid, first_date)
+    """
+    dates = to_datetime64(dates)
+    first = dates.min()
+    n_days = int((dates.max() - first).astype(int)) + 1
+    grid = np.full((n_rows, n_days), np.nan)
+    grid[codes, (dates - first).astype(int)] = values
+    return grid, first
+
+
+def _lagged_sums(a, b, max_lag, n_fft):
+    """sum over rows and t of a[row, t] * b[row, t + lag] for every lag in -max_lag..max_lag.
+
+    Computed as a cross-correlation through the FFT; rows are summed in the
+    frequency domain, so there is one inverse transform for all animals.
+    """
+    spectrum = (np.conj(rfft(a, n_fft, axis=1)) * rfft(b, n_fft, axis=1)).sum(axis=0)
+    circular = irfft(spectrum, n_fft)
+    # Negative lags wrap around to the end; n_fft leaves enough zero padding
+    return np.concatenate([circular[n_fft - max_lag:], circular[:max_lag + 1]])
+
+
+class LaggedCorrelation:
+    """Pearson r between the weight and external values shifted by whole days.
+
+    A positive lag pairs the weight of day t with the value of day t + lag,
+    i.e. the external value follows the weight.
+    """
+
+    def __init__(self, lags, r, n):
+        self.lags = lags
+        self.r = r
+        self.n = n
+        self.p = pearson_p(r, n)
+
+    @property
+    def best_lag(self):
+        """Lag with the strongest correlation (largest |r|), or None."""
+        if not np.isfinite(self.r).any():
+            return None
+        return int(self.lags[np.nanargmax(np.abs(self.r))])
+
+    def at(self, lag):
+        """(r, p, n) of one lag."""
+        i = int(np.flatnonzero(self.lags == lag)[0])
+        return float(self.r[i]), float(self.p[i]), int(self.n[i])
+
+
+def lagged_correlation(weights, values, dates=None, max_lag=MAX_LAG, animal_codes=None):
+    """Correlate weight and external values over a range of calendar-day lags.
+
+    Sessions are placed on a calendar grid per animal, so a lag of one day
+    pairs sessions that are one calendar day apart; gaps (weekends, failed
+    days) are never bridged by shifting array positions. For every lag,
+    r is the Pearson correlation over all pairs where both values exist,
+    pooled over animals. The sums behind r are computed for all lags at
+    once through FFT cross-correlations, so the cost grows with
+    n log n of the number of days rather than with days x lags.
+
+    Args:
+        weights: Weights, or a SessionTable (which also gives the dates and
+            the animal of every session)
+        values: External value of every session
+        dates: Dates of the sessions (taken from the table if omitted)
+        max_lag: Lags from -max_lag to +max_lag days are computed
+        animal_codes: Animal index of every session, so days of different
+            animals are never paired (taken from the table if omitted)
+
+    Returns:
+        LaggedCorrelation
+    """
+    if animal_codes is None and isinstance(weights, SessionTable):
+        animal_codes = weights.animal_codes
+    weights, dates = as_weights_and_dates(weights, dates)
+    if dates is None:
+        raise ValueError("Lagged correlation needs the date of every session")
+    weights = np.asarray(weights, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(values) != len(weights) or len(dates) != len(weights):
+        raise ValueError(
+            f"Got {len(weights)} weights, {len(values)} values and {len(dates)} dates"
+        )
+    max_lag = int(max_lag)
+    if max_lag < 0:
+        raise ValueError("max_lag must not be negative")
+
+    lags = np.arange(-max_lag, max_lag + 1)
+    if not len(weights):
+        return LaggedCorrelation(lags, np.full(len(lags), np.nan), np.zeros(len(lags), dtype=int))
+
+    codes = np.zeros(len(weights), dtype=int) if animal_codes is None else np.asarray(animal_codes)
+    n_rows = int(codes.max()) + 1
+    x, _ = calendar_grid(weights, dates, codes, n_rows)
+    y, _ = calendar_grid(values, dates, codes, n_rows)
+
+    valid_x = np.isfinite(x)
+    valid_y = np.isfinite(y)
+    mx = valid_x.astype(float)
+    my = valid_y.astype(float)
+    # Centring first keeps the sums of squares accurate
+    x = np.where(valid_x, x - (x[valid_x].mean() if valid_x.any() else 0.0), 0.0)
+    y = np.where(valid_y, y - (y[valid_y].mean() if valid_y.any() else 0.0), 0.0)
+
+    n_fft = next_fast_len(x.shape[1] + max_lag + 1, real=True)
+    n = np.rint(_lagged_sums(mx, my, max_lag, n_fft))
+    sx = _lagged_sums(x, my, max_lag, n_fft)
+    sy = _lagged_sums(mx, y, max_lag, n_fft)
+    sxx = _lagged_sums(x * x, my, max_lag, n_fft)
+    syy = _lagged_sums(mx, y * y, max_lag, n_fft)
+    sxy = _lagged_sums(x, y, max_lag, n_fft)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_x = sxx - sx ** 2 / n
+        var_y = syy - sy ** 2 / n
+        r = (sxy - sx * sy / n) / np.sqrt(var_x * var_y)
+    # FFT round-off leaves tiny non-zero variances where there is no variance
+    flat_x = var_x <= 1e-10 * np.abs(sxx).max()
+    flat_y = var_y <= 1e-10 * np.abs(syy).max()
+    r[(n < 3) | flat_x | flat_y] = np.nan
+    return LaggedCorrelation(lags, np.clip(r, -1.0, 1.0), n.astype(int))
+
+
+def export_correlations(result, out_path, delimiter=None):
+    """Write the pairs of a CorrelationMatrix to a CSV/TSV table.
+
+    Returns:
+        Number of pairs written
+    """
+    return write_delimited(out_path, result.rows(), CORRELATION_HEADER, delimiter)
+
+
+def draw_correlation_matrix(ax, result, alpha=FDR_ALPHA, cmap="RdBu_r"):
+    """Draw r as a colored matrix; '*' marks pairs with FDR q < alpha.
+
+    Returns:
+        The AxesImage
+    """
+    k = len(result.names)
+    image = ax.imshow(
+        np.ma.masked_invalid(result.r),
+        cmap=matplotlib.colormaps[cmap].with_extremes(bad="lightgray"),
+        vmin=-1, vmax=1
+    )
+    ax.set_xticks(np.arange(k))
+    ax.set_yticks(np.arange(k))
+    ax.set_xticklabels(result.names, rotation=45, ha="right", fontsize=8)
+    ax.set_yticklabels(result.names, fontsize=8)
+
+    if k <= MAX_ANNOTATED:
+        significant = result.significant(alpha)
+        for i in range(k):
+            for j in range(k):
+                r = result.r[i, j]
+                if i == j or np.isnan(r):
+                    continue
+                ax.text(
+                    j, i, f"{r:.2f}" + ("*" if significant[i, j] else ""),
+                    ha="center", va="center", fontsize=8,
+                    color="white" if abs(r) > 0.6 else "black"
+                )
+
+    ax.set_title(f"Pearson r (* FDR q < {alpha:g})")
+    ax.figure.colorbar(image, ax=ax, label="r")
+    return image
+
+
+def plot_correlation_matrix(result, alpha=FDR_ALPHA, block=None):
+    """Show the correlation matrix in a pyplot window."""
+    fig, ax = plt.subplots(figsize=(7, 6))
+    draw_correlation_matrix(ax, result, alpha)
+    plt.tight_layout()
+    plt.show(block=block)
+
+
+def draw_lagged_correlation(ax, result):
+    """Draw r against lag, highlighting the lag with the strongest correlation."""
+    ax.axhline(0, color="gray", linewidth=0.8)
+    ax.axvline(0, color="gray", linewidth=0.8, linestyle="--")
+    ax.plot(result.lags, result.r, marker="o", color="rebeccapurple")
+
+    best = result.best_lag
+    if best is not None:
+        r, p, n = result.at(best)
+        ax.plot([best], [r], marker="o", markersize=12, color="red", fillstyle="none")
+        ax.annotate(
+            f"lag {best:+d} d\nr = {r:.3f}, p = {p:.2e}, n = {n}",
+            (best, r), xytext=(0, 15 if r >= 0 else -30), textcoords="offset points",
+            ha="center", fontsize=9
+        )
+
+    ax.set_xlabel("Lag (days, external after weight)")
+    ax.set_ylabel("Pearson r")
+    ax.set_ylim(-1.05, 1.05)
+    ax.set_title("Lagged correlation of weight and external values")
+
+
+def plot_lagged_correlation(result, block=None):
+    """Show r against lag in a pyplot window."""
+    plt.figure()
+    draw_lagged_correlation(plt.gca(), result)
+    plt.tight_layout()
+    plt.show(block=block)
+
+
+def lagged_figure(result, ax=None):
+    """Build the lagged correlation figure without pyplot; returns the Figure."""
+    fig, ax = new_figure(ax)
+    draw_lagged_correlation(ax, result)
+    return fig
+
+
+def correlation_figure(result, alpha=FDR_ALPHA, ax=None):
+    """Build the correlation matrix figure without pyplot; returns the Figure."""
+    fig, ax = new_figure(ax, figsize=(7, 6))
+    draw_correlation_matrix(ax, result, alpha)
+    return fig
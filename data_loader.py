@@ -1,44 +1,298 @@
+from collections import namedtuple
+from fnmatch import fnmatchcase
 from pathlib import Path
+import json
+import math
+import os
 import re
+import threading
+import time
+
+from archive_source import ArchivePath, as_source_path
 
 DATE_PATTERN = re.compile(r"\d{8}")
+EXPDETAILS_PATTERN = "*ExpDetails*.txt"
+
+# Listings of directories modified this recently are not cached, since
+# coarse mtime resolution (e.g. on SMB mounts) could hide a later change
+RACY_WINDOW_NS = 2_000_000_000
+
+CHECKPOINT_DIR = Path.home() / ".mouse_weight_tracker" / "checkpoints"
+CHECKPOINT_EVERY = 100
+
+DirListing = namedtuple("DirListing", ["mtime_ns", "dirs", "files"])
+DayError = namedtuple("DayError", ["day", "kind", "message"])
+
+_listing_cache = {}
+_listing_lock = threading.Lock()
+
+
+def list_dir(path):
+    """List a directory with a single os.scandir call.
+
+    Entry types come from d_type where the OS provides it, so no per-entry
+    stat is needed. Listings are cached by directory mtime, which changes
+    whenever entries are added, removed or renamed.
+
+    Folders inside zip/tar archives (ArchivePath) are listed from the
+    archive's index instead.
+
+    Returns:
+        DirListing with the directory mtime and sorted subfolder and file names
+    """
+    if isinstance(path, ArchivePath):
+        dirs, files = path.listing()
+        return DirListing(path.stat().st_mtime_ns, dirs, files)
+
+    key = os.fspath(path)
+    mtime_ns = os.stat(key).st_mtime_ns
+
+    with _listing_lock:
+        cached = _listing_cache.get(key)
+    if cached is not None and cached.mtime_ns == mtime_ns:
+        return cached
+
+    dirs, files = [], []
+    with os.scandir(key) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                dirs.append(entry.name)
+            else:
+                files.append(entry.name)
+    listing = DirListing(mtime_ns, tuple(sorted(dirs)), tuple(sorted(files)))
+
+    if time.time_ns() - mtime_ns > RACY_WINDOW_NS:
+        with _listing_lock:
+            _listing_cache[key] = listing
+    return listing
+
+
+def clear_listing_cache():
+    with _listing_lock:
+        _listing_cache.clear()
+
 
 def find_day_folders(base_path):
-    base = Path(base_path)
-    if not base.exists():
+    """Find the YYYYMMDD day folders of a base folder.
+
+    base_path may also be a .zip/.tar(.gz) archive of the base folder, or a
+    folder inside one (e.g. 'cohort.zip/IP75'); day folders are then
+    ArchivePath objects read straight from the archive.
+    """
+    base = as_source_path(base_path)
+    try:
+        listing = list_dir(base)
+    except (FileNotFoundError, NotADirectoryError):
         raise FileNotFoundError("Base folder does not exist")
 
-    folders = [
-        p for p in base.iterdir()
-        if p.is_dir() and DATE_PATTERN.fullmatch(p.name)
-    ]
+    # An archive of the base folder usually holds a single top-level folder
+    if (
+        isinstance(base, ArchivePath)
+        and not base.member
+        and not listing.files
+        and len(listing.dirs) == 1
+        and not DATE_PATTERN.fullmatch(listing.dirs[0])
+    ):
+        base = base / listing.dirs[0]
+        listing = list_dir(base)
+
+    folders = [base / name for name in listing.dirs if DATE_PATTERN.fullmatch(name)]
 
     if not folders:
         raise FileNotFoundError("No valid day folders found")
 
-    return sorted(folders)
+    return folders
+
+def find_animal_folders(cohort_path):
+    """Find the animal folders (folders holding day folders) of a cohort."""
+    cohort = as_source_path(cohort_path)
+    try:
+        listing = list_dir(cohort)
+    except (FileNotFoundError, NotADirectoryError):
+        raise FileNotFoundError("Cohort folder does not exist")
+
+    animals = [
+        cohort / name for name in listing.dirs
+        if any(DATE_PATTERN.fullmatch(d) for d in list_dir(cohort / name).dirs)
+    ]
+
+    # Archives of the cohort folder usually hold a single top-level folder
+    if not animals and isinstance(cohort, ArchivePath) and not cohort.member and len(listing.dirs) == 1:
+        return find_animal_folders(cohort / listing.dirs[0])
+
+    if not animals:
+        raise FileNotFoundError("No animal folders found")
+
+    return animals
 
 def find_expdetails_file(day_folder):
-    files = list(day_folder.glob("*ExpDetails*.txt"))
+    try:
+        names = list_dir(day_folder).files
+    except (FileNotFoundError, NotADirectoryError):
+        names = ()
+    files = [name for name in names if fnmatchcase(name, EXPDETAILS_PATTERN)]
     if not files:
         raise FileNotFoundError(
             f"Missing ExpDetails file in folder: {day_folder.name}"
         )
-    return files[0]
+    return day_folder / files[0]
+
+def scan_day_folders(base_path, value_filenames=()):
+    """Discover day folders together with their ExpDetails and value files.
+
+    Uses one (cached) directory listing per folder.
+
+    Args:
+        base_path: Folder containing the day folders
+        value_filenames: Names of per-day value files to look for
+
+    Returns:
+        Dict mapping each day folder Path to a dict with the 'expdetails' file
+        Path (or None) and a 'values' dict of the value files that exist
+    """
+    days = {}
+    for day in find_day_folders(base_path):
+        files = list_dir(day).files
+        expdetails = [name for name in files if fnmatchcase(name, EXPDETAILS_PATTERN)]
+        days[day] = {
+            "expdetails": day / expdetails[0] if expdetails else None,
+            "values": {name: day / name for name in value_filenames if name in files},
+        }
+    return days
 
 def load_weights_for_selected_days(selected_days):
     """Load weights from all selected days.
     
     Args:
-        selected_days: List of Path objects representing day folders
+        selected_days: List of Path objects representing day folders,
+            or a SessionTable whose day folders are read
         
     Returns:
         List of weight values extracted from ExpDetails files
     """
     from weight_parser import extract_weight
     
+    selected_days = getattr(selected_days, "day_folders", selected_days)
     weights = []
     for day in selected_days:
         txt_file = find_expdetails_file(day)
         weights.append(extract_weight(txt_file))
     return weights
+
+
+class LoadReport:
+    """Outcome of a tolerant load: per-day failures and how much was reused."""
+
+    # Failure kinds
+    MISSING_FILE = "missing_file"
+    NO_BW = "no_bw"
+    UNREADABLE = "unreadable"
+
+    def __init__(self):
+        self.errors = []
+        self.parsed = 0
+        self.reused = 0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def failed_days(self):
+        return [e.day for e in self.errors]
+
+    def summary(self):
+        lines = [
+            f"{self.parsed} days parsed, {self.reused} reused from checkpoint, "
+            f"{len(self.errors)} failed"
+        ]
+        lines += [f"{Path(str(e.day)).name}: {e.message}" for e in self.errors]
+        return "\n".join(lines)
+
+
+def _write_checkpoint(path, entries):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(entries, f)
+    os.replace(tmp, path)
+
+
+def load_weights_tolerant(selected_days, checkpoint_path=None):
+    """Load weights without stopping at the first bad day.
+
+    Failing days get NaN and are listed in the report. When a checkpoint
+    path is given, successfully parsed days are saved there (every
+    CHECKPOINT_EVERY days and at the end), and a later call only re-parses
+    days that failed or whose ExpDetails file changed.
+
+    Args:
+        selected_days: List of Path objects (or a SessionTable)
+        checkpoint_path: Optional JSON file used to resume across runs
+
+    Returns:
+        (weights, report): list of floats with NaN for failed days, LoadReport
+    """
+    from weight_parser import extract_weight
+
+    selected_days = getattr(selected_days, "day_folders", selected_days)
+    entries = {}
+    if checkpoint_path and Path(checkpoint_path).exists():
+        try:
+            with open(checkpoint_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+
+    report = LoadReport()
+    weights = []
+    dirty = 0
+    for day in selected_days:
+        try:
+            txt_file = find_expdetails_file(day)
+        except FileNotFoundError as e:
+            report.errors.append(DayError(day, LoadReport.MISSING_FILE, str(e)))
+            weights.append(math.nan)
+            continue
+
+        try:
+            st = txt_file.stat()
+            key = str(day)
+            entry = entries.get(key)
+            if (
+                entry
+                and entry["file"] == str(txt_file)
+                and entry["size"] == st.st_size
+                and entry["mtime_ns"] == st.st_mtime_ns
+            ):
+                weights.append(entry["weight"])
+                report.reused += 1
+                continue
+
+            weight = extract_weight(txt_file)
+        except (OSError, UnicodeDecodeError) as e:
+            # UnicodeDecodeError is a ValueError, so it must be caught first
+            report.errors.append(DayError(day, LoadReport.UNREADABLE, str(e)))
+            weights.append(math.nan)
+            continue
+        except ValueError as e:
+            report.errors.append(DayError(day, LoadReport.NO_BW, str(e)))
+            weights.append(math.nan)
+            continue
+
+        entries[key] = {
+            "file": str(txt_file), "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns, "weight": weight,
+        }
+        weights.append(weight)
+        report.parsed += 1
+        dirty += 1
+        if checkpoint_path and dirty >= CHECKPOINT_EVERY:
+            _write_checkpoint(checkpoint_path, entries)
+            dirty = 0
+
+    if checkpoint_path and dirty:
+        _write_checkpoint(checkpoint_path, entries)
+
+    return weights, report
@@ -0,0 +1,122 @@
+import argparse
+import csv
+from pathlib import Path
+
+import numpy as np
+
+from data_loader import find_animal_folders, find_day_folders, find_expdetails_file
+from external_values import load_daily_values_files
+from sessions import RESAMPLE_HOWS, RESAMPLE_PERIODS, SessionTable, resample_series
+from weight_parser import extract_weight
+
+HEADER = ("animal", "date", "weight")
+
+
+def delimiter_for(path):
+    """Tab for .tsv/.tab files, comma otherwise."""
+    return "\t" if Path(path).suffix.lower() in (".tsv", ".tab") else ","
+
+
+def iter_table_rows(table):
+    """Yield (animal, 'YYYY-MM-DD', weight) rows of a SessionTable."""
+    animals = table.animal_names
+    dates = np.datetime_as_string(table.dates, unit="D")
+    for code, date, weight in zip(table.animal_codes, dates, table.weights):
+        yield animals[code], date, float(weight)
+
+
+def iter_cohort_rows(cohort_path, daily_filename=None, period=None, how="mean"):
+    """Yield one row per session of every animal in a cohort.
+
+    Rows are produced while the files are read, one day at a time, so memory
+    use does not grow with the length of the history. With a resampling
+    period, one animal is loaded at a time and one row per period is yielded.
+
+    Args:
+        cohort_path: Folder with one folder per animal, or a single animal folder
+        daily_filename: Optional per-day values file added as a 'value' column
+        period: None for daily rows, or one of RESAMPLE_PERIODS
+        how: Aggregation of weights and values per period (RESAMPLE_HOWS)
+    """
+    try:
+        animals = [Path(cohort_path)] if find_day_folders(cohort_path) else []
+    except FileNotFoundError:
+        animals = find_animal_folders(cohort_path)
+
+    for animal_folder in animals:
+        days = find_day_folders(animal_folder)
+        if period:
+            yield from _resampled_rows(animal_folder.name, days, daily_filename, period, how)
+            continue
+        for day in days:
+            date = f"{day.name[:4]}-{day.name[4:6]}-{day.name[6:]}"
+            row = (animal_folder.name, date, extract_weight(find_expdetails_file(day)))
+            if daily_filename:
+                row += (load_daily_values_files([day], daily_filename)[0],)
+            yield row
+
+
+def _resampled_rows(animal, days, daily_filename, period, how):
+    table = SessionTable.from_day_folders(days, animal)
+    _, starts, weights = resample_series(table.dates, table.weights, period, how)
+    columns = [np.datetime_as_string(starts, unit="D"), weights]
+    if daily_filename:
+        values = np.asarray(load_daily_values_files(table, daily_filename), dtype=float)
+        columns.append(resample_series(table.dates, values, period, how)[2])
+    for row in zip(*columns):
+        yield (animal, row[0]) + tuple(float(v) for v in row[1:])
+
+
+def write_delimited(path, rows, header=HEADER, delimiter=None):
+    """Stream rows to a CSV/TSV file as they are produced.
+
+    Args:
+        path: Output file path
+        rows: Iterable of row tuples (may be a generator)
+        header: Column names written as the first line
+        delimiter: Column separator; chosen from the file suffix if None
+
+    Returns:
+        Number of data rows written
+    """
+    delimiter = delimiter or delimiter_for(path)
+    count = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def export_cohort(cohort_path, out_path, daily_filename=None, delimiter=None,
+                  period=None, how="mean"):
+    """Write a cohort-wide table of weights (and optional daily values).
+
+    With a period ('week' or 'month') every row summarises one period, dated
+    by its first day.
+    """
+    header = HEADER + (("value",) if daily_filename else ())
+    return write_delimited(
+        out_path, iter_cohort_rows(cohort_path, daily_filename, period, how), header, delimiter
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export cohort weights to CSV/TSV.")
+    parser.add_argument("cohort", help="Cohort folder or single animal folder")
+    parser.add_argument("output", help="Output .csv or .tsv file")
+    parser.add_argument("--daily-file", help="Per-day external values file name")
+    parser.add_argument("--resample", choices=RESAMPLE_PERIODS, help="One row per week or month")
+    parser.add_argument("--how", choices=RESAMPLE_HOWS, default="mean",
+                        help="Aggregation used with --resample")
+    args = parser.parse_args(argv)
+
+    count = export_cohort(args.cohort, args.output, args.daily_file,
+                          period=args.resample, how=args.how)
+    print(f"Wrote {count} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
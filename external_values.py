@@ -1,7 +1,12 @@
+import io
+import warnings
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pickle
 from scipy.io import loadmat
 from pathlib import Path
+from data_loader import list_dir
+from archive_source import ArchivePath
 
 def load_single_values_file(file_path):
     if not file_path:
@@ -9,14 +14,241 @@ def load_single_values_file(file_path):
 
     return _load_values(Path(file_path))
 
-def load_daily_values_files(day_folders, filename):
+REDUCTIONS = ("mean", "median", "sum", "fraction_above")
+CHUNK_SIZE = 1_000_000
+HISTOGRAM_BINS = 1024
+
+OUTLIER_METHODS = ("zscore", "rolling")
+ROLLING_WINDOW = 15
+MAD_SCALE = 1.4826  # makes the MAD match the standard deviation for normal data
+
+DATE_KEYS = ("dates", "date", "days", "day")
+JOIN_MODES = ("inner", "nan")
+
+def to_datetime64(dates):
+    """Convert dates to datetime64[D] without a Python loop per entry.
+
+    Accepts datetime64 values, YYYYMMDD numbers or strings, and
+    'YYYY-MM-DD' strings.
+    """
+    dates = np.asarray(dates)
+    if dates.dtype.kind == "M":
+        return dates.astype("datetime64[D]")
+    if dates.dtype.kind in "US" or dates.dtype == object:
+        dates = np.char.replace(np.char.strip(dates.astype(str)), "-", "")
+    ymd = np.asarray(dates, dtype=float).astype(np.int64).ravel()
+    if np.any((ymd < 10000101) | (ymd > 99991231)):
+        raise ValueError("Dates must be in YYYYMMDD or YYYY-MM-DD format")
+    month, day = ymd // 100 % 100, ymd % 100
+    if np.any((month < 1) | (month > 12) | (day < 1)):
+        raise ValueError("Dates must be in YYYYMMDD or YYYY-MM-DD format")
+    years = (ymd // 10000 - 1970).astype("datetime64[Y]")
+    months = years.astype("datetime64[M]") + (month - 1)
+    days = months.astype("datetime64[D]") + (day - 1)
+    # A day past the end of its month would roll over into the next one
+    invalid = days.astype("datetime64[M]") != months
+    if np.any(invalid):
+        raise ValueError(f"Invalid date: {ymd[invalid][0]}")
+    return days
+
+
+def _read_values_data(file_path):
+    """Raw contents of a values file: a dict of variables or an array."""
+    if not file_path:
+        raise ValueError("No values file selected")
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+
+    if suffix == ".npz":
+        with np.load(path, allow_pickle=False) as npz:
+            data = {key: npz[key] for key in npz.files}
+    elif suffix == ".mat":
+        data = {k: v for k, v in loadmat(path).items() if not k.startswith("__")}
+    elif suffix == ".pkl":
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    elif suffix == ".npy":
+        data = np.load(path, allow_pickle=True)
+        if data.dtype == object and data.shape == ():
+            data = data.item()
+    else:
+        raise ValueError(f"Unsupported file type: {suffix}")
+    return data
+
+
+def load_dated_values_file(file_path):
+    """Load a values file that may also carry the date of every value.
+
+    Supported layouts: .npz / .mat / pickled dict with a 'dates' variable
+    next to the values, a structured array with 'date' and 'value' fields,
+    or a two-column array of YYYYMMDD dates and values.
+
+    Returns:
+        (dates, values): datetime64[D] array (None if the file has no dates)
+        and a float array
+    """
+    data = _read_values_data(file_path)
+
+    if isinstance(data, dict):
+        date_key = next((k for k in DATE_KEYS if k in data), None)
+        value_keys = [k for k in data if k != date_key]
+        if not value_keys:
+            raise ValueError("No values found next to the dates")
+        key = "values" if "values" in data else value_keys[0]
+        values = np.asarray(data[key], dtype=float).ravel()
+        if date_key is None:
+            return None, values
+        dates = np.asarray(data[date_key])
+        if dates.dtype.kind == "U" and dates.size == 1 and len(values) > 1:
+            # MATLAB char matrices of dates load as a single string per row
+            dates = np.array(str(dates.ravel()[0]).split())
+        return to_datetime64(dates.ravel()), values
+
+    data = np.asarray(data)
+    if data.dtype.names:
+        date_field = next((n for n in data.dtype.names if n in DATE_KEYS), None)
+        value_field = next(n for n in data.dtype.names if n != date_field)
+        values = np.asarray(data[value_field], dtype=float)
+        return (to_datetime64(data[date_field]) if date_field else None), values
+    if data.ndim == 2 and data.shape[1] == 2:
+        return to_datetime64(data[:, 0]), np.asarray(data[:, 1], dtype=float)
+    return None, np.asarray(data, dtype=float).ravel()
+
+
+def _variable_columns(name, values):
+    """Split one loaded variable into named 1D columns (2D arrays give name_1, name_2, ...)."""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 2 and 1 in values.shape:
+        # MATLAB vectors load as 1 x n or n x 1
+        values = values.ravel()
+    if values.ndim == 1:
+        return [(name, values)]
+    if values.ndim != 2:
+        raise ValueError(f"Variable '{name}' must be 1D or 2D, got {values.ndim}D")
+    return [(f"{name}_{i + 1}", values[:, i]) for i in range(values.shape[1])]
+
+
+def load_multi_values_file(file_path):
+    """Load a file holding several external variables, one value per day each.
+
+    Supported layouts: .npz / .mat / pickled dict with one entry per
+    variable (plus an optional 'dates' entry), a structured array with one
+    field per variable (plus an optional 'date' field), or a 2D array with
+    one column per variable.
+
+    Returns:
+        (dates, names, values): datetime64[D] array (None if the file has no
+        dates), tuple of variable names and a float array of shape
+        (n_days, n_variables)
+    """
+    data = _read_values_data(file_path)
+
+    dates = None
+    if isinstance(data, dict):
+        date_key = next((k for k in DATE_KEYS if k in data), None)
+        if date_key is not None:
+            dates = np.asarray(data[date_key])
+            if dates.dtype.kind == "U" and dates.size == 1:
+                dates = np.array(str(dates.ravel()[0]).split())
+            dates = to_datetime64(dates.ravel())
+        columns = [c for k, v in data.items() if k != date_key for c in _variable_columns(k, v)]
+    else:
+        data = np.asarray(data)
+        if data.dtype.names:
+            date_field = next((n for n in data.dtype.names if n in DATE_KEYS), None)
+            if date_field:
+                dates = to_datetime64(data[date_field])
+            columns = [(n, data[n]) for n in data.dtype.names if n != date_field]
+        else:
+            data = np.asarray(data, dtype=float)
+            columns = [(f"var{i + 1}", data[:, i]) for i in range(data.shape[1])] \
+                if data.ndim == 2 else [("values", data.ravel())]
+
+    if not columns:
+        raise ValueError("No variables found in the values file")
+    lengths = {len(values) for _, values in columns}
+    if len(lengths) > 1:
+        raise ValueError("All variables must have one value per day (lengths differ)")
+    if dates is not None and len(dates) != lengths.pop():
+        raise ValueError(f"Got {len(dates)} dates but {len(columns[0][1])} values per variable")
+
+    names = tuple(str(name) for name, _ in columns)
+    values = np.column_stack([np.asarray(v, dtype=float) for _, v in columns])
+    return dates, names, values
+
+
+def join_by_date(day_dates, value_dates, values, how="nan"):
+    """Match dated values to days with a sorted merge.
+
+    Args:
+        day_dates: datetime64 dates of the selected days
+        value_dates: datetime64 dates of the external values (any order)
+        values: External values, one per value date (or one row of
+            several variables per value date)
+        how: 'nan' keeps every day and fills days without a value with NaN;
+            'inner' keeps only the days that have a value
+
+    Returns:
+        (keep, matched): boolean mask of the days kept and the matched values
+        for those days
+    """
+    if how not in JOIN_MODES:
+        raise ValueError(f"Unknown join mode: {how}")
+    day_dates = np.asarray(day_dates, dtype="datetime64[D]")
+    value_dates = np.asarray(value_dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype=float)
+    if len(value_dates) != len(values):
+        raise ValueError(
+            f"Got {len(value_dates)} dates but {len(values)} values"
+        )
+
+    order = np.argsort(value_dates, kind="stable")
+    sorted_dates = value_dates[order]
+    if np.any(sorted_dates[1:] == sorted_dates[:-1]):
+        raise ValueError("External values contain duplicate dates")
+
+    idx = np.searchsorted(sorted_dates, day_dates)
+    found = idx < len(sorted_dates)
+    idx_clipped = np.where(found, idx, 0)
+    found[found] = sorted_dates[idx_clipped[found]] == day_dates[found]
+
+    matched = np.full((len(day_dates),) + values.shape[1:], np.nan)
+    matched[found] = values[order][idx_clipped[found]]
+
+    if how == "inner":
+        return found, matched[found]
+    return np.ones(len(day_dates), dtype=bool), matched
+
+
+def load_daily_values_files(day_folders, filename, reduce=None, threshold=None,
+                            chunk_size=CHUNK_SIZE):
+    """Load one value per day folder.
+
+    Args:
+        day_folders: List of day folder paths (or a SessionTable)
+        filename: Name of the values file inside every day folder
+        reduce: None to require exactly one value per file, or one of
+            REDUCTIONS, or a callable mapping the (memory-mapped) array of
+            per-trial values to a scalar
+        threshold: Threshold for the 'fraction_above' reduction
+        chunk_size: Number of values reduced at a time
+    """
+    # A SessionTable can be passed in place of the list of day folders
+    day_folders = getattr(day_folders, "day_folders", day_folders)
     values = []
     for folder in day_folders:
         path = folder / filename
-        if not path.exists():
+        try:
+            names = list_dir(folder).files
+        except (FileNotFoundError, NotADirectoryError):
+            names = ()
+        if filename not in names and not path.exists():
             raise FileNotFoundError(
                 f"Missing values file '{filename}' in folder: {folder.name}"
             )
+        if reduce is not None:
+            values.append(reduce_values_file(path, reduce, threshold, chunk_size))
+            continue
         vals = _load_values(path)
         if len(vals) != 1:
             raise ValueError(
@@ -25,20 +257,147 @@ def load_daily_values_files(day_folders, filename):
         values.append(vals[0])
     return values
 
+def reduce_values_file(path, reduce, threshold=None, chunk_size=CHUNK_SIZE):
+    """Reduce a file of per-trial values to a single daily value.
+
+    Plain .npy files are memory-mapped, so only chunk_size values are in
+    memory at a time. Other formats are loaded first.
+    """
+    data = None
+    if path.suffix.lower() == ".npy" and not isinstance(path, ArchivePath):
+        try:
+            data = np.load(path, mmap_mode="r")
+        except ValueError:
+            # Object arrays cannot be memory-mapped
+            data = None
+    if data is None:
+        data = np.asarray(_load_values(path), dtype=float)
+    return reduce_array(data, reduce, threshold, chunk_size)
+
+
+def _chunks(values, chunk_size):
+    # The reductions do not depend on element order, so values are read in
+    # memory order: a Fortran-ordered or strided memmap is never copied whole.
+    # The chunk buffer is reused, so chunks must not be kept past one step.
+    yield from np.nditer(
+        values,
+        flags=["external_loop", "buffered", "zerosize_ok"],
+        op_dtypes=[float],
+        casting="unsafe",
+        order="K",
+        buffersize=chunk_size
+    )
+
+
+def reduce_array(values, reduce, threshold=None, chunk_size=CHUNK_SIZE):
+    """Reduce an array (possibly a memmap) to a scalar, one chunk at a time.
+
+    NaN entries (e.g. trials that were not run) are ignored.
+    """
+    if callable(reduce):
+        return float(reduce(values))
+    if reduce not in REDUCTIONS:
+        raise ValueError(f"Unknown reduction: {reduce}")
+    if reduce == "fraction_above" and threshold is None:
+        raise ValueError("The 'fraction_above' reduction needs a threshold")
+
+    values = np.asarray(values) if not isinstance(values, np.ndarray) else values
+    if reduce == "median":
+        return _chunked_median(values, chunk_size)
+
+    total = 0.0
+    count = 0
+    above = 0
+    for chunk in _chunks(values, chunk_size):
+        finite = chunk[np.isfinite(chunk)]
+        total += finite.sum()
+        count += finite.size
+        if threshold is not None:
+            above += np.count_nonzero(finite > threshold)
+
+    if reduce == "sum":
+        return float(total)
+    if count == 0:
+        return float("nan")
+    if reduce == "mean":
+        return total / count
+    return above / count
+
+
+def _chunked_median(values, chunk_size):
+    count = 0
+    lo, hi = np.inf, -np.inf
+    for chunk in _chunks(values, chunk_size):
+        finite = chunk[np.isfinite(chunk)]
+        if finite.size:
+            count += finite.size
+            lo = min(lo, finite.min())
+            hi = max(hi, finite.max())
+    if count == 0:
+        return float("nan")
+
+    ks = sorted({(count - 1) // 2, count // 2})
+    return float(np.mean([_chunked_kth(values, k, lo, hi, chunk_size) for k in ks]))
+
+
+def _chunked_kth(values, k, lo, hi, chunk_size):
+    """k-th smallest finite value, found by narrowing a histogram range.
+
+    Every pass counts values below the range and bins the values inside it;
+    once the range holds at most chunk_size values they are sorted directly.
+    """
+    while True:
+        if lo == hi:
+            return lo
+
+        edges = np.linspace(lo, hi, HISTOGRAM_BINS + 1)
+        below = 0
+        inside = 0
+        hist = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        for chunk in _chunks(values, chunk_size):
+            chunk = chunk[np.isfinite(chunk)]
+            below += np.count_nonzero(chunk < lo)
+            in_range = chunk[(chunk >= lo) & (chunk <= hi)]
+            inside += in_range.size
+            # Bin b holds edges[b] <= v < edges[b + 1], the last bin also v == hi
+            bins = np.clip(np.searchsorted(edges, in_range, side="right") - 1, 0, HISTOGRAM_BINS - 1)
+            hist += np.bincount(bins, minlength=HISTOGRAM_BINS)
+
+        if inside <= chunk_size:
+            gathered = np.concatenate([
+                c[(c >= lo) & (c <= hi)] for c in _chunks(values, chunk_size)
+            ])
+            return np.sort(gathered)[k - below]
+
+        b = int(np.searchsorted(below + np.cumsum(hist), k, side="right"))
+        new_lo, new_hi = edges[b], edges[b + 1]
+        if new_lo == lo and new_hi == hi:
+            # Range can no longer be split (float resolution)
+            at_lo = sum(np.count_nonzero(c == lo) for c in _chunks(values, chunk_size))
+            return lo if below + at_lo > k else hi
+        lo, hi = new_lo, new_hi
+
+
 def _load_values(path: Path):
     suffix = path.suffix.lower()
 
+    # Archive members are read into memory, never extracted to disk
+    source = io.BytesIO(path.read_bytes()) if isinstance(path, ArchivePath) else path
+
     if suffix == ".npy":
-        data = np.load(path, allow_pickle=True)
+        data = np.load(source, allow_pickle=True)
         return _to_list(data)
 
     elif suffix == ".pkl":
-        with open(path, "rb") as f:
-            data = pickle.load(f)
+        if isinstance(path, ArchivePath):
+            data = pickle.load(source)
+        else:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
         return _to_list(data)
 
     elif suffix == ".mat":
-        data = loadmat(path)
+        data = loadmat(source)
         return _extract_from_mat(data)
 
     else:
@@ -73,14 +432,69 @@ def _extract_from_mat(mat_dict):
     raise ValueError("No numeric array found in .mat file")
 
 
-def detect_outliers(x, y, z_thresh=3.0):
+def zscores(x, y):
+    """Signed z-scores of x and y (distance from the mean in standard deviations)."""
     x = np.asarray(x, dtype=float)
     y = np.asarray(y, dtype=float)
 
-    zx = np.abs((x - x.mean()) / x.std())
-    zy = np.abs((y - y.mean()) / y.std())
+    zx = (x - x.mean()) / x.std()
+    zy = (y - y.mean()) / y.std()
+
+    return zx, zy
+
+
+def detect_outliers(x, y, z_thresh=3.0):
+    zx, zy = zscores(x, y)
+
+    inlier_mask = (np.abs(zx) < z_thresh) & (np.abs(zy) < z_thresh)
+    outlier_mask = ~inlier_mask
+
+    return inlier_mask, outlier_mask
+
+
+def rolling_scores(values, window=ROLLING_WINDOW):
+    """Robust z-scores of values against a centred rolling median and MAD.
+
+    values must be in time order. Each value is compared with the median of
+    the window sessions around it, scaled by the window's median absolute
+    deviation, so a slowly drifting baseline does not produce outliers.
+    Windows are shortened at both ends and NaN values are skipped.
+
+    Args:
+        values: 1D sequence of values in time order
+        window: Number of sessions (not calendar days) per window, made odd
+            so it can be centred
+
+    Returns:
+        Array of scores, NaN where the value is NaN
+    """
+    values = np.asarray(values, dtype=float)
+    window = max(int(window), 3) | 1
+    half = window // 2
+    padded = np.concatenate([np.full(half, np.nan), values, np.full(half, np.nan)])
+    windows = sliding_window_view(padded, window)
+
+    with warnings.catch_warnings():
+        # Windows of NaN only (runs of failed days) give NaN medians
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(windows, axis=1)
+        mad = np.nanmedian(np.abs(windows - median[:, None]), axis=1)
+
+    deviation = values - median
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = deviation / (MAD_SCALE * mad)
+    # A flat window only flags values that actually differ from it
+    scores[(mad == 0) & (deviation == 0)] = 0.0
+    return scores
+
+
+def detect_outliers_rolling(x, y, z_thresh=3.0, window=ROLLING_WINDOW):
+    """Like detect_outliers, but against a rolling median/MAD instead of
+    the global mean/std. x and y must be in time order."""
+    sx = rolling_scores(x, window)
+    sy = rolling_scores(y, window)
 
-    inlier_mask = (zx < z_thresh) & (zy < z_thresh)
+    inlier_mask = (np.abs(sx) < z_thresh) & (np.abs(sy) < z_thresh)
     outlier_mask = ~inlier_mask
 
     return inlier_mask, outlier_mask
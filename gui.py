@@ -1,12 +1,63 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
 import tkinter as tk
+import matplotlib.pyplot as plt
 import numpy as np
+from pathlib import Path
 from tkinter import filedialog, messagebox
 from scipy.io import savemat
 from datetime import datetime
 from PIL import Image, ImageTk
-from data_loader import find_day_folders, load_weights_for_selected_days
-from external_values import load_single_values_file, load_daily_values_files
+from data_loader import (
+    CHECKPOINT_DIR,
+    find_animal_folders,
+    find_day_folders,
+    find_expdetails_file,
+    load_weights_for_selected_days,
+    load_weights_tolerant,
+)
+from external_values import (
+    JOIN_MODES,
+    OUTLIER_METHODS,
+    REDUCTIONS,
+    ROLLING_WINDOW,
+    join_by_date,
+    load_daily_values_files,
+    load_dated_values_file,
+    load_multi_values_file,
+    load_single_values_file,
+)
 from plotter import plot_weights_vs_days, plot_weight_vs_external
+from session_index import DEFAULT_INDEX_PATH, SessionIndex, parse_query
+from cache import default_cache, content_hash, file_fingerprint
+from sessions import RESAMPLE_HOWS, RESAMPLE_PERIODS, SessionTable
+from service import is_service_url, remote_source
+from exporters import HEADER, iter_table_rows, write_delimited
+from archive_source import ArchivePath
+from regression import REGRESSION_METHODS
+from snapshot import SNAPSHOT_PATH, SessionSnapshot
+from heatmap import SORT_ORDERS, plot_cohort_heatmap
+from ingest import DEFAULT_INGEST_PORT, IngestHub, start_ingest_server
+from correlation import (
+    MAX_LAG,
+    correlate_variables,
+    export_correlations,
+    lagged_correlation,
+    plot_correlation_matrix,
+    plot_lagged_correlation,
+)
+
+# Variables saved with the session snapshot and restored on the next launch
+SNAPSHOT_SETTINGS = (
+    "use_external", "external_mode", "single_values_file", "match_by_date",
+    "date_join_mode", "daily_reduce", "reduce_threshold", "show_regression",
+    "regression_method", "mark_outliers", "outlier_method", "outlier_window",
+    "outlier_thresh", "tolerant_loading", "save_format", "heatmap_sort",
+    "aggregate_period", "aggregate_how", "max_lag",
+)
 
 class MouseWeightGUI:
     def __init__(self, root):
@@ -33,11 +84,29 @@ class MouseWeightGUI:
         self.use_external = tk.BooleanVar()
         self.external_mode = tk.StringVar(value="single")
         self.single_values_file = tk.StringVar()
+        self.day_filter = tk.StringVar()
+        self.tolerant_loading = tk.BooleanVar(value=False)
+        self.session_index = None
+        self.remote_table = None
+        self.remote_client = None
+        self.remote_animal = None
+        self.loaded_table = None
+        # file_fingerprint of the ExpDetails files loaded_table was read from
+        self.loaded_fingerprint = None
+        self.external_plot = None
+        self.loaded_files = {}
+        self.snapshot_path = SNAPSHOT_PATH
+        self.accept_ingest = tk.BooleanVar(value=False)
+        self.ingest_hub = None
+        self.ingest_server = None
+        self.ingest_queue = queue.Queue()
+        self.live_weights = None
 
         self.main_frame = tk.Frame(root, bg=self.bg_color)
         self.main_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
         self._build_main_gui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def _build_main_gui(self):
         # Top frame for instructions button
@@ -58,10 +127,38 @@ class MouseWeightGUI:
         
         tk.Label(self.main_frame, text="Base Folder", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 11, "bold")).pack(anchor="center", pady=(10, 5))
         tk.Entry(self.main_frame, textvariable=self.base_path, width=50, bg="#34495e", fg=self.fg_color, insertbackground=self.fg_color).pack(pady=5)
-        tk.Button(self.main_frame, text="Browse", command=self.browse_folder, bg=self.accent_color, fg="white", activebackground=self.button_hover, font=("Segoe UI", 10)).pack(pady=5)
+        browse_frame = tk.Frame(self.main_frame, bg=self.bg_color)
+        browse_frame.pack(pady=5)
+        tk.Button(browse_frame, text="Browse", command=self.browse_folder, bg=self.accent_color, fg="white", activebackground=self.button_hover, font=("Segoe UI", 10)).pack(side="left", padx=5)
+        tk.Button(browse_frame, text="Browse archive", command=self.browse_archive, bg=self.accent_color, fg="white", activebackground=self.button_hover, font=("Segoe UI", 10)).pack(side="left", padx=5)
 
         tk.Button(self.main_frame, text="Load Days", command=self.load_days, bg=self.accent_color, fg="white", activebackground=self.button_hover, font=("Segoe UI", 10)).pack(pady=10)
 
+        tk.Checkbutton(
+            self.main_frame,
+            text="Skip days that fail to load (resume after fixes)",
+            variable=self.tolerant_loading,
+            bg=self.bg_color,
+            fg=self.fg_color,
+            selectcolor=self.accent_color,
+            font=("Segoe UI", 9),
+            activebackground=self.bg_color,
+            activeforeground=self.fg_color
+        ).pack(anchor="center")
+
+        tk.Checkbutton(
+            self.main_frame,
+            text=f"Receive sessions from rigs (port {DEFAULT_INGEST_PORT})",
+            variable=self.accept_ingest,
+            command=self.toggle_ingest,
+            bg=self.bg_color,
+            fg=self.fg_color,
+            selectcolor=self.accent_color,
+            font=("Segoe UI", 9),
+            activebackground=self.bg_color,
+            activeforeground=self.fg_color
+        ).pack(anchor="center")
+
         self.selected_days_label = tk.Label(
             self.main_frame,
             text="No days selected",
@@ -79,7 +176,52 @@ class MouseWeightGUI:
             fg="white",
             activebackground=self.button_hover,
             font=("Segoe UI", 10)
-        ).pack(pady=10)
+        ).pack(pady=(10, 5))
+
+        # Weekly / monthly summaries of the weight plot
+        aggregate_frame = tk.Frame(self.main_frame, bg=self.bg_color)
+        aggregate_frame.pack(anchor="center", pady=(0, 10))
+        self.aggregate_period = tk.StringVar(value="none")
+        self.aggregate_how = tk.StringVar(value="mean")
+        tk.Label(aggregate_frame, text="Aggregate by:", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 10)).pack(side="left")
+        for variable, choices in (
+            (self.aggregate_period, ("none",) + RESAMPLE_PERIODS),
+            (self.aggregate_how, RESAMPLE_HOWS),
+        ):
+            menu = tk.OptionMenu(aggregate_frame, variable, *choices)
+            menu.config(
+                bg=self.accent_color,
+                fg="white",
+                activebackground=self.button_hover,
+                activeforeground="white",
+                font=("Segoe UI", 9),
+                highlightthickness=0
+            )
+            menu.pack(side="left", padx=5)
+
+        heatmap_frame = tk.Frame(self.main_frame, bg=self.bg_color)
+        heatmap_frame.pack(anchor="center", pady=(0, 10))
+        self.heatmap_sort = tk.StringVar(value="name")
+        tk.Button(
+            heatmap_frame,
+            text="Cohort heatmap",
+            command=self.plot_cohort,
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            font=("Segoe UI", 10)
+        ).pack(side="left", padx=(0, 5))
+        tk.Label(heatmap_frame, text="Sort rows by:", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 10)).pack(side="left")
+        sort_menu = tk.OptionMenu(heatmap_frame, self.heatmap_sort, *SORT_ORDERS)
+        sort_menu.config(
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            activeforeground="white",
+            font=("Segoe UI", 9),
+            highlightthickness=0
+        )
+        sort_menu.pack(side="left", padx=5)
 
         # Save format selection and button
         save_format_frame = tk.Frame(self.main_frame, bg=self.bg_color)
@@ -99,7 +241,9 @@ class MouseWeightGUI:
             save_format_frame,
             self.save_format,
             "mat",
-            "npy"
+            "npy",
+            "csv",
+            "tsv"
         )
         format_menu.config(
             bg=self.accent_color,
@@ -187,6 +331,51 @@ class MouseWeightGUI:
             font=("Segoe UI", 9)
         ).pack(side="left")
 
+        # ---- Date matching UI (single files that carry dates) ----
+        self.date_join_frame = tk.Frame(self.external_frame, bg=self.bg_color)
+        self.match_by_date = tk.BooleanVar(value=False)
+        self.date_join_mode = tk.StringVar(value="nan")
+
+        tk.Checkbutton(
+            self.date_join_frame,
+            text="Match values by date",
+            variable=self.match_by_date,
+            bg=self.bg_color,
+            fg=self.fg_color,
+            selectcolor=self.accent_color,
+            font=("Segoe UI", 10),
+            activebackground=self.bg_color,
+            activeforeground=self.fg_color
+        ).pack(side="left")
+        tk.Label(self.date_join_frame, text="Missing days:", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 10)).pack(side="left", padx=(10, 0))
+        join_menu = tk.OptionMenu(self.date_join_frame, self.date_join_mode, *JOIN_MODES)
+        join_menu.config(
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            activeforeground="white",
+            font=("Segoe UI", 9),
+            highlightthickness=0
+        )
+        join_menu.pack(side="left", padx=5)
+
+        # ---- Correlation matrix UI (single files with several variables) ----
+        self.correlation_frame = tk.Frame(self.external_frame, bg=self.bg_color)
+        self.correlation_result = None
+        for text, command in (
+            ("Correlation matrix", self.plot_correlations),
+            ("Save correlation table", self.save_correlation_table),
+        ):
+            tk.Button(
+                self.correlation_frame,
+                text=text,
+                command=command,
+                bg=self.accent_color,
+                fg="white",
+                activebackground=self.button_hover,
+                font=("Segoe UI", 9)
+            ).pack(side="left", padx=(0, 5))
+
         # ---- Daily file UI ----
         self.daily_filename_frame = tk.Frame(self.external_frame, bg=self.bg_color)
 
@@ -207,10 +396,39 @@ class MouseWeightGUI:
         self.external_filename_entry.bind("<FocusIn>", self._clear_placeholder)
         self.external_filename_entry.bind("<FocusOut>", self._restore_placeholder)
 
+        # ---- Per-trial reduction UI (daily files holding many values) ----
+        self.reduce_frame = tk.Frame(self.external_frame, bg=self.bg_color)
+        self.daily_reduce = tk.StringVar(value="none")
+        self.reduce_threshold = tk.StringVar()
+
+        tk.Label(self.reduce_frame, text="Per-trial reduction:", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 10)).pack(side="left")
+        reduce_menu = tk.OptionMenu(self.reduce_frame, self.daily_reduce, "none", *REDUCTIONS)
+        reduce_menu.config(
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            activeforeground="white",
+            font=("Segoe UI", 9),
+            highlightthickness=0
+        )
+        reduce_menu.pack(side="left", padx=5)
+        tk.Label(self.reduce_frame, text="Threshold:", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 10)).pack(side="left")
+        tk.Entry(
+            self.reduce_frame,
+            textvariable=self.reduce_threshold,
+            width=8,
+            bg="#34495e",
+            fg=self.fg_color,
+            insertbackground=self.fg_color
+        ).pack(side="left", padx=5)
+
         self.show_regression = tk.BooleanVar(value=False)
+        self.regression_method = tk.StringVar(value="linear")
+        regression_frame = tk.Frame(self.external_frame, bg=self.bg_color)
+        regression_frame.pack(anchor="w", pady=(10, 0))
         tk.Checkbutton(
-            self.external_frame,
-            text="Show linear regression",
+            regression_frame,
+            text="Show regression",
             variable=self.show_regression,
             bg=self.bg_color,
             fg=self.fg_color,
@@ -218,12 +436,26 @@ class MouseWeightGUI:
             font=("Segoe UI", 10),
             activebackground=self.bg_color,
             activeforeground=self.fg_color
-        ).pack(anchor="w", pady=(10, 0))
+        ).pack(side="left")
+        regression_menu = tk.OptionMenu(regression_frame, self.regression_method, *REGRESSION_METHODS)
+        regression_menu.config(
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            activeforeground="white",
+            font=("Segoe UI", 9),
+            highlightthickness=0
+        )
+        regression_menu.pack(side="left", padx=5)
 
         self.mark_outliers = tk.BooleanVar(value=False)
+        self.outlier_method = tk.StringVar(value="zscore")
+        self.outlier_window = tk.IntVar(value=ROLLING_WINDOW)
+        outlier_frame = tk.Frame(self.external_frame, bg=self.bg_color)
+        outlier_frame.pack(anchor="w", pady=(10, 0))
         tk.Checkbutton(
-            self.external_frame,
-            text="Mark outliers (z-score)",
+            outlier_frame,
+            text="Mark outliers",
             variable=self.mark_outliers,
             bg=self.bg_color,
             fg=self.fg_color,
@@ -231,9 +463,35 @@ class MouseWeightGUI:
             font=("Segoe UI", 10),
             activebackground=self.bg_color,
             activeforeground=self.fg_color
-        ).pack(anchor="w", pady=(10, 0))
+        ).pack(side="left")
+        outlier_menu = tk.OptionMenu(outlier_frame, self.outlier_method, *OUTLIER_METHODS)
+        outlier_menu.config(
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            activeforeground="white",
+            font=("Segoe UI", 9),
+            highlightthickness=0
+        )
+        outlier_menu.pack(side="left", padx=5)
+        tk.Label(outlier_frame, text="Window (sessions):", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 10)).pack(side="left")
+        tk.Spinbox(
+            outlier_frame,
+            from_=3,
+            to=365,
+            increment=2,
+            width=4,
+            textvariable=self.outlier_window,
+            bg="#34495e",
+            fg=self.fg_color,
+            insertbackground=self.fg_color,
+            font=("Segoe UI", 10),
+            relief="solid",
+            bd=1
+        ).pack(side="left", padx=5)
 
         self.outlier_thresh = tk.DoubleVar(value=3.0)
+        self.outlier_thresh.trace_add("write", self._on_threshold_change)
         thresh_frame = tk.Frame(self.external_frame, bg=self.bg_color)
         thresh_frame.pack(anchor="w", pady=(5, 0))
         
@@ -271,6 +529,42 @@ class MouseWeightGUI:
             font=("Segoe UI", 10)
         )
 
+        # ---- Lagged correlation (packed after the plot button) ----
+        self.max_lag = tk.IntVar(value=MAX_LAG)
+        self.lag_frame = tk.Frame(self.external_container, bg=self.bg_color)
+        tk.Button(
+            self.lag_frame,
+            text="Lagged correlation",
+            command=self.plot_lagged,
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            font=("Segoe UI", 10)
+        ).pack(side="left")
+        tk.Label(self.lag_frame, text="Max lag (days):", bg=self.bg_color, fg=self.fg_color, font=("Segoe UI", 10)).pack(side="left", padx=(10, 0))
+        tk.Spinbox(
+            self.lag_frame,
+            from_=1,
+            to=60,
+            width=4,
+            textvariable=self.max_lag,
+            bg="#34495e",
+            fg=self.fg_color,
+            insertbackground=self.fg_color,
+            font=("Segoe UI", 10),
+            relief="solid",
+            bd=1
+        ).pack(side="left", padx=5)
+
+        self.cache_label = tk.Label(
+            self.root,
+            text=default_cache.summary(),
+            bg=self.bg_color,
+            fg="#95a5a6",
+            font=("Segoe UI", 8)
+        )
+        self.cache_label.pack(side="bottom", anchor="e", padx=10, pady=(0, 5))
+
     def _clear_placeholder(self, event):
         if self.external_filename_entry.get() == self.daily_placeholder:
             self.external_filename_entry.delete(0, "end")
@@ -298,11 +592,17 @@ class MouseWeightGUI:
     def update_external_ui(self):
         self.single_file_frame.pack_forget()
         self.daily_filename_frame.pack_forget()
+        self.reduce_frame.pack_forget()
+        self.date_join_frame.pack_forget()
+        self.correlation_frame.pack_forget()
 
         if self.external_mode.get() == "single":
             self.single_file_frame.pack(anchor="w", pady=3)
+            self.date_join_frame.pack(anchor="w", pady=3, after=self.single_file_frame)
+            self.correlation_frame.pack(anchor="w", pady=3, after=self.date_join_frame)
         elif self.external_mode.get() == "daily":
             self.daily_filename_frame.pack(anchor="w", pady=3)
+            self.reduce_frame.pack(anchor="w", pady=3, after=self.daily_filename_frame)
 
 
     def browse_folder(self):
@@ -310,12 +610,24 @@ class MouseWeightGUI:
         if path:
             self.base_path.set(path)
 
+    def browse_archive(self):
+        path = filedialog.askopenfilename(
+            title="Select archived base folder",
+            filetypes=[
+                ("Archives", "*.zip *.tar *.tar.gz *.tgz *.tar.bz2 *.tar.xz"),
+                ("All files", "*.*")
+            ]
+        )
+        if path:
+            self.base_path.set(path)
+
     def toggle_external_options(self):
         if self.use_external.get():
             self.external_container.pack(anchor="center", pady=5)
             self.external_frame.pack(anchor="w")
             self.update_external_ui()
             self.plot_external_button.pack(anchor="w", pady=(5, 0))
+            self.lag_frame.pack(anchor="w", pady=(5, 0))
         else:
             self.external_container.pack_forget()
 
@@ -325,49 +637,420 @@ class MouseWeightGUI:
             return
         self.process_data()
 
-    def plot_with_external(self):
+    def _load_external(self):
+        """Load the selected days and their external values.
+
+        Returns:
+            (table, values), or None after telling the user what is missing
+        """
         if not self.selected_days:
             messagebox.showerror(
                 "No days selected",
                 "Please load and confirm days to process."
             )
-            return
+            return None
 
         mode = self.external_mode.get()
+        table = None
+        if mode == "single" and self.match_by_date.get():
+            value_dates, values = load_dated_values_file(self.single_values_file.get())
+            if value_dates is None:
+                raise ValueError("The values file has no dates to match")
+            table = self._load_table(self.selected_days)
+            keep, values = join_by_date(
+                table.dates, value_dates, values, how=self.date_join_mode.get()
+            )
+            table = table[keep]
 
-        try:
-            if mode == "single":
-                values = load_single_values_file(
-                    self.single_values_file.get()
+        elif mode == "single":
+            values = self._load_cached(
+                "single_values",
+                [self.single_values_file.get()] if self.single_values_file.get() else [],
+                lambda: load_single_values_file(self.single_values_file.get())
+            )
+
+        elif mode == "daily":
+            filename = self.external_filename_entry.get().strip()
+
+            if (
+                not filename
+                or filename == self.daily_placeholder
+            ):
+                messagebox.showerror(
+                    "Missing input",
+                    "Please enter a daily external data filename."
                 )
+                return None
 
-            elif mode == "daily":
-                filename = self.external_filename_entry.get().strip()
+            reduce = self.daily_reduce.get()
+            reduce = None if reduce == "none" else reduce
+            threshold = self.reduce_threshold.get().strip()
+            threshold = float(threshold) if threshold else None
 
-                if (
-                    not filename
-                    or filename == self.daily_placeholder
-                ):
-                    messagebox.showerror(
-                        "Missing input",
-                        "Please enter a daily external data filename."
+            if self.remote_table is not None:
+                values = self._load_remote_values(filename, reduce)
+                if values is None:
+                    return None
+            else:
+                values = self._load_cached(
+                    f"daily_values:{reduce}:{threshold}",
+                    [d / filename for d in self.selected_days if (d / filename).exists()],
+                    lambda: load_daily_values_files(
+                        self.selected_days, filename, reduce=reduce, threshold=threshold
                     )
-                    return
+                )
 
-                values = load_daily_values_files(
-                    self.selected_days,
-                    filename
+        else:
+            raise RuntimeError("Unknown external data mode")
+
+        if table is None:
+            table = self._load_table(self.selected_days)
+        self._update_cache_label()
+        return table, values
+
+    def plot_with_external(self):
+        try:
+            loaded = self._load_external()
+            if loaded is None:
+                return
+            table, values = loaded
+            self.external_plot = plot_weight_vs_external(
+                table,
+                values,
+                show_regression=self.show_regression.get(),
+                mark_outliers=self.mark_outliers.get(),
+                z_thresh=self.outlier_thresh.get(),
+                regression=self.regression_method.get(),
+                outlier_method=self.outlier_method.get(),
+                window=self.outlier_window.get(),
+                on_select=lambda i: self.open_expdetails(table.day_folders[i]),
+                block=False
+            )
+            self.save_snapshot()
+
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def plot_lagged(self):
+        """Plot r of weight vs external values against the lag in days."""
+        try:
+            loaded = self._load_external()
+            if loaded is None:
+                return
+            table, values = loaded
+            result = lagged_correlation(table, values, max_lag=self.max_lag.get())
+            plot_lagged_correlation(result, block=False)
+            self.save_snapshot()
+
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def plot_correlations(self):
+        """Correlate the weight with every variable of the values file."""
+        if not self.selected_days:
+            messagebox.showerror(
+                "No days selected",
+                "Please load and confirm days to process."
+            )
+            return
+
+        try:
+            value_dates, names, values = load_multi_values_file(self.single_values_file.get())
+            table = self._load_table(self.selected_days)
+            if self.match_by_date.get():
+                if value_dates is None:
+                    raise ValueError("The values file has no dates to match")
+                keep, values = join_by_date(
+                    table.dates, value_dates, values, how=self.date_join_mode.get()
                 )
+                table = table[keep]
 
-            else:
-                raise RuntimeError("Unknown external data mode")
+            self.correlation_result = correlate_variables(table, values, names)
+            self._update_cache_label()
+            plot_correlation_matrix(self.correlation_result, block=False)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
 
-            weights = load_weights_for_selected_days(self.selected_days)
-            plot_weight_vs_external(weights, values, show_regression=self.show_regression.get(), mark_outliers=self.mark_outliers.get(), z_thresh=self.outlier_thresh.get())
+    def save_correlation_table(self):
+        """Save r, p and FDR q of every pair of the last correlation matrix."""
+        if self.correlation_result is None:
+            messagebox.showerror("Error", "Please compute a correlation matrix first.")
+            return
 
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            initialfile=f"correlations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            filetypes=[("CSV files", "*.csv"), ("TSV files", "*.tsv"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            export_correlations(self.correlation_result, file_path)
+            messagebox.showinfo("Success", f"Correlations saved to:\n{file_path}")
+        except Exception as e:
+            messagebox.showerror("Save Error", f"Failed to save correlations:\n{str(e)}")
+
+    def _on_threshold_change(self, *_):
+        """Re-mark outliers of the open plot while the threshold is changed."""
+        plot = self.external_plot
+        if plot is None or not plt.fignum_exists(plot.ax.figure.number):
+            return
+        try:
+            z_thresh = self.outlier_thresh.get()
+        except tk.TclError:
+            return  # partially typed value
+        plot.set_threshold(z_thresh)
+
+    def open_expdetails(self, day_folder):
+        """Open a day's ExpDetails file (clicked point) in the default viewer."""
+        try:
+            txt_file = find_expdetails_file(day_folder)
+            if isinstance(txt_file, ArchivePath):
+                # Archive members have no file to open, show the text instead
+                messagebox.showinfo(txt_file.name, txt_file.read_text())
+            elif sys.platform.startswith("win"):
+                os.startfile(txt_file)
+            else:
+                opener = "open" if sys.platform == "darwin" else "xdg-open"
+                subprocess.Popen([opener, str(txt_file)])
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def _remote_indices(self, days):
+        selected = set(days)
+        return [i for i, d in enumerate(self.remote_table.day_folders) if d in selected]
+
+    def _load_remote_values(self, filename, reduce):
+        """Daily values of the selected days from the weight service.
+
+        The day folders are paths on the server, so the files are not opened here.
+        """
+        if reduce is not None:
+            messagebox.showerror(
+                "Not supported",
+                "Reducing per-trial values is not available for a weight service.\n"
+                "Set the reduction to 'none'."
+            )
+            return None
+        values = self.remote_client.daily_values(self.remote_animal, filename)
+        return values[self._remote_indices(self.selected_days)].tolist()
+
+    def _load_cached(self, kind, files, load):
+        """Load through the shared cache, keyed by the files' size and mtime."""
+        fingerprint = file_fingerprint(files)
+        value = default_cache.get_or_compute(content_hash(kind, fingerprint), load)
+        # Kept for the session snapshot
+        self.loaded_files[kind] = (fingerprint, value)
+        return value
+
+    def _load_table(self, days):
+        """Load the selected days into a SessionTable, reusing cached results."""
+        if self.remote_table is not None:
+            table = self.remote_table[self._remote_indices(days)]
+        elif self.tolerant_loading.get():
+            weights, report = load_weights_tolerant(days, checkpoint_path=self._checkpoint_path())
+            if not report.ok:
+                messagebox.showwarning("Some days failed to load", report.summary())
+            table = SessionTable.from_day_folders(days, weights=weights)
+        else:
+            files = [find_expdetails_file(d) for d in days]
+            table = self._load_cached(
+                "session_table",
+                files,
+                lambda: SessionTable.from_day_folders(days, weights=load_weights_for_selected_days(days))
+            )
+
+        # Kept so exports can reuse what was just plotted
+        self.loaded_table = table
+        self.loaded_fingerprint = (
+            None if self.remote_table is not None else self._expdetails_fingerprint(days)
+        )
+        return table
+
+    @staticmethod
+    def _expdetails_fingerprint(days):
+        files = []
+        for day in days:
+            try:
+                files.append(find_expdetails_file(day))
+            except FileNotFoundError:
+                continue
+        return file_fingerprint(files)
+
+    def _checkpoint_path(self):
+        """Checkpoint file of tolerant loads, one per base folder."""
+        base = str(Path(self.base_path.get()).resolve())
+        return CHECKPOINT_DIR / f"{content_hash(base)[:16]}.json"
+
+    def save_snapshot(self):
+        """Save the session so the next launch starts where this one ended."""
+        if self.remote_table is not None or not self.selected_days:
+            return
+
+        settings = {}
+        for name in SNAPSHOT_SETTINGS:
+            try:
+                settings[name] = getattr(self, name).get()
+            except tk.TclError:
+                continue  # e.g. a spinbox left empty; restore keeps the default
+        daily_filename = self.external_filename_entry.get().strip()
+        settings["daily_filename"] = "" if daily_filename == self.daily_placeholder else daily_filename
+
+        snapshot = SessionSnapshot(self.base_path.get(), self.selected_days, settings)
+        if self.loaded_table is not None:
+            snapshot.record_table(self.loaded_table)
+        for kind, (fingerprint, values) in self.loaded_files.items():
+            if kind != "session_table":
+                snapshot.record_external(kind, fingerprint, values)
+        try:
+            snapshot.save(self.snapshot_path)
+        except (OSError, TypeError, ValueError):
+            pass  # without a snapshot the next launch just starts empty
+
+    def restore_snapshot(self):
+        """Restore the last session right away and check its files in the background.
+
+        Returns:
+            True if a snapshot was restored
+        """
+        snapshot = SessionSnapshot.load(self.snapshot_path)
+        if snapshot is None:
+            return False
+
+        self.base_path.set(snapshot.base_path)
+        for name, value in snapshot.settings.items():
+            if name in SNAPSHOT_SETTINGS:
+                try:
+                    getattr(self, name).set(value)
+                except tk.TclError:
+                    pass
+        if snapshot.settings.get("daily_filename"):
+            self.external_filename_entry.delete(0, "end")
+            self.external_filename_entry.insert(0, snapshot.settings["daily_filename"])
+            self.external_filename_entry.config(fg="black")
+        self.toggle_external_options()
+
+        if snapshot.days:
+            self.selected_days = list(snapshot.days)
+            self._show_selected_days()
+            self.loaded_table = snapshot.table()
+            self.loaded_fingerprint = None  # known once the files are checked
+            self.cache_label.config(text="Restored last session, checking files...")
+
+            results = queue.Queue()
+
+            def verify():
+                try:
+                    results.put((snapshot.verify(), snapshot.verified_external()))
+                except Exception as e:
+                    results.put(e)
+
+            threading.Thread(target=verify, daemon=True).start()
+            self.root.after(100, self._finish_restore, snapshot, results)
+        return True
+
+    def _finish_restore(self, snapshot, results):
+        """Apply the background check of a restored snapshot (polled from the Tk loop)."""
+        try:
+            result = results.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._finish_restore, snapshot, results)
+            return
+
+        current = self.selected_days == snapshot.days
+        if isinstance(result, Exception):
+            if current:
+                self.loaded_table = None
+            self.cache_label.config(text=f"Last session's files could not be checked: {result}")
+            return
+
+        (table, fingerprint, refreshed), external = result
+        # Seed the cache, so loading these files again does not parse them
+        default_cache.put(content_hash("session_table", fingerprint), table)
+        for kind, (files_fingerprint, values) in external.items():
+            default_cache.put(content_hash(kind, files_fingerprint), values)
+            self.loaded_files.setdefault(kind, (files_fingerprint, values))
+        if current:
+            self.loaded_table = table
+            self.loaded_fingerprint = [tuple(f) for f in fingerprint]
+        self.cache_label.config(
+            text=f"Restored last session ({len(refreshed)} of {len(snapshot.days)} days re-read)"
+        )
+
+    def on_close(self):
+        try:
+            self.save_snapshot()
+        finally:
+            self._stop_ingest()
+            self.root.destroy()
+
+    def toggle_ingest(self):
+        """Start or stop accepting sessions pushed by the rig software."""
+        if not self.accept_ingest.get():
+            self._stop_ingest()
+            self.cache_label.config(text="Stopped receiving rig sessions")
+            return
+
+        hub = IngestHub(DEFAULT_INDEX_PATH)
+        # Called on server threads; Tk is only touched from _poll_ingest
+        hub.subscribe(self.ingest_queue.put)
+        try:
+            self.ingest_server = start_ingest_server(hub, port=DEFAULT_INGEST_PORT)
+        except OSError as e:
+            self.accept_ingest.set(False)
+            messagebox.showerror("Error", f"Cannot receive rig sessions:\n{e}")
+            return
+        self.ingest_hub = hub
+        self.cache_label.config(text=f"Receiving rig sessions on port {DEFAULT_INGEST_PORT}")
+        self.root.after(100, self._poll_ingest)
+
+    def _stop_ingest(self):
+        if self.ingest_server is not None:
+            self.ingest_server.shutdown()
+            self.ingest_server.server_close()
+            self.ingest_server = None
+
+    def _poll_ingest(self):
+        """Hand sessions received on server threads to the open views."""
+        while True:
+            try:
+                record = self.ingest_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._on_session_received(record)
+            except Exception:
+                # A session the views cannot show must not stop the polling
+                continue
+        if self.ingest_server is not None:
+            self.root.after(100, self._poll_ingest)
+
+    def _on_session_received(self, record):
+        date = f"{record['date'][:4]}-{record['date'][4:6]}-{record['date'][6:]}"
+        self.cache_label.config(text=f"Received {record['animal']} {date}: {record['weight']}%")
+        # Exports and re-plots must not reuse a table that misses the session
+        self.loaded_table = None
+
+        if self.live_weights is None:
+            return
+        animal, ax = self.live_weights
+        if record["animal"] != animal or not plt.fignum_exists(ax.figure.number):
+            return
+        line = ax.lines[0]
+        dates = np.asarray(line.get_xdata(), dtype="datetime64[D]")
+        weights = np.asarray(line.get_ydata(), dtype=float)
+        keep = dates != np.datetime64(date)
+        dates = np.append(dates[keep], np.datetime64(date))
+        weights = np.append(weights[keep], record["weight"])
+        order = np.argsort(dates, kind="stable")
+        line.set_data(dates[order], weights[order])
+        ax.relim()
+        ax.autoscale_view()
+        ax.figure.canvas.draw_idle()
+
+    def _update_cache_label(self):
+        self.cache_label.config(text=default_cache.summary())
+
 
 
     def load_days(self):
@@ -377,7 +1060,14 @@ class MouseWeightGUI:
             return
 
         try:
-            self.day_folders = find_day_folders(base_path)
+            if is_service_url(base_path):
+                # Weights come pre-parsed from a running weight service
+                self.remote_client, self.remote_animal = remote_source(base_path)
+                self.remote_table = self.remote_client.table(self.remote_animal)
+                self.day_folders = self.remote_table.day_folders
+            else:
+                self.remote_table = None
+                self.day_folders = find_day_folders(base_path)
             self.open_day_selector()
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -396,8 +1086,39 @@ class MouseWeightGUI:
     def open_day_selector(self):
         popup = tk.Toplevel(self.root)
         popup.title("Select Days to Process")
-        popup.geometry("350x400")
+        popup.geometry("350x460")
         popup.configure(bg=self.bg_color)
+
+        # Filter row: pre-selects days matching a query on the session index
+        filter_frame = tk.Frame(popup, bg=self.bg_color)
+        filter_frame.pack(fill="x", padx=10, pady=(10, 0))
+
+        tk.Label(
+            filter_frame,
+            text="Filter:",
+            bg=self.bg_color,
+            fg=self.fg_color,
+            font=("Segoe UI", 10)
+        ).pack(side="left")
+
+        tk.Entry(
+            filter_frame,
+            textvariable=self.day_filter,
+            width=25,
+            bg="#34495e",
+            fg=self.fg_color,
+            insertbackground=self.fg_color
+        ).pack(side="left", padx=5)
+
+        tk.Button(
+            filter_frame,
+            text="Apply",
+            command=lambda: self.apply_day_filter(self.day_filter.get()),
+            bg=self.accent_color,
+            fg="white",
+            activebackground=self.button_hover,
+            font=("Segoe UI", 9)
+        ).pack(side="left")
         
         # Scrollable frame for checkboxes
         canvas_frame = tk.Frame(popup, bg=self.bg_color)
@@ -449,6 +1170,27 @@ class MouseWeightGUI:
         ok_button.pack(pady=10)
 
 
+    def apply_day_filter(self, query_text):
+        """Tick only the days whose indexed ExpDetails match the filter."""
+        if not query_text.strip():
+            for var in self.day_vars.values():
+                var.set(True)
+            return
+
+        try:
+            query = parse_query(query_text)
+            if self.session_index is None:
+                self.session_index = SessionIndex()
+            self.session_index.update(self.day_folders)
+            matches = {row["day_path"] for row in self.session_index.query(**query)}
+        except Exception as e:
+            messagebox.showerror("Filter Error", str(e))
+            return
+
+        for folder, var in self.day_vars.items():
+            var.set(str(folder) in matches)
+
+
     def confirm_day_selection(self, popup):
         popup.destroy()
 
@@ -459,6 +1201,10 @@ class MouseWeightGUI:
             self.selected_days_label.config(text="No days selected", fg="gray")
             return
 
+        self._show_selected_days()
+        self.save_snapshot()
+
+    def _show_selected_days(self):
         dates = [d.name for d in self.selected_days]
         self.selected_days_label.config(
             text="Selected days: " + ", ".join(dates),
@@ -471,19 +1217,48 @@ class MouseWeightGUI:
         self.plot_weight_only()
 
 
+    def plot_cohort(self):
+        """Heatmap of every animal of the cohort in the base folder."""
+        base_path = self.base_path.get()
+        if not base_path:
+            messagebox.showerror("Error", "Please select a cohort folder first.")
+            return
+
+        try:
+            days = [d for a in find_animal_folders(base_path) for d in find_day_folders(a)]
+            files = [find_expdetails_file(d) for d in days]
+            key = content_hash("cohort_table", file_fingerprint(files))
+            table = default_cache.get_or_compute(key, lambda: SessionTable.from_cohort(base_path))
+            self._update_cache_label()
+            plot_cohort_heatmap(table, sort=self.heatmap_sort.get())
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+
     def process_data(self):
         selected_days = self.selected_days
-        dates = [d.name for d in selected_days]
-
 
         if not selected_days:
             messagebox.showerror("Error", "No days selected")
             return
 
         try:
-            weights = load_weights_for_selected_days(self.selected_days)
-
-            plot_weights_vs_days(weights, dates=dates)
+            table = self._load_table(self.selected_days)
+            self._update_cache_label()
+
+            self.save_snapshot()
+
+            period = self.aggregate_period.get()
+            if period == "none" and self.ingest_server is not None and len(table.animal_names) == 1:
+                # Sessions pushed by the rigs are added to this plot as they arrive
+                ax = plot_weights_vs_days(table, block=False)
+                self.live_weights = (table.animal_names[0], ax)
+            elif period == "none":
+                plot_weights_vs_days(table)
+            else:
+                how = self.aggregate_how.get()
+                ylabel = f"Sessions per {period}" if how == "count" else f"Weight (%), {period}ly {how}"
+                plot_weights_vs_days(table.resample(period, how), ylabel=ylabel)
 
         except Exception as e:
             messagebox.showerror("Processing Error", str(e))
@@ -521,6 +1296,8 @@ class MouseWeightGUI:
         ...
 
     • Subfolder names must be dates in YYYYMMDD format
+    • The base folder can also be a weight service URL, e.g. http://127.0.0.1:8765/IP75
+    • Or a .zip / .tar.gz archive of the base folder (files are read without extracting)
     • Each subfolder must contain exactly one *.txt file that its name include 'ExpDetails'
 
 
@@ -541,21 +1318,104 @@ class MouseWeightGUI:
     -------------------------------
     Option 1: One file with all values
     • Provide a .npy / .pkl / .mat file
-    • Number of values must match number of selected days
+    • Number of values must match number of selected days, unless values are matched by date
+    • Match by date: the file also holds a 'dates' variable (.npz / .mat / dict) or is a
+      two-column array of YYYYMMDD dates and values
+    • Missing days: 'inner' drops days without a value, 'nan' keeps them as gaps
+    • Correlation matrix: a file with several variables (one entry per variable in a
+      .npz / .mat / dict, or one column each) is correlated against BW% in one step;
+      '*' marks pairs with Benjamini-Hochberg FDR q < 0.05. 'Save correlation table'
+      writes n, r, p and q of every pair to CSV/TSV
 
     Option 2: One file per day
     • Provide a filename (e.g. daily_values.npy)
     • File must exist in each selected day folder
-    • Each file must contain a single numeric value
+    • Each file must contain a single numeric value, unless a per-trial reduction is chosen
+    • Reductions: mean, median, sum, fraction_above (uses the threshold)
+    • Large .npy files are memory-mapped and reduced in chunks
 
 
-    OUTLIERS DETECTION
-    --------------------------
-    • When enabled, outliers in weight data are marked on the plot
-    • Outliers are detected using z-score method
-    • Adjust the threshold as needed (default is 3.0)
-    • Threshold is the number of standard deviations from the mean that defines an outlier
-    • Higher threshold = fewer outliers detected
+    REGRESSION
+    ------------------------
+    • linear: least squares fit
+    • theil_sen: median of pairwise slopes, robust to artifact days
+    • siegel: repeated medians, robust to up to half the points being off
+
+
+    OUTLIERS
+    ------------------------
+    • When enabled, outlier days are marked on the weight vs external plot
+    • The threshold is the score above which a day is an outlier (default 3.0);
+      a higher threshold marks fewer outliers
+    • Changing the outlier threshold updates the open plot immediately
+    • zscore: days far from the mean of all selected days
+    • rolling: days far from the median of the surrounding window sessions
+      (robust z-score from the rolling MAD), so a drifting baseline is not flagged
+
+
+    LAGGED CORRELATION
+    ------------------------
+    • 'Lagged correlation' plots Pearson r for the external value shifted by
+      -max lag ... +max lag calendar days (positive: external value after the weight)
+    • Lags count real calendar days, gaps between sessions are not skipped over
+    • The lag with the strongest correlation is circled
+
+
+    INSPECTING POINTS
+    ------------------------
+    • Hover a point in the weight vs external plot to see its date, values and z-scores
+    • Click a point to open that day's ExpDetails file
+
+
+    WEEKLY / MONTHLY SUMMARIES
+    ------------------------
+    • 'Aggregate by' week or month plots one point per period (weeks start on Monday)
+    • mean / min / max / last weight of the period, or the number of sessions (count)
+
+
+    COHORT HEATMAP
+    ------------------------
+    • Set the base folder to a cohort folder (one folder per animal) and click 'Cohort heatmap'
+    • Rows are animals, columns are calendar days, colour is BW%; gray cells have no session
+    • Sort rows by name, latest weight, or cluster animals with similar trajectories
+
+
+    SESSIONS FROM RIGS
+    ------------------------
+    • 'Receive sessions from rigs' accepts sessions posted by the rig software
+      (python ingest.py send ...) on localhost, without scanning folders
+    • A weight vs days plot opened while receiving gets new sessions of its animal live
+    • Received sessions are added to the session index, so day filters find them
+
+
+    LAST SESSION
+    ------------------------
+    • The base folder, selected days, settings and loaded values are saved when days are
+      selected, after plotting and on exit
+    • The next launch restores them at once; changed files are re-read in the background
+
+
+    FILTERING DAYS
+    -------------------
+    • The day selector has a filter that pre-selects matching days
+    • Terms are separated by commas, e.g.: frame_rate = 30, BW < 80, last_days = 30
+    • Any 'Name: value' line of the ExpDetails file can be used (lowercase, spaces as '_')
+    • Parsed files are kept in an index, so repeated filtering does not re-read them
+
+
+    FAILED DAYS
+    ----------------
+    • By default, loading stops at the first day with a missing or invalid ExpDetails file
+    • With 'Skip days that fail to load', failing days are listed in a report and left out
+    • Parsed days are checkpointed, so after fixing a file only the failed days are re-read
+
+
+    CACHING
+    -----------
+    • Loaded values and computed statistics are cached in memory
+    • Re-plotting unchanged data (e.g. after toggling regression) is instant
+    • Files are re-read automatically when their size or modification time changes
+    • Cache hits and misses are shown in the bottom-right corner
     """
 
         text.insert("1.0", instructions)
@@ -569,14 +1429,30 @@ class MouseWeightGUI:
             return
         
         try:
+            if self.remote_table is not None:
+                # Day folders are paths on the service's machine
+                self.save_extracted_weights(self._load_table(self.selected_days))
+                return
+            if (
+                self.loaded_table is not None
+                and self.loaded_table.day_folders == list(self.selected_days)
+                and self.loaded_fingerprint is not None
+                and self.loaded_fingerprint == self._expdetails_fingerprint(self.selected_days)
+            ):
+                self.save_extracted_weights(self.loaded_table)
+                return
+
             weights = load_weights_for_selected_days(self.selected_days)
             self.save_extracted_weights(weights, self.selected_days)
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
 
-    def save_extracted_weights(self, weights, selected_days):
-        """Save extracted weights in the selected format."""
+    def save_extracted_weights(self, weights, selected_days=None):
+        """Save extracted weights in the selected format.
+
+        weights may also be a SessionTable, in which case selected_days is not needed.
+        """
         
         save_format = self.save_format.get()
         
@@ -585,11 +1461,31 @@ class MouseWeightGUI:
         default_filename = f"weights_{timestamp}"
 
         # Create data to save
-        dates = [d.name for d in selected_days]
-        data = {"weights": weights, "dates": np.array(dates, dtype=object)}
+        if isinstance(weights, SessionTable):
+            data = weights.to_dict()
+        else:
+            dates = [d.name for d in selected_days]
+            data = {"weights": weights, "dates": np.array(dates, dtype=object)}
         
         try:
-            if save_format == "mat":
+            if save_format in ("csv", "tsv"):
+                # Stream rows straight to a delimited text file
+                file_path = filedialog.asksaveasfilename(
+                    defaultextension="." + save_format,
+                    initialfile=default_filename + "." + save_format,
+                    filetypes=[(save_format.upper() + " files", "*." + save_format), ("All files", "*.*")]
+                )
+                if file_path:
+                    # Same layout as the cohort export, however the weights were loaded
+                    table = weights if isinstance(weights, SessionTable) else (
+                        SessionTable.from_day_folders(selected_days, weights=weights)
+                    )
+                    write_delimited(
+                        file_path, iter_table_rows(table), HEADER, "\t" if save_format == "tsv" else ","
+                    )
+                    messagebox.showinfo("Success", f"Weights saved to:\n{file_path}")
+
+            elif save_format == "mat":
                 # Save as MATLAB file
                 file_path = filedialog.asksaveasfilename(
                     defaultextension=".mat",
@@ -0,0 +1,166 @@
+import warnings
+
+import matplotlib
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+from scipy.cluster.hierarchy import leaves_list, linkage
+
+from plotter import new_figure
+
+SORT_ORDERS = ("name", "latest", "cluster")
+
+
+def cohort_matrix(table):
+    """Arrange a cohort SessionTable as an animals x calendar days matrix.
+
+    Columns cover every calendar day from the first to the last session, so
+    the time axis is linear. Days without a session are NaN; if an animal
+    has several sessions on one day the last one is used.
+
+    Returns:
+        (matrix, animals, first_date): float array of shape
+        (n_animals, n_days), tuple of animal IDs for the rows and the
+        datetime64[D] date of column 0
+    """
+    animals = table.animal_names
+    if not len(table):
+        return np.empty((len(animals), 0)), animals, None
+
+    first = table.dates.min()
+    n_days = int((table.dates.max() - first).astype(int)) + 1
+    matrix = np.full((len(animals), n_days), np.nan)
+    matrix[table.animal_codes, (table.dates - first).astype(int)] = table.weights
+    return matrix, animals, first
+
+
+def latest_values(matrix):
+    """Last non-NaN value of every row (NaN for empty rows)."""
+    has_value = ~np.isnan(matrix)
+    last = matrix.shape[1] - 1 - np.argmax(has_value[:, ::-1], axis=1)
+    out = matrix[np.arange(len(matrix)), last]
+    out[~has_value.any(axis=1)] = np.nan
+    return out
+
+
+def row_order(matrix, animals, sort="name"):
+    """Row order for the heatmap.
+
+    "name" sorts by animal ID, "latest" by the most recent weight (highest
+    first) and "cluster" groups animals with similar trajectories using
+    average-linkage hierarchical clustering. For clustering, missing
+    sessions are filled with the animal's mean, so gaps do not count as
+    differences.
+    """
+    if sort == "name":
+        return np.argsort(np.asarray(animals, dtype=str), kind="stable")
+    if sort == "latest":
+        latest = latest_values(matrix)
+        return np.argsort(np.where(np.isnan(latest), -np.inf, -latest), kind="stable")
+    if sort == "cluster":
+        if len(matrix) < 3:
+            return np.arange(len(matrix))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            row_means = np.nanmean(matrix, axis=1)
+        filled = np.where(np.isnan(matrix), row_means[:, None], matrix)
+        filled = np.nan_to_num(filled, nan=np.nanmean(filled) if np.isfinite(filled).any() else 0.0)
+        return leaves_list(linkage(filled, method="average"))
+    raise ValueError(f"Unknown sort order: {sort}")
+
+
+def downsample(matrix, max_rows, max_cols):
+    """Average blocks of cells (ignoring NaN) so the matrix fits the limits.
+
+    The matrix is padded with NaN to whole blocks, so the last row and
+    column of blocks may cover fewer cells.
+
+    Returns:
+        (matrix, row_step, col_step): the reduced matrix and the number of
+        original rows and columns per cell
+    """
+    row_step = -(-matrix.shape[0] // max_rows) if matrix.shape[0] > max_rows else 1
+    col_step = -(-matrix.shape[1] // max_cols) if matrix.shape[1] > max_cols else 1
+    if row_step == col_step == 1:
+        return matrix, 1, 1
+
+    rows = -(-matrix.shape[0] // row_step)
+    cols = -(-matrix.shape[1] // col_step)
+    padded = np.full((rows * row_step, cols * col_step), np.nan)
+    padded[:matrix.shape[0], :matrix.shape[1]] = matrix
+    blocks = padded.reshape(rows, row_step, cols, col_step)
+    with warnings.catch_warnings():
+        # Blocks without any session stay NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(blocks, axis=(1, 3)), row_step, col_step
+
+
+def draw_cohort_heatmap(ax, table, sort="name", max_rows=None, max_cols=None,
+                        cmap="viridis"):
+    """Draw the cohort weights as one image: animals on rows, dates on columns.
+
+    Args:
+        ax: Axes to draw into
+        table: SessionTable holding several animals
+        sort: One of SORT_ORDERS
+        max_rows, max_cols: Size above which the matrix is block-averaged;
+            by default the height and width of the axes in pixels, so no
+            more cells are drawn than can be shown
+        cmap: Colormap name; missing sessions are shown in light gray
+
+    Returns:
+        The AxesImage
+    """
+    matrix, animals, first = cohort_matrix(table)
+    if first is None:
+        raise ValueError("No sessions to show")
+
+    order = row_order(matrix, animals, sort)
+    matrix = matrix[order]
+    animals = [animals[i] for i in order]
+    n_rows, n_days = matrix.shape
+    pixels = ax.get_window_extent()
+    max_rows = max_rows or max(int(pixels.height), 1)
+    max_cols = max_cols or max(int(pixels.width), 1)
+    shown, row_step, col_step = downsample(matrix, max_rows, max_cols)
+
+    # Blocks keep their size in days and animals; the NaN padding of the
+    # last blocks lies outside the axes limits
+    start = mdates.date2num(first)
+    image = ax.imshow(
+        np.ma.masked_invalid(shown),
+        aspect="auto",
+        interpolation="nearest",
+        cmap=matplotlib.colormaps[cmap].with_extremes(bad="lightgray"),
+        extent=(start, start + shown.shape[1] * col_step, shown.shape[0] * row_step, 0)
+    )
+    ax.set_xlim(start, start + n_days)
+    ax.set_ylim(n_rows, 0)
+
+    ax.xaxis_date()
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlabel("Date")
+    if row_step == 1 and n_rows <= 60:
+        ax.set_yticks(np.arange(n_rows) + 0.5)
+        ax.set_yticklabels(animals, fontsize=8)
+    else:
+        ax.set_ylabel(f"Animals ({n_rows})")
+        ax.set_yticks([])
+    ax.set_title("Cohort Weight (%)")
+    ax.figure.colorbar(image, ax=ax, label="Weight (%)")
+    return image
+
+
+def plot_cohort_heatmap(table, sort="name"):
+    """Show the cohort heatmap in a pyplot window."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    draw_cohort_heatmap(ax, table, sort)
+    plt.tight_layout()
+    plt.show()
+
+
+def heatmap_figure(table, sort="name", ax=None, **options):
+    """Build the cohort heatmap figure without pyplot; returns the Figure."""
+    fig, ax = new_figure(ax, figsize=(10, 6))
+    draw_cohort_heatmap(ax, table, sort, **options)
+    return fig
@@ -0,0 +1,356 @@
+import argparse
+import json
+import math
+import re
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path, PurePosixPath
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+import numpy as np
+
+from cache import content_hash
+from service import DEFAULT_HOST, ServiceError, WeightRequestHandler
+from session_index import DEFAULT_INDEX_PATH, SessionIndex
+from sessions import SessionTable
+from weight_parser import NUMBER_PATTERN, field_key, parse_expdetails_text
+
+DEFAULT_INGEST_PORT = 8766
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def _date_key(value):
+    """'YYYYMMDD' from 'YYYYMMDD' or 'YYYY-MM-DD'."""
+    digits = str(value or "").strip().replace("-", "")
+    if not re.fullmatch(r"\d{8}", digits):
+        raise ValueError(f"Invalid or missing session date: {value!r}")
+    try:
+        np.datetime64(f"{digits[:4]}-{digits[4:6]}-{digits[6:]}")
+    except ValueError:
+        raise ValueError(f"Invalid session date: {value!r}") from None
+    return digits
+
+
+def normalize_record(record):
+    """Validate a submitted session and bring it into the parse_expdetails format.
+
+    Args:
+        record: Dict with 'animal', 'date' (YYYYMMDD or YYYY-MM-DD) and
+            'weight' (BW %), and optionally 'grams', 'fields' ({name: value}
+            or {name: (text, number)}) and 'day_folder'
+
+    Returns:
+        The normalized record dict
+    """
+    animal = record.get("animal")
+    if not isinstance(animal, str) or not animal.strip():
+        raise ValueError("Session has no animal ID")
+    animal = animal.strip()
+
+    weight = record.get("weight")
+    if isinstance(weight, str):
+        # ExpDetails text gives numbers, JSON clients may send strings
+        try:
+            weight = float(weight)
+        except ValueError:
+            weight = None
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not math.isfinite(weight):
+        raise ValueError("Session has no valid weight")
+
+    day_folder = record.get("day_folder")
+    if day_folder is not None and not isinstance(day_folder, str):
+        raise ValueError("Session 'day_folder' must be a string")
+    grams = record.get("grams")
+    if isinstance(grams, bool) or not isinstance(grams, (int, float, str, type(None))):
+        raise ValueError("Session has an invalid 'grams' value")
+    try:
+        grams = None if grams is None else float(grams)
+    except ValueError:
+        raise ValueError("Session has an invalid 'grams' value") from None
+
+    raw_fields = record.get("fields") or {}
+    if not isinstance(raw_fields, dict):
+        raise ValueError("Session 'fields' must be an object")
+    fields = {}
+    for name, value in raw_fields.items():
+        try:
+            if isinstance(value, (list, tuple)):
+                text, number = value
+                number = None if number is None else float(number)
+            else:
+                text = str(value)
+                match = NUMBER_PATTERN.match(text)
+                number = float(match.group()) if match else None
+        except (TypeError, ValueError):
+            raise ValueError(f"Session field {name!r} must be a value or [text, number]") from None
+        fields[field_key(name)] = (str(text), number)
+
+    return {
+        "animal": animal,
+        "date": _date_key(record.get("date")),
+        "weight": float(weight),
+        "grams": grams,
+        "fields": fields,
+        "day_folder": day_folder,
+    }
+
+
+def record_from_text(text, animal=None, date=None, day_folder=None):
+    """Parse submitted ExpDetails content into a session record.
+
+    animal and date override what is found in the text; a date is required
+    either way, e.g. the day folder name the rig would have used.
+    """
+    record = parse_expdetails_text(text, "submitted ExpDetails")
+    record["animal"] = animal or record["animal"]
+    record["date"] = date or record["date"] or (Path(day_folder).name if day_folder else None)
+    record["day_folder"] = day_folder
+    return record
+
+
+def session_day(record):
+    """Day folder of a pushed session: the rig's folder if it is named by the
+    session date, otherwise a stand-in path ending in the date."""
+    day_folder = record.get("day_folder")
+    if day_folder and Path(day_folder).name == record["date"]:
+        return Path(day_folder)
+    return PurePosixPath("ingest", record["animal"], record["date"])
+
+
+class IngestHub:
+    """Sessions pushed by acquisition rigs, kept in memory and in the session index.
+
+    Sessions are keyed by animal and date, so submitting a session again
+    replaces it. Listeners are called with every accepted record, in the
+    submitting thread, right after it is stored.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path
+        self._sessions = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Call callback(record) for every accepted session; returns an unsubscribe function."""
+        with self._lock:
+            self._listeners.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._listeners:
+                    self._listeners.remove(callback)
+        return unsubscribe
+
+    def submit(self, record):
+        """Store one session (see normalize_record) and notify the listeners.
+
+        Returns:
+            The normalized record
+        """
+        record = normalize_record(record)
+        if self.index_path is not None:
+            day = session_day(record)
+            # One connection per call, since requests arrive on server threads
+            with SessionIndex(self.index_path) as index, index.conn:
+                index.add_record(day, day, record, animal=record["animal"])
+
+        with self._lock:
+            self._sessions.setdefault(record["animal"], {})[record["date"]] = record
+            listeners = list(self._listeners)
+
+        for callback in listeners:
+            try:
+                callback(record)
+            except Exception:
+                # A broken view must not make the rig's submission fail
+                continue
+        return record
+
+    def animals(self):
+        with self._lock:
+            return sorted(self._sessions)
+
+    def table(self, animal):
+        """SessionTable of the sessions pushed for one animal, in date order."""
+        with self._lock:
+            by_date = self._sessions.get(animal, {})
+            records = [by_date[date] for date in sorted(by_date)]
+        return SessionTable(
+            [f"{r['date'][:4]}-{r['date'][4:6]}-{r['date'][6:]}" for r in records],
+            [r["weight"] for r in records],
+            animal_names=(animal,),
+            day_folders=[session_day(r) for r in records],
+        )
+
+
+class IngestRequestHandler(WeightRequestHandler):
+    """Routes:
+
+    POST /sessions                 JSON record, or ExpDetails text with
+                                   Content-Type text/plain and optional
+                                   ?animal=&date=&day_folder=
+    GET /sessions                  animals with pushed sessions
+    GET /sessions/<animal>         pushed sessions of one animal
+    """
+
+    hub = None
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/sessions":
+            self._send_error(404, "Not found")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_error(400, "Invalid Content-Length")
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_error(413, "Session too large")
+            return
+        body = self.rfile.read(length).decode("utf-8", errors="replace")
+
+        try:
+            if self.headers.get("Content-Type", "").startswith("text/plain"):
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                record = record_from_text(
+                    body, query.get("animal"), query.get("date"), query.get("day_folder")
+                )
+            else:
+                record = json.loads(body)
+                if not isinstance(record, dict):
+                    raise ValueError("Expected a JSON object")
+            record = self.hub.submit(record)
+        except ValueError as e:
+            self._send_error(422, str(e))
+            return
+        except sqlite3.OperationalError as e:
+            # e.g. 'database is locked' while another writer holds the index
+            self._send_error(503, f"Session index unavailable: {e}")
+            return
+
+        payload = {k: record[k] for k in ("animal", "date", "weight")}
+        body = json.dumps(payload).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [unquote(p) for p in urlsplit(self.path).path.strip("/").split("/") if p]
+        if parts == ["sessions"]:
+            payload = {"animals": self.hub.animals()}
+            self._send_json(payload, content_hash(payload))
+        elif len(parts) == 2 and parts[0] == "sessions":
+            self._send_table(self.hub.table(parts[1]), as_npy=False)
+        else:
+            self._send_error(404, "Not found")
+
+
+def make_ingest_server(hub, host=DEFAULT_HOST, port=DEFAULT_INGEST_PORT):
+    """Create (but do not start) an ingest server; port 0 picks a free port."""
+    handler = type("BoundIngestRequestHandler", (IngestRequestHandler,), {"hub": hub})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_ingest_server(hub, host=DEFAULT_HOST, port=DEFAULT_INGEST_PORT):
+    """Start an ingest server in a daemon thread; stop it with server.shutdown()."""
+    server = make_ingest_server(hub, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class IngestClient:
+    """What the rig software runs at the end of a session (also used in tests)."""
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, data=None, content_type=None):
+        request = urllib.request.Request(self.base_url + path, data=data)
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(f"{e.code}: {message}") from None
+        except urllib.error.URLError as e:
+            raise ServiceError(f"Cannot reach ingest endpoint at {self.base_url}: {e.reason}") from None
+
+    def submit_record(self, animal, date, weight, grams=None, fields=None, day_folder=None):
+        """Submit an already parsed session."""
+        record = {
+            "animal": animal, "date": date, "weight": weight, "grams": grams,
+            "fields": fields or {}, "day_folder": day_folder,
+        }
+        return self._request("/sessions", json.dumps(record).encode(), "application/json")
+
+    def submit_text(self, text, animal=None, date=None, day_folder=None):
+        """Submit the contents of an ExpDetails file."""
+        query = {k: v for k, v in (("animal", animal), ("date", date), ("day_folder", day_folder)) if v}
+        path = "/sessions" + (f"?{urlencode(query)}" if query else "")
+        return self._request(path, text.encode("utf-8"), "text/plain; charset=utf-8")
+
+    def animals(self):
+        return self._request("/sessions")["animals"]
+
+    def table(self, animal):
+        data = self._request(f"/sessions/{quote(animal)}")
+        return SessionTable(
+            np.array(data["dates"], dtype="datetime64[D]"),
+            np.array(data["weights"], dtype=float),
+            animal_names=(data["animal"],),
+            day_folders=[Path(d) for d in data["day_folders"]],
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receive sessions from acquisition rigs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Listen for sessions on localhost")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_INGEST_PORT)
+    serve.add_argument("--index", default=str(DEFAULT_INDEX_PATH), help="Session index to add sessions to")
+
+    send = commands.add_parser("send", help="Submit ExpDetails files, as a rig would")
+    send.add_argument("files", nargs="+", help="ExpDetails files inside their day folders")
+    send.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_INGEST_PORT}")
+    args = parser.parse_args(argv)
+
+    if args.command == "send":
+        client = IngestClient(args.url)
+        for file in args.files:
+            file = Path(file)
+            result = client.submit_text(file.read_text(), day_folder=str(file.parent.resolve()))
+            print(f"{result['animal']} {result['date']}: {result['weight']}%")
+        return
+
+    hub = IngestHub(args.index)
+    hub.subscribe(lambda r: print(f"Received {r['animal']} {r['date']}: {r['weight']}%"))
+    server = make_ingest_server(hub, args.host, args.port)
+    print(f"Accepting sessions on http://{args.host}:{server.server_address[1]}/sessions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,5 @@ import tkinter as tk
 if __name__ == "__main__":
     root = tk.Tk()
     app = MouseWeightGUI(root)
+    app.restore_snapshot()
     root.mainloop()
@@ -0,0 +1,279 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from fnmatch import fnmatchcase
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from archive_source import ArchivePath, as_source_path
+from data_loader import find_animal_folders, find_day_folders, find_expdetails_file, list_dir
+
+HASH_CACHE_PATH = Path.home() / ".mouse_weight_tracker" / "hashes.json"
+READ_CHUNK = 1024 * 1024
+DIGEST_SIZE = 16
+
+
+def stat_key(path):
+    """Identity of a file version that does not rely on mtime alone.
+
+    ctime cannot be set by tools that copy files with their old mtime, and
+    inode and size change with most rewrites. Only equality is compared, so
+    clock skew between machines does not matter.
+    """
+    st = path.stat()
+    return [
+        st.st_size,
+        st.st_mtime_ns,
+        getattr(st, "st_ctime_ns", 0),
+        getattr(st, "st_ino", 0),
+    ]
+
+
+def hash_file(path):
+    """blake2b digest of a file's contents (hex)."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    if isinstance(path, ArchivePath):
+        h.update(path.read_bytes())
+    else:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def combine(children):
+    """Hash of a folder from its (name, hash) children, independent of listing order."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for name, digest in sorted(children.items()):
+        h.update(f"{name}\0{digest}\n".encode())
+    return h.hexdigest()
+
+
+class HashCache:
+    """File content hashes keyed by path and stat_key, optionally kept on disk.
+
+    A file is re-hashed when its stat_key changes; rehash=True on lookup
+    ignores the cache entirely.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hashed = 0
+        self.reused = 0
+        if self.path and self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def file_hash(self, path, rehash=False):
+        key = stat_key(path)
+        with self._lock:
+            entry = self._entries.get(str(path))
+        if not rehash and entry and entry[0] == key:
+            with self._lock:
+                self.reused += 1
+            return entry[1]
+
+        digest = hash_file(path)
+        with self._lock:
+            self._entries[str(path)] = [key, digest]
+            self.hashed += 1
+        return digest
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f)
+        os.replace(tmp, self.path)
+
+
+class MerkleNode:
+    """A file or folder and the hash of everything below it."""
+
+    __slots__ = ("name", "hash", "children")
+
+    def __init__(self, name, hash, children=None):
+        self.name = name
+        self.hash = hash
+        self.children = children or {}
+
+    def to_dict(self):
+        data = {"name": self.name, "hash": self.hash}
+        if self.children:
+            data["children"] = [c.to_dict() for c in self.children.values()]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        children = {c["name"]: cls.from_dict(c) for c in data.get("children", [])}
+        return cls(data["name"], data["hash"], children)
+
+
+def _day_files(day, value_patterns=()):
+    """The ExpDetails file of a day folder plus files matching value_patterns.
+
+    Other files (e.g. imaging data) are left out, so they are never read.
+    """
+    try:
+        files = [find_expdetails_file(day)]
+    except FileNotFoundError:
+        files = []
+    names = {f.name for f in files}
+    files += [
+        day / name for name in sorted(list_dir(day).files)
+        if name not in names and any(fnmatchcase(name, p) for p in value_patterns)
+    ]
+    return files
+
+
+def build_tree(cohort_path, cache=None, rehash=False, max_workers=None, value_patterns=()):
+    """Hash a cohort: files -> day folders -> animal folders -> cohort root.
+
+    The ExpDetails file and the daily-value files of every day folder are
+    hashed, in parallel threads; hashlib releases the GIL, so large files
+    are hashed concurrently.
+
+    Args:
+        cohort_path: Cohort folder (one folder per animal) or a single
+            animal folder
+        cache: HashCache reused across calls; unchanged files are not re-read
+        rehash: Hash every file even if its cached stat_key matches
+        max_workers: Number of hashing threads
+        value_patterns: Names or glob patterns of the daily-value files to
+            hash besides ExpDetails, e.g. ('daily_value.npy',)
+
+    Returns:
+        The root MerkleNode
+    """
+    cache = cache or HashCache()
+    try:
+        find_day_folders(cohort_path)
+        animals = [as_source_path(cohort_path)]
+    except FileNotFoundError:
+        animals = find_animal_folders(cohort_path)
+
+    layout = {
+        a.name: {d.name: _day_files(d, value_patterns) for d in find_day_folders(a)}
+        for a in animals
+    }
+    files = [f for days in layout.values() for day_files in days.values() for f in day_files]
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        digests = dict(zip(map(str, files), pool.map(lambda f: cache.file_hash(f, rehash), files)))
+
+    animal_nodes = {}
+    for animal, days in layout.items():
+        day_nodes = {}
+        for day, day_files in days.items():
+            file_nodes = {f.name: MerkleNode(f.name, digests[str(f)]) for f in day_files}
+            day_nodes[day] = MerkleNode(
+                day, combine({n: c.hash for n, c in file_nodes.items()}), file_nodes
+            )
+        animal_nodes[animal] = MerkleNode(
+            animal, combine({n: c.hash for n, c in day_nodes.items()}), day_nodes
+        )
+    return MerkleNode(
+        Path(str(cohort_path)).name,
+        combine({n: c.hash for n, c in animal_nodes.items()}),
+        animal_nodes,
+    )
+
+
+def diff_trees(old, new, prefix=()):
+    """Paths that were added, removed or changed between two trees.
+
+    Subtrees with equal hashes are skipped without looking inside them.
+
+    Returns:
+        List of (status, path) with status 'added', 'removed' or 'changed'
+        and path a tuple of names below the root, e.g. ('IP75', '20251201',
+        'IP75_20251201_ExpDetails.txt')
+    """
+    if old is not None and new is not None and old.hash == new.hash:
+        return []
+
+    changes = []
+    names = sorted(set(old.children if old else ()) | set(new.children if new else ()))
+    for name in names:
+        a = old.children.get(name) if old else None
+        b = new.children.get(name) if new else None
+        path = prefix + (name,)
+        if a is None:
+            changes.append(("added", path))
+        elif b is None:
+            changes.append(("removed", path))
+        elif a.hash != b.hash:
+            if a.children or b.children:
+                changes.extend(diff_trees(a, b, path))
+            else:
+                changes.append(("changed", path))
+    return changes
+
+
+def changed_days(old, new):
+    """(animal, day) pairs that are new or whose files changed; removed days are left out."""
+    days = set()
+    for status, path in diff_trees(old, new):
+        if len(path) == 1:
+            if status == "added":
+                days.update((path[0], day) for day in new.children[path[0]].children)
+        elif len(path) == 2:
+            if status == "added":
+                days.add(path)
+        else:
+            days.add(path[:2])
+    return sorted(days)
+
+
+def save_tree(tree, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(tree.to_dict(), f)
+    os.replace(tmp, path)
+
+
+def load_tree(path):
+    """Read a saved tree; returns None if there is none."""
+    try:
+        with open(path) as f:
+            return MerkleNode.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="List day folders whose files changed since the last run."
+    )
+    parser.add_argument("cohort", help="Cohort folder or single animal folder")
+    parser.add_argument("state", help="JSON file holding the hashes of the last run")
+    parser.add_argument(
+        "--values", action="append", default=[],
+        help="Daily-value file name or glob pattern to hash besides ExpDetails (repeatable)"
+    )
+    parser.add_argument("--rehash", action="store_true", help="Re-read every file")
+    args = parser.parse_args(argv)
+
+    cache = HashCache(HASH_CACHE_PATH)
+    old = load_tree(args.state)
+    new = build_tree(args.cohort, cache, rehash=args.rehash, value_patterns=args.values)
+    for status, path in diff_trees(old, new):
+        print(f"{status}: {'/'.join(path)}")
+    save_tree(new, args.state)
+    cache.save()
+    print(f"Root hash {new.hash} ({cache.hashed} files hashed, {cache.reused} reused)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,86 @@
 import matplotlib.pyplot as plt
-from scipy.stats import pearsonr, linregress
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from scipy.stats import pearsonr
 import numpy as np
-from external_values import detect_outliers
+from external_values import ROLLING_WINDOW, rolling_scores, zscores
+from scipy.spatial import cKDTree
+from cache import default_cache, content_hash
+from sessions import as_weights_and_dates
+from regression import REGRESSION_LABELS, fit_line
 
 
-def plot_weights_vs_days(weights, dates=None):
+def plot_weights_vs_days(weights, dates=None, ylabel="Weight (%)", block=None):
+    """Plot weight over time; weights may also be a SessionTable.
+
+    Pass block=False to keep the caller's event loop running, e.g. to add
+    sessions to the open plot as they arrive. Returns the Axes.
+    """
     plt.figure()
-    plt.plot(dates, weights, marker="o", color='rebeccapurple')
-    plt.xlabel("Date")
-    plt.xticks(rotation=45)
-    plt.ylabel("Weight (%)")
-    plt.title("Mouse Weight Over Time")
+    ax = plt.gca()
+    draw_weights_vs_days(ax, weights, dates, ylabel)
     plt.tight_layout()
-    plt.show()
+    plt.show(block=block)
+    return ax
+
+
+def new_figure(ax=None, **figure_kwargs):
+    """Return (fig, ax) without pyplot: a new Agg-backed Figure, or ax's figure.
+
+    Figures made here are not registered with pyplot, so they are freed as
+    soon as they are no longer referenced and can be built and rendered in
+    any thread or process.
+    """
+    if ax is not None:
+        return ax.figure, ax
+    fig = Figure(**figure_kwargs)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def weights_figure(weights, dates=None, ax=None, ylabel="Weight (%)"):
+    """Build the weight-over-time figure without pyplot.
+
+    Args:
+        weights: Weights, or a SessionTable
+        dates: Dates of the weights (taken from the table if omitted)
+        ax: Optional Axes to draw into instead of a new figure
+        ylabel: Y axis label, e.g. for weekly or monthly summaries
+
+    Returns:
+        The Figure
+    """
+    fig, ax = new_figure(ax)
+    draw_weights_vs_days(ax, weights, dates, ylabel)
+    return fig
+
+
+def external_figure(weights, external_values, ax=None, **options):
+    """Build the weight vs external value figure without pyplot.
+
+    Args:
+        weights: Weights, or a SessionTable
+        external_values: External value of every day
+        ax: Optional Axes to draw into instead of a new figure
+        **options: Options of draw_weight_vs_external (show_regression,
+            mark_outliers, z_thresh, regression, outlier_method, cache, ...)
+
+    Returns:
+        (fig, stats) with the stats dict of compute_external_stats
+    """
+    fig, ax = new_figure(ax)
+    stats = draw_weight_vs_external(ax, weights, external_values, **options)
+    return fig, stats
+
+
+def draw_weights_vs_days(ax, weights, dates=None, ylabel="Weight (%)"):
+    """Draw the weight-over-time line plot into an existing Axes."""
+    weights, dates = as_weights_and_dates(weights, dates)
+    ax.plot(dates, weights, marker="o", color='rebeccapurple')
+    ax.set_xlabel("Date")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_ylabel(ylabel)
+    ax.set_title("Mouse Weight Over Time")
 
 
 def plot_weight_vs_external(
@@ -20,75 +88,471 @@ def plot_weight_vs_external(
     external_values,
     show_regression=False,
     mark_outliers=False,
-    z_thresh=3.0
+    z_thresh=3.0,
+    dates=None,
+    on_select=None,
+    regression="linear",
+    outlier_method="zscore",
+    window=ROLLING_WINDOW,
+    block=None
+):
+    """Scatter weight against external values.
+
+    Hovering a point shows its date, values and z-scores; clicking it calls
+    on_select with the point's index. Pass block=False to keep the caller's
+    event loop running, e.g. to tune the threshold while the plot is open.
+
+    Returns:
+        The ExternalPlot; its set_threshold re-marks outliers in place
+    """
+    fig, ax = plt.subplots()
+    plot = ExternalPlot(
+        ax,
+        weights,
+        external_values,
+        show_regression=show_regression,
+        mark_outliers=mark_outliers,
+        z_thresh=z_thresh,
+        dates=dates,
+        inspect=True,
+        on_select=on_select,
+        regression=regression,
+        outlier_method=outlier_method,
+        window=window
+    )
+    plt.tight_layout()
+    plt.show(block=block)
+    return plot
+
+
+def outlier_scores(
+    weights,
+    external_values,
+    outlier_method="zscore",
+    window=ROLLING_WINDOW,
+    dates=None,
+    cache=default_cache
 ):
+    """Per-day outlier scores of the external values (zx) and weights (zy).
+
+    "zscore" compares every day with the global mean and standard deviation;
+    "rolling" compares it with the median and MAD of the surrounding window
+    days (in date order when dates are given), so baseline drift is not
+    flagged. Scores do not depend on the threshold, so they are computed
+    once per dataset and cached.
+
+    Returns:
+        (zx, zy) read-only arrays, NaN for days with a missing value
+    """
     weights = np.asarray(weights, dtype=float)
     external_values = np.asarray(external_values, dtype=float)
+    rolling = outlier_method == "rolling"
+    if outlier_method not in ("zscore", "rolling"):
+        raise ValueError(f"Unknown outlier method: {outlier_method}")
 
-    fig, ax = plt.subplots()
+    def compute():
+        # Days that failed to load are NaN and take no part in the stats
+        valid = np.isfinite(weights) & np.isfinite(external_values)
+        zx = np.full(len(weights), np.nan)
+        zy = np.full(len(weights), np.nan)
+        if rolling:
+            order = np.arange(len(weights)) if dates is None else np.argsort(dates, kind="stable")
+            order = order[valid[order]]
+            zx[order] = rolling_scores(external_values[order], window)
+            zy[order] = rolling_scores(weights[order], window)
+        elif valid.any():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                zx[valid], zy[valid] = zscores(external_values[valid], weights[valid])
 
-    if mark_outliers:
-        in_mask, out_mask = detect_outliers(
-            external_values, weights, z_thresh
-        )
+        # Arrays may be shared through the cache
+        zx.flags.writeable = False
+        zy.flags.writeable = False
+        return zx, zy
 
-        # Plot inliers
-        ax.scatter(
-            external_values[in_mask],
-            weights[in_mask],
-            label="Data",
-            alpha=0.8,
-            color="rebeccapurple"
-        )
+    if cache is None:
+        return compute()
 
-        # Plot outliers
-        ax.scatter(
-            external_values[out_mask],
-            weights[out_mask],
-            label="Outliers",
-            marker="x",
-            s=80,
-            color="crimson"
-        )
+    key = content_hash(
+        "outlier_scores", weights, external_values,
+        outlier_method=outlier_method,
+        window=int(window) if rolling else None,
+        dates=dates if rolling else None
+    )
+    return cache.get_or_compute(key, compute)
 
-        # Stats computed on inliers only
-        x_stats = external_values[in_mask]
-        y_stats = weights[in_mask]
 
-    else:
-        ax.scatter(external_values, weights, label="Data", color="rebeccapurple")
-        x_stats = external_values
-        y_stats = weights
+def threshold_stats(
+    weights,
+    external_values,
+    zx,
+    zy,
+    show_regression=False,
+    mark_outliers=False,
+    z_thresh=3.0,
+    regression="linear"
+):
+    """Outlier masks and inlier stats for one threshold, from precomputed scores.
+
+    Returns:
+        The dict described in compute_external_stats
+    """
+    valid = np.isfinite(weights) & np.isfinite(external_values)
+    in_mask = valid.copy()
+    out_mask = np.zeros(len(weights), dtype=bool)
+    if mark_outliers and valid.any():
+        in_valid = (np.abs(zx[valid]) < z_thresh) & (np.abs(zy[valid]) < z_thresh)
+        in_mask[valid] = in_valid
+        out_mask[valid] = ~in_valid
+
+    # Arrays may be shared through the cache
+    in_mask.flags.writeable = False
+    out_mask.flags.writeable = False
+
+    # Stats computed on inliers only
+    x_stats = external_values[in_mask]
+    y_stats = weights[in_mask]
+    stats = {
+        "in_mask": in_mask, "out_mask": out_mask, "zx": zx, "zy": zy,
+        "r": None, "p": None, "slope": None, "intercept": None
+    }
 
     # Pearson correlation - only compute if we have at least 2 points
     if len(x_stats) >= 2:
         r, p = pearsonr(x_stats, y_stats)
+        stats["r"], stats["p"] = float(r), float(p)
         text = f"Pearson r = {r:.3f}\np-value = {p:.3e}"
 
         # Regression
-        if show_regression and len(x_stats) >= 2:
-            slope, intercept, _, _, _ = linregress(x_stats, y_stats)
-            x_line = np.linspace(x_stats.min(), x_stats.max(), 100)
-            y_line = slope * x_line + intercept
-            ax.plot(x_line, y_line, linestyle="--", label="Linear regression", color="mediumorchid")
-
+        if show_regression:
+            slope, intercept = fit_line(x_stats, y_stats, regression)
+            stats["slope"], stats["intercept"] = slope, intercept
             text += f"\nSlope = {slope:.3f}"
+            if regression != "linear":
+                text += f" ({REGRESSION_LABELS[regression].split()[0]})"
     else:
         text = "Insufficient data for correlation (need at least 2 points)"
 
-    ax.set_xlabel("External value")
-    ax.set_ylabel("Weight (%)")
-    ax.set_title("Weight vs External Value")
+    stats["text"] = text
+    return stats
+
+
+def compute_external_stats(
+    weights,
+    external_values,
+    show_regression=False,
+    mark_outliers=False,
+    z_thresh=3.0,
+    regression="linear",
+    outlier_method="zscore",
+    window=ROLLING_WINDOW,
+    dates=None,
+    cache=default_cache
+):
+    """Compute outlier masks, Pearson correlation and regression.
+
+    regression picks the line fit: "linear" (least squares) or the robust
+    "theil_sen" / "siegel" estimators, which tolerate up to ~29% / ~50% of
+    corrupted points. outlier_method is described in outlier_scores.
+    Results are cached by a content hash of the data plus the options, so
+    re-plotting unchanged data does not recompute anything.
+
+    Returns:
+        Dict with 'in_mask', 'out_mask', the (global or rolling) z-scores
+        'zx' (external) and 'zy' (weight), 'r', 'p', 'slope', 'intercept'
+        (None where not computed) and the summary 'text' shown on the plot
+    """
+    weights, table_dates = as_weights_and_dates(weights)
+    dates = table_dates if dates is None else dates
+    weights = np.asarray(weights, dtype=float)
+    external_values = np.asarray(external_values, dtype=float)
+    rolling = outlier_method == "rolling"
+
+    def compute():
+        zx, zy = outlier_scores(weights, external_values, outlier_method, window, dates, cache)
+        return threshold_stats(
+            weights, external_values, zx, zy,
+            show_regression, mark_outliers, z_thresh, regression
+        )
 
-    ax.legend()
+    if cache is None:
+        return compute()
 
-    ax.text(
-        0.05, 0.95,
-        text,
-        transform=ax.transAxes,
-        va="top",
-        bbox=dict(boxstyle="round", alpha=0.8, color="wheat")
+    key = content_hash(
+        "external_stats", weights, external_values,
+        show_regression=show_regression,
+        mark_outliers=mark_outliers,
+        z_thresh=float(z_thresh) if mark_outliers else None,
+        regression=regression if show_regression else None,
+        outlier_method=outlier_method,
+        window=int(window) if rolling else None,
+        dates=dates if rolling else None
     )
+    return cache.get_or_compute(key, compute)
 
-    plt.tight_layout()
-    plt.show()
+
+def draw_weight_vs_external(
+    ax,
+    weights,
+    external_values,
+    show_regression=False,
+    mark_outliers=False,
+    z_thresh=3.0,
+    dates=None,
+    inspect=False,
+    on_select=None,
+    regression="linear",
+    outlier_method="zscore",
+    window=ROLLING_WINDOW,
+    cache=default_cache
+):
+    """Draw the weight vs external value scatter plot into an existing Axes.
+
+    weights may be a plain sequence or a SessionTable. With inspect=True a
+    PointInspector adds hover tooltips and click selection. The stats are
+    cached in cache; pass None to compute them without caching.
+
+    Returns:
+        The stats dict of compute_external_stats
+    """
+    return ExternalPlot(
+        ax,
+        weights,
+        external_values,
+        show_regression=show_regression,
+        mark_outliers=mark_outliers,
+        z_thresh=z_thresh,
+        dates=dates,
+        inspect=inspect,
+        on_select=on_select,
+        regression=regression,
+        outlier_method=outlier_method,
+        window=window,
+        cache=cache
+    ).stats
+
+
+class ExternalPlot:
+    """The artists of a weight vs external value plot.
+
+    Outlier scores are computed once when the plot is drawn. set_threshold
+    only recomputes the masks and inlier stats and then updates the marker,
+    regression line and text artists in place, so it is cheap enough to
+    call on every change of a threshold control.
+    """
+
+    def __init__(
+        self,
+        ax,
+        weights,
+        external_values,
+        show_regression=False,
+        mark_outliers=False,
+        z_thresh=3.0,
+        dates=None,
+        inspect=False,
+        on_select=None,
+        regression="linear",
+        outlier_method="zscore",
+        window=ROLLING_WINDOW,
+        cache=default_cache
+    ):
+        weights, dates = as_weights_and_dates(weights, dates)
+        self.ax = ax
+        self.weights = np.asarray(weights, dtype=float)
+        self.external_values = np.asarray(external_values, dtype=float)
+        self.dates = dates
+        self.show_regression = show_regression
+        self.mark_outliers = mark_outliers
+        self.regression = regression
+
+        self.stats = compute_external_stats(
+            self.weights,
+            self.external_values,
+            show_regression=show_regression,
+            mark_outliers=mark_outliers,
+            z_thresh=z_thresh,
+            regression=regression,
+            outlier_method=outlier_method,
+            window=window,
+            dates=dates,
+            cache=cache
+        )
+        in_mask, out_mask = self.stats["in_mask"], self.stats["out_mask"]
+        x, y = self.external_values, self.weights
+
+        self.outliers = None
+        if mark_outliers:
+            # Plot inliers
+            self.inliers = ax.scatter(
+                x[in_mask],
+                y[in_mask],
+                label="Data",
+                alpha=0.8,
+                color="rebeccapurple"
+            )
+
+            # Plot outliers
+            self.outliers = ax.scatter(
+                x[out_mask],
+                y[out_mask],
+                label="Outliers",
+                marker="x",
+                s=80,
+                color="crimson"
+            )
+        else:
+            self.inliers = ax.scatter(x[in_mask], y[in_mask], label="Data", color="rebeccapurple")
+
+        self.line = None
+        if self.stats["slope"] is not None:
+            self.line, = ax.plot(
+                *self._line_data(), linestyle="--",
+                label=REGRESSION_LABELS[regression], color="mediumorchid"
+            )
+
+        ax.set_xlabel("External value")
+        ax.set_ylabel("Weight (%)")
+        ax.set_title("Weight vs External Value")
+
+        ax.legend()
+
+        self.text = ax.text(
+            0.05, 0.95,
+            self.stats["text"],
+            transform=ax.transAxes,
+            va="top",
+            bbox=dict(boxstyle="round", alpha=0.8, color="wheat")
+        )
+
+        if inspect:
+            PointInspector(ax, x, y, self.describe, on_select)
+
+    def _line_data(self):
+        stats = self.stats
+        if stats["slope"] is None:
+            return [], []
+        x_stats = self.external_values[stats["in_mask"]]
+        x_line = np.linspace(x_stats.min(), x_stats.max(), 100)
+        return x_line, stats["slope"] * x_line + stats["intercept"]
+
+    def describe(self, i):
+        """Tooltip text of point i."""
+        stats = self.stats
+        date = "" if self.dates is None else f"{np.asarray(self.dates)[i]}\n"
+        text = (
+            f"{date}Weight: {self.weights[i]:.2f}%\nExternal: {self.external_values[i]:.3g}\n"
+            f"z (weight, external): {stats['zy'][i]:.2f}, {stats['zx'][i]:.2f}"
+        )
+        if stats["out_mask"][i]:
+            text += "\nOutlier"
+        return text
+
+    def set_threshold(self, z_thresh):
+        """Re-mark outliers for a new threshold and redraw.
+
+        Returns:
+            The updated stats dict
+        """
+        if not self.mark_outliers:
+            return self.stats
+
+        self.stats = threshold_stats(
+            self.weights, self.external_values, self.stats["zx"], self.stats["zy"],
+            self.show_regression, True, z_thresh, self.regression
+        )
+        x, y = self.external_values, self.weights
+        in_mask, out_mask = self.stats["in_mask"], self.stats["out_mask"]
+        self.inliers.set_offsets(np.column_stack([x[in_mask], y[in_mask]]))
+        self.outliers.set_offsets(np.column_stack([x[out_mask], y[out_mask]]))
+        if self.show_regression:
+            if self.line is None:
+                self.line, = self.ax.plot(
+                    [], [], linestyle="--",
+                    label=REGRESSION_LABELS[self.regression], color="mediumorchid"
+                )
+                self.ax.legend()
+            self.line.set_data(*self._line_data())
+        self.text.set_text(self.stats["text"])
+        self.ax.figure.canvas.draw_idle()
+        return self.stats
+
+
+class PointInspector:
+    """Hover tooltips and click selection for the points of a scatter plot.
+
+    Points are looked up in a cKDTree of their display coordinates. The tree
+    is rebuilt lazily only when the axes limits or size change (zooming or
+    resizing moves the points on screen). The inspector keeps itself alive
+    through the figure, because matplotlib only holds weak references to
+    callbacks.
+    """
+
+    def __init__(self, ax, x, y, describe, on_select=None, radius=8):
+        self.ax = ax
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.describe = describe
+        self.on_select = on_select
+        self.radius = radius
+        self._tree = None
+        self._indices = None
+        self._view = None
+        self._hovered = None
+
+        self.annotation = ax.annotate(
+            "",
+            xy=(0, 0),
+            xytext=(12, 12),
+            textcoords="offset points",
+            bbox=dict(boxstyle="round", alpha=0.9, color="lavender"),
+            fontsize=8,
+            visible=False
+        )
+
+        fig = ax.figure
+        fig.canvas.mpl_connect("motion_notify_event", self._on_move)
+        fig.canvas.mpl_connect("button_press_event", self._on_click)
+        if not hasattr(fig, "_point_inspectors"):
+            fig._point_inspectors = []
+        fig._point_inspectors.append(self)
+
+    def _view_key(self):
+        return (self.ax.get_xlim(), self.ax.get_ylim(), tuple(self.ax.bbox.bounds))
+
+    def _build(self):
+        self._view = self._view_key()
+        finite = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        points = self.ax.transData.transform(np.column_stack([self.x[finite], self.y[finite]]))
+        self._tree = cKDTree(points)
+        self._indices = finite
+
+    def nearest(self, x_pixel, y_pixel):
+        """Index of the point within radius pixels of a display position, or None."""
+        if self._tree is None or self._view != self._view_key():
+            self._build()
+        if not len(self._indices):
+            return None
+        dist, pos = self._tree.query([x_pixel, y_pixel], distance_upper_bound=self.radius)
+        if not np.isfinite(dist):
+            return None
+        return int(self._indices[pos])
+
+    def _on_move(self, event):
+        index = self.nearest(event.x, event.y) if event.inaxes is self.ax else None
+        if index == self._hovered:
+            return
+        self._hovered = index
+        if index is None:
+            self.annotation.set_visible(False)
+        else:
+            self.annotation.xy = (self.x[index], self.y[index])
+            self.annotation.set_text(self.describe(index))
+            self.annotation.set_visible(True)
+        self.ax.figure.canvas.draw_idle()
+
+    def _on_click(self, event):
+        if event.inaxes is not self.ax or self.on_select is None:
+            return
+        index = self.nearest(event.x, event.y)
+        if index is not None:
+            self.on_select(index)
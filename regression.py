@@ -0,0 +1,119 @@
+import warnings
+
+import numpy as np
+from scipy.stats import linregress
+
+REGRESSION_METHODS = ("linear", "theil_sen", "siegel")
+REGRESSION_LABELS = {
+    "linear": "Linear regression",
+    "theil_sen": "Theil-Sen regression",
+    "siegel": "Siegel regression",
+}
+
+# Above these sizes slopes are computed for random pairs only, so time and
+# memory stay bounded for pooled cohort data
+MAX_PAIRS = 200_000
+SIEGEL_PARTNERS = 255
+CHUNK_ROWS = 2048
+
+
+def _finite(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.shape != y.shape:
+        raise ValueError("x and y must have the same length")
+    keep = np.isfinite(x) & np.isfinite(y)
+    return x[keep], y[keep]
+
+
+def _slopes(x, y, i, j):
+    """Slopes of the lines through points i and j; NaN for vertical pairs."""
+    dx = x[j] - x[i]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(dx != 0, (y[j] - y[i]) / dx, np.nan)
+
+
+def theil_sen(x, y, max_pairs=MAX_PAIRS, seed=0):
+    """Theil-Sen line: the median slope over pairs of points.
+
+    All n(n-1)/2 pairs are used while they fit in max_pairs. Beyond that the
+    median is taken over max_pairs random pairs, which keeps the cost
+    independent of n (the estimate stays within a few thousandths of a
+    standard error of the exact median).
+
+    Args:
+        x: Independent values
+        y: Dependent values
+        max_pairs: Largest number of pairwise slopes computed
+        seed: Seed of the pair sampling, so repeated fits agree
+
+    Returns:
+        (slope, intercept); the intercept is the median of y - slope * x
+    """
+    x, y = _finite(x, y)
+    n = len(x)
+    if n * (n - 1) // 2 <= max_pairs:
+        i, j = np.triu_indices(n, 1)
+    else:
+        rng = np.random.default_rng(seed)
+        i = rng.integers(0, n, max_pairs)
+        j = rng.integers(0, n, max_pairs)
+
+    slopes = _slopes(x, y, i, j)
+    slopes = slopes[np.isfinite(slopes)]
+    if not len(slopes):
+        raise ValueError("Need at least 2 points with different x values")
+
+    slope = float(np.median(slopes))
+    return slope, float(np.median(y - slope * x))
+
+
+def siegel(x, y, partners=SIEGEL_PARTNERS, seed=0):
+    """Siegel repeated-medians line.
+
+    For every point the median slope to the other points is taken, and the
+    line's slope is the median of those. With more than partners + 1 points
+    each point is paired with that many random partners instead of all
+    others. Rows are processed in chunks, so memory stays bounded.
+
+    Returns:
+        (slope, intercept); the intercept is the median of y - slope * x
+    """
+    x, y = _finite(x, y)
+    n = len(x)
+    exact = n <= partners + 1
+    rng = np.random.default_rng(seed)
+
+    point_medians = np.empty(n)
+    for start in range(0, n, CHUNK_ROWS):
+        i = np.arange(start, min(start + CHUNK_ROWS, n))[:, None]
+        j = np.arange(n)[None, :] if exact else rng.integers(0, n, (len(i), partners))
+        slopes = _slopes(x, y, i, j)
+        slopes[i == j] = np.nan
+        with warnings.catch_warnings():
+            # Points whose partners all share their x value give an all-NaN row
+            warnings.simplefilter("ignore", RuntimeWarning)
+            point_medians[i[:, 0]] = np.nanmedian(slopes, axis=1)
+
+    point_medians = point_medians[np.isfinite(point_medians)]
+    if not len(point_medians):
+        raise ValueError("Need at least 2 points with different x values")
+
+    slope = float(np.median(point_medians))
+    return slope, float(np.median(y - slope * x))
+
+
+def fit_line(x, y, method="linear"):
+    """Fit y = slope * x + intercept with one of REGRESSION_METHODS.
+
+    Returns:
+        (slope, intercept)
+    """
+    if method == "linear":
+        result = linregress(x, y)
+        return float(result.slope), float(result.intercept)
+    if method == "theil_sen":
+        return theil_sen(x, y)
+    if method == "siegel":
+        return siegel(x, y)
+    raise ValueError(f"Unknown regression method: {method}")
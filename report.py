@@ -0,0 +1,203 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from matplotlib.backends.backend_pdf import PdfPages
+
+from archive_source import as_source_path
+from batch_render import init_worker
+from data_loader import find_animal_folders, find_day_folders, load_weights_tolerant
+from external_values import load_daily_values_files
+from plotter import external_figure, new_figure, weights_figure
+from regression import REGRESSION_METHODS
+from sessions import SessionTable
+
+DEFAULT_REPORT_OPTIONS = {"show_regression": True, "mark_outliers": True, "z_thresh": 3.0}
+
+# Animals loaded ahead of the page being written, per worker; bounds memory
+PREFETCH_PER_WORKER = 2
+
+
+def _load_values_tolerant(day_folders, daily_filename):
+    values = np.full(len(day_folders), np.nan)
+    for i, day in enumerate(day_folders):
+        try:
+            values[i] = load_daily_values_files([day], daily_filename)[0]
+        except (OSError, ValueError, TypeError):
+            continue  # a gap on the external page
+    return values
+
+
+def load_animal(animal_folder, daily_filename=None):
+    """Load one animal's sessions and external values for the report.
+
+    Runs in a worker process; only the small arrays are sent back. A missing
+    or broken file gives a NaN weight or value for that day rather than
+    failing the whole report.
+
+    Returns:
+        (animal, table, values): values is None without a daily_filename
+    """
+    days = find_day_folders(animal_folder)
+    weights, _ = load_weights_tolerant(days)
+    table = SessionTable.from_day_folders(days, animal_folder.name, weights=weights)
+    values = None
+    if daily_filename:
+        values = _load_values_tolerant(table.day_folders, daily_filename)
+    return animal_folder.name, table, values
+
+
+def _fmt(value, spec=".2f"):
+    return "n/a" if value is None or not np.isfinite(value) else format(value, spec)
+
+
+def stats_rows(table, values=None, stats=None):
+    """(label, value) rows of an animal's summary table."""
+    weights = table.weights
+    valid = np.isfinite(weights)
+    rows = [("Sessions", f"{len(weights)} ({len(weights) - valid.sum()} failed)")]
+    if len(table):
+        rows += [
+            ("First session", str(table.dates.min())),
+            ("Last session", str(table.dates.max())),
+        ]
+    if valid.any():
+        w = weights[valid]
+        rows += [
+            ("Weight mean (sd)", f"{w.mean():.2f} ({w.std():.2f}) %"),
+            ("Weight min / max", f"{w.min():.2f} / {w.max():.2f} %"),
+            ("Latest weight", f"{weights[valid][np.argmax(table.dates[valid])]:.2f} %"),
+        ]
+    if stats is not None:
+        rows += [
+            ("Days with external value", str(int(np.isfinite(values).sum()))),
+            ("Outliers", str(int(stats["out_mask"].sum()))),
+            ("Pearson r", _fmt(stats["r"], ".3f")),
+            ("p-value", _fmt(stats["p"], ".3e")),
+            ("Slope", _fmt(stats["slope"], ".3f")),
+            ("Intercept", _fmt(stats["intercept"], ".3f")),
+        ]
+    return rows
+
+
+def stats_figure(animal, table, values=None, stats=None):
+    """Build the summary table page of one animal without pyplot."""
+    fig, ax = new_figure(figsize=(8.27, 5.83))
+    ax.axis("off")
+    table_artist = ax.table(
+        cellText=stats_rows(table, values, stats),
+        colLabels=("", animal),
+        loc="upper center",
+        cellLoc="left",
+        colWidths=(0.45, 0.45)
+    )
+    table_artist.auto_set_font_size(False)
+    table_artist.set_fontsize(10)
+    table_artist.scale(1, 1.6)
+    ax.set_title(f"{animal} - Summary")
+    return fig
+
+
+def animal_pages(animal, table, values=None, options=None):
+    """Yield the report pages of one animal, one figure at a time.
+
+    Stats are not cached (unless options pass a cache): every animal is
+    drawn once, so caching would only grow the shared cache during a run.
+    """
+    fig = weights_figure(table)
+    fig.axes[0].set_title(f"{animal} - Mouse Weight Over Time")
+    yield fig
+    stats = None
+    if values is not None:
+        fig, stats = external_figure(table, values, **{"cache": None, **(options or {})})
+        fig.axes[0].set_title(f"{animal} - Weight vs External Value")
+        yield fig
+    yield stats_figure(animal, table, values, stats)
+
+
+def _iter_loaded(animals, load, max_workers):
+    """Yield load(animal) in cohort order, with a bounded number in flight."""
+    if max_workers <= 1:
+        yield from map(load, animals)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as pool:
+        pending = deque()
+        for animal in animals:
+            pending.append(pool.submit(load, animal))
+            if len(pending) >= max_workers * PREFETCH_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_cohort_report(cohort_path, out_path, daily_filename=None,
+                        options=DEFAULT_REPORT_OPTIONS, max_workers=None):
+    """Write one multi-page PDF with the weight, external and summary pages
+    of every animal in a cohort.
+
+    Only loading is parallel: animals' files are parsed in a process pool,
+    a few animals ahead of the page being written. PdfPages has a single
+    writer, so every page is drawn and rasterized serially in this process,
+    and drawing bounds the run time once loading is fast. Pages are
+    streamed into the PDF one figure at a time and dropped once written
+    (they are not registered with pyplot, and their stats are not cached),
+    so memory stays flat however many animals the cohort has.
+
+    Args:
+        cohort_path: Folder with one folder per animal, or a single animal folder
+        out_path: Output .pdf file
+        daily_filename: Per-day external values file; without it the
+            weight vs external page and stats are left out
+        options: Options of draw_weight_vs_external (show_regression,
+            mark_outliers, z_thresh, regression, ...)
+        max_workers: Number of loading processes (1 loads in this process)
+
+    Returns:
+        Number of pages written
+    """
+    try:
+        find_day_folders(cohort_path)
+        animals = [as_source_path(cohort_path)]
+    except FileNotFoundError:
+        animals = find_animal_folders(cohort_path)
+    max_workers = max_workers or min(len(animals), os.cpu_count() or 1)
+
+    load = partial(load_animal, daily_filename=daily_filename)
+    pages = 0
+    with PdfPages(out_path) as pdf:
+        info = pdf.infodict()
+        info["Title"] = f"Weight report - {Path(str(cohort_path)).name}"
+        for animal, table, values in _iter_loaded(animals, load, max_workers):
+            for fig in animal_pages(animal, table, values, options):
+                fig.tight_layout()
+                pdf.savefig(fig)
+                pages += 1
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write a multi-page PDF report of every animal of a cohort."
+    )
+    parser.add_argument("cohort", help="Cohort folder or single animal folder")
+    parser.add_argument("output", help="Output .pdf file")
+    parser.add_argument("--daily-file", help="Per-day external values file name")
+    parser.add_argument("--regression", choices=REGRESSION_METHODS, default="linear")
+    parser.add_argument("--z-thresh", type=float, default=3.0, help="Outlier threshold")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    options = dict(DEFAULT_REPORT_OPTIONS, regression=args.regression, z_thresh=args.z_thresh)
+    pages = write_cohort_report(
+        args.cohort, args.output, args.daily_file, options, max_workers=args.workers
+    )
+    print(f"Wrote {pages} pages to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
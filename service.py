@@ -0,0 +1,292 @@
+import argparse
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+import numpy as np
+
+from cache import LRUCache, content_hash, file_fingerprint
+from data_loader import find_animal_folders, find_day_folders, find_expdetails_file
+from external_values import load_daily_values_files
+from sessions import SessionTable
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+NPY_TYPE = "application/x-npy"
+RECORD_DTYPE = np.dtype([("date", "datetime64[D]"), ("weight", "f8")])
+
+
+def check_plain_name(name, what="name"):
+    """Raise ValueError unless name is a single file or folder name.
+
+    Request paths are decoded before use, so '..' or an encoded separator
+    would otherwise reach files outside the served folder.
+    """
+    if (
+        not name
+        or name in (".", "..")
+        or "/" in name
+        or "\\" in name
+        or Path(name).name != name
+    ):
+        raise ValueError(f"Invalid {what}: {name!r}")
+    return name
+
+
+class WeightStore:
+    """Keeps parsed weights and daily values of a folder warm in memory.
+
+    root can be a cohort folder (one folder per animal) or a single animal
+    folder holding day folders. Cached entries are keyed by the size and
+    mtime of the files they were parsed from, so changed files are re-read
+    on the next request.
+    """
+
+    def __init__(self, root, cache=None):
+        self.root = Path(root)
+        self.cache = cache or LRUCache()
+
+    def animal_folders(self):
+        try:
+            find_day_folders(self.root)
+        except FileNotFoundError:
+            return {a.name: a for a in find_animal_folders(self.root)}
+        return {self.root.name: self.root}
+
+    def _animal_folder(self, animal):
+        check_plain_name(animal, "animal ID")
+        folders = self.animal_folders()
+        if animal not in folders:
+            raise KeyError(f"Unknown animal: {animal}")
+        return folders[animal]
+
+    def table(self, animal):
+        days = find_day_folders(self._animal_folder(animal))
+        files = [find_expdetails_file(d) for d in days]
+        key = content_hash("table", animal, file_fingerprint(files))
+        return self.cache.get_or_compute(
+            key, lambda: SessionTable.from_day_folders(days, animal)
+        )
+
+    def daily_values(self, animal, filename):
+        check_plain_name(filename, "values file name")
+        table = self.table(animal)
+        files = [d / filename for d in table.day_folders]
+        key = content_hash("daily_values", animal, filename, file_fingerprint(files))
+        return self.cache.get_or_compute(
+            key, lambda: np.asarray(load_daily_values_files(table, filename), dtype=float)
+        )
+
+
+def table_to_records(table):
+    records = np.empty(len(table), dtype=RECORD_DTYPE)
+    records["date"] = table.dates
+    records["weight"] = table.weights
+    return records
+
+
+def _npy_bytes(array):
+    buf = io.BytesIO()
+    np.save(buf, array, allow_pickle=False)
+    return buf.getvalue()
+
+
+class WeightRequestHandler(BaseHTTPRequestHandler):
+    """Read-only routes:
+
+    GET /animals
+    GET /animals/<animal>/weights[?format=npy]
+    GET /animals/<animal>/values/<filename>[?format=npy]
+    """
+
+    store = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        as_npy = parse_qs(url.query).get("format", ["json"])[0] == "npy"
+
+        try:
+            for part in parts:
+                check_plain_name(part, "path segment")
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+
+        try:
+            if parts == ["animals"]:
+                payload = {"animals": sorted(self.store.animal_folders())}
+                self._send_json(payload, content_hash(payload))
+            elif len(parts) == 3 and parts[0] == "animals" and parts[2] == "weights":
+                self._send_table(self.store.table(parts[1]), as_npy)
+            elif len(parts) == 4 and parts[0] == "animals" and parts[2] == "values":
+                values = self.store.daily_values(parts[1], parts[3])
+                etag = content_hash(values)
+                if as_npy:
+                    self._send(lambda: _npy_bytes(values), NPY_TYPE, etag)
+                else:
+                    self._send_json({"values": values.tolist()}, etag)
+            else:
+                self._send_error(404, "Not found")
+        except KeyError as e:
+            self._send_error(404, str(e.args[0]))
+        except (FileNotFoundError, ValueError) as e:
+            self._send_error(422, str(e))
+
+    def _send_table(self, table, as_npy):
+        etag = content_hash(table.dates, table.weights, table.animal_names)
+        if as_npy:
+            self._send(lambda: _npy_bytes(table_to_records(table)), NPY_TYPE, etag)
+        else:
+            self._send_json({
+                "animal": table.animal_names[0],
+                "dates": list(np.datetime_as_string(table.dates, unit="D")),
+                "weights": table.weights.tolist(),
+                "day_folders": [str(d) for d in table.day_folders],
+            }, etag)
+
+    def _send_json(self, payload, etag):
+        self._send(lambda: json.dumps(payload).encode(), "application/json", etag)
+
+    def _send(self, make_body, content_type, etag):
+        etag = f'"{etag}"'
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        body = make_body()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(root, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Create (but do not start) a server for the given folder; port 0 picks a free port."""
+    handler = type("BoundWeightRequestHandler", (WeightRequestHandler,), {"store": WeightStore(root)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_server(root, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Start a server in a daemon thread; stop it with server.shutdown()."""
+    server = make_server(root, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class ServiceError(Exception):
+    pass
+
+
+class ServiceClient:
+    """Client for the weight service; remembers ETags to avoid re-downloads."""
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._etags = {}
+
+    def _get(self, path):
+        url = self.base_url + path
+        request = urllib.request.Request(url)
+        if url in self._etags:
+            request.add_header("If-None-Match", self._etags[url][0])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                etag = response.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return self._etags[url][1]
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(f"{e.code}: {message}") from None
+        except urllib.error.URLError as e:
+            raise ServiceError(f"Cannot reach weight service at {self.base_url}: {e.reason}") from None
+
+        if etag:
+            self._etags[url] = (etag, body)
+        return body
+
+    def animals(self):
+        return json.loads(self._get("/animals"))["animals"]
+
+    def table(self, animal):
+        data = json.loads(self._get(f"/animals/{quote(animal)}/weights"))
+        return SessionTable(
+            np.array(data["dates"], dtype="datetime64[D]"),
+            np.array(data["weights"], dtype=float),
+            animal_names=(data["animal"],),
+            day_folders=[Path(d) for d in data["day_folders"]],
+        )
+
+    def records(self, animal):
+        """Dates and weights as a structured array, using the binary npy route."""
+        body = self._get(f"/animals/{quote(animal)}/weights?format=npy")
+        return np.load(io.BytesIO(body), allow_pickle=False)
+
+    def daily_values(self, animal, filename):
+        body = self._get(f"/animals/{quote(animal)}/values/{quote(filename)}?format=npy")
+        return np.load(io.BytesIO(body), allow_pickle=False)
+
+
+def is_service_url(text):
+    return text.startswith(("http://", "https://"))
+
+
+def remote_source(url):
+    """(client, animal) of a URL like http://127.0.0.1:8765/IP75."""
+    parts = urlsplit(url)
+    base, _, animal = parts.path.rstrip("/").rpartition("/")
+    if not animal:
+        raise ValueError("Service URL must end with an animal ID, e.g. http://127.0.0.1:8765/IP75")
+    return ServiceClient(f"{parts.scheme}://{parts.netloc}{base}"), unquote(animal)
+
+
+def open_remote_table(url):
+    """Load one animal's table from a URL like http://127.0.0.1:8765/IP75."""
+    client, animal = remote_source(url)
+    return client.table(animal)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve cohort weights over local HTTP/JSON.")
+    parser.add_argument("root", help="Cohort folder or single animal folder")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.root, args.host, args.port)
+    print(f"Serving {args.root} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
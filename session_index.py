@@ -0,0 +1,240 @@
+import re
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+from data_loader import find_expdetails_file
+from weight_parser import parse_expdetails, field_key
+
+DEFAULT_INDEX_PATH = Path.home() / ".mouse_weight_tracker" / "sessions.sqlite"
+
+SESSION_COLUMNS = ("animal", "date", "weight", "grams")
+# Names accepted for the session columns, as written in ExpDetails files
+FIELD_ALIASES = {"bw": "weight"}
+OPERATORS = {"=": "=", "==": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    day_path TEXT UNIQUE NOT NULL,
+    file_path TEXT NOT NULL,
+    animal TEXT,
+    date TEXT NOT NULL,
+    weight REAL,
+    grams REAL,
+    mtime_ns INTEGER,
+    size INTEGER
+);
+CREATE TABLE IF NOT EXISTS fields (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    text TEXT,
+    num REAL,
+    PRIMARY KEY (session_id, name)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions(date);
+CREATE INDEX IF NOT EXISTS idx_sessions_animal_date ON sessions(animal, date);
+CREATE INDEX IF NOT EXISTS idx_sessions_weight ON sessions(weight);
+CREATE INDEX IF NOT EXISTS idx_fields_name_num ON fields(name, num);
+"""
+
+TERM_PATTERN = re.compile(r"^\s*([A-Za-z][\w ]*?)\s*(==|!=|<=|>=|=|<|>)\s*(.+?)\s*$")
+
+
+def _iso_date(value):
+    """Convert 'YYYYMMDD', 'YYYY-MM-DD' or a date object to 'YYYY-MM-DD'."""
+    if isinstance(value, date):
+        return value.isoformat()
+    digits = str(value).replace("-", "")
+    if not re.fullmatch(r"\d{8}", digits):
+        raise ValueError(f"Invalid date: {value}")
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+class SessionIndex:
+    """Persistent SQLite index of parsed ExpDetails records.
+
+    Sessions are keyed by day folder. Re-indexing only re-parses files whose
+    size or modification time changed, and queries never touch the day folders.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH, timeout=5.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # timeout: seconds to wait for another writer before 'database is locked'
+        self.conn = sqlite3.connect(str(self.db_path), timeout=timeout)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        self.failed = []
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, day_folders, animal=None):
+        """Index the given day folders.
+
+        Days whose ExpDetails file is missing, unreadable or has no BW, and
+        folders not named by a date, are skipped (and dropped from the index) and listed in self.failed as
+        (day, message) pairs.
+
+        Args:
+            day_folders: Iterable of Path objects representing day folders
+            animal: Optional animal ID overriding the one found in the files
+
+        Returns:
+            Number of sessions that were (re)parsed
+        """
+        parsed = 0
+        self.failed = []
+        with self.conn:
+            for day in day_folders:
+                try:
+                    txt_file = find_expdetails_file(day)
+                    stat = txt_file.stat()
+                    row = self.conn.execute(
+                        "SELECT id, mtime_ns, size FROM sessions WHERE day_path = ?",
+                        (str(day),)
+                    ).fetchone()
+                    if row and row["mtime_ns"] == stat.st_mtime_ns and row["size"] == stat.st_size:
+                        continue
+                    self.add_record(day, txt_file, parse_expdetails(txt_file), stat, animal)
+                except (OSError, ValueError) as e:
+                    self.failed.append((day, str(e)))
+                    # A session that no longer parses must not match queries
+                    self.conn.execute("DELETE FROM sessions WHERE day_path = ?", (str(day),))
+                    continue
+                parsed += 1
+        return parsed
+
+    def add_record(self, day, txt_file, record, stat=None, animal=None):
+        """Insert or replace one parsed ExpDetails record."""
+        animal = animal or record["animal"] or txt_file.name.split("_")[0]
+        self.conn.execute(
+            """
+            INSERT INTO sessions (day_path, file_path, animal, date, weight, grams, mtime_ns, size)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(day_path) DO UPDATE SET
+                file_path = excluded.file_path, animal = excluded.animal,
+                date = excluded.date, weight = excluded.weight, grams = excluded.grams,
+                mtime_ns = excluded.mtime_ns, size = excluded.size
+            """,
+            (
+                str(day), str(txt_file), animal, _iso_date(Path(str(day)).name),
+                record["weight"], record["grams"],
+                stat.st_mtime_ns if stat else None, stat.st_size if stat else None,
+            ),
+        )
+        session_id = self.conn.execute(
+            "SELECT id FROM sessions WHERE day_path = ?", (str(day),)
+        ).fetchone()[0]
+        self.conn.execute("DELETE FROM fields WHERE session_id = ?", (session_id,))
+        self.conn.executemany(
+            "INSERT INTO fields (session_id, name, text, num) VALUES (?, ?, ?, ?)",
+            [(session_id, name, text, num) for name, (text, num) in record["fields"].items()],
+        )
+        return session_id
+
+    def query(self, animal=None, start=None, end=None, min_weight=None,
+              max_weight=None, where=()):
+        """Find indexed sessions matching all given conditions.
+
+        Args:
+            animal: Animal ID
+            start, end: Inclusive date bounds ('YYYYMMDD', 'YYYY-MM-DD' or date)
+            min_weight, max_weight: Inclusive bounds on the BW percentage
+            where: Iterable of (field, operator, value) tuples, e.g.
+                [("frame_rate", "=", 30), ("weight", "<", 80)]. 'animal',
+                'date', 'weight' (or 'BW') and 'grams' refer to the session
+                columns, any other name to the parsed header fields.
+
+        Returns:
+            List of dicts with the session columns, sorted by animal and date
+        """
+        clauses, params = [], []
+        if animal is not None:
+            clauses.append("s.animal = ?")
+            params.append(animal)
+        if start is not None:
+            clauses.append("s.date >= ?")
+            params.append(_iso_date(start))
+        if end is not None:
+            clauses.append("s.date <= ?")
+            params.append(_iso_date(end))
+        if min_weight is not None:
+            clauses.append("s.weight >= ?")
+            params.append(float(min_weight))
+        if max_weight is not None:
+            clauses.append("s.weight <= ?")
+            params.append(float(max_weight))
+
+        for name, op, value in where:
+            if op not in OPERATORS:
+                raise ValueError(f"Unsupported operator: {op}")
+            name = field_key(name)
+            name = FIELD_ALIASES.get(name, name)
+            if name in SESSION_COLUMNS:
+                if name == "date":
+                    value = _iso_date(value)
+                clauses.append(f"s.{name} {OPERATORS[op]} ?")
+                params.append(value)
+                continue
+            column = "num" if isinstance(value, (int, float)) else "text"
+            clauses.append(
+                "EXISTS (SELECT 1 FROM fields f WHERE f.session_id = s.id "
+                f"AND f.name = ? AND f.{column} {OPERATORS[op]} ?)"
+            )
+            params.extend([name, value])
+
+        sql = "SELECT s.* FROM sessions s"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY s.animal, s.date"
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def fields(self, day_path):
+        """Return the header fields indexed for one day folder."""
+        rows = self.conn.execute(
+            "SELECT f.name, f.text, f.num FROM fields f "
+            "JOIN sessions s ON s.id = f.session_id WHERE s.day_path = ?",
+            (str(day_path),),
+        )
+        return {row["name"]: (row["text"], row["num"]) for row in rows}
+
+
+def parse_query(text, today=None):
+    """Parse a filter string into keyword arguments for SessionIndex.query.
+
+    Terms are separated by commas or 'and', e.g.
+    "frame_rate = 30, BW < 80%, last_days = 30". 'bw' is an alias for
+    'weight' and 'last_days = N' keeps the sessions of the last N days.
+    """
+    today = today or date.today()
+    kwargs = {"where": []}
+
+    for term in re.split(r",|\band\b", text, flags=re.IGNORECASE):
+        if not term.strip():
+            continue
+        match = TERM_PATTERN.match(term)
+        if not match:
+            raise ValueError(f"Invalid filter term: {term.strip()}")
+        name, op, value = field_key(match.group(1)), match.group(2), match.group(3).rstrip("%")
+
+        if name == "last_days":
+            kwargs["start"] = today - timedelta(days=int(value))
+            continue
+        name = FIELD_ALIASES.get(name, name)
+        if name not in ("animal", "date"):
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        kwargs["where"].append((name, op, value))
+
+    return kwargs
@@ -0,0 +1,246 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from data_loader import find_animal_folders, find_day_folders, load_weights_for_selected_days
+
+
+def folder_dates(day_folders):
+    """Convert YYYYMMDD folder names to a datetime64[D] array."""
+    names = [Path(str(d)).name for d in day_folders]
+    return np.array(
+        [f"{n[:4]}-{n[4:6]}-{n[6:8]}" for n in names], dtype="datetime64[D]"
+    )
+
+
+RESAMPLE_PERIODS = ("week", "month")
+RESAMPLE_HOWS = ("mean", "min", "max", "count", "last")
+WEEK_START = np.datetime64("1970-01-05", "D")  # a Monday
+
+
+def period_starts(dates, period):
+    """First day of the week (Monday) or month holding each date."""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    if period == "week":
+        offset = (dates - WEEK_START).astype(np.int64)
+        return WEEK_START + (offset // 7) * 7
+    if period == "month":
+        return dates.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unknown resampling period: {period}")
+
+
+def resample_series(dates, values, period="week", how="mean", groups=None):
+    """Aggregate values per calendar period (and per group, e.g. animal).
+
+    Rows are sorted once by (group, period, date) and every period is then
+    reduced with ufunc.reduceat, so there is no Python loop per period. NaN
+    values are ignored; a period holding only NaN gives NaN (count gives 0).
+
+    Args:
+        dates: datetime64[D] date of every value
+        values: Values to aggregate
+        period: One of RESAMPLE_PERIODS
+        how: One of RESAMPLE_HOWS; 'last' is the latest non-NaN value
+        groups: Optional integer group of every value (e.g. animal codes)
+
+    Returns:
+        (groups, period_starts, aggregated), one entry per non-empty
+        (group, period), sorted by group and date
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype=float)
+    groups = np.zeros(len(dates), dtype=np.int32) if groups is None else np.asarray(groups)
+    if how not in RESAMPLE_HOWS:
+        raise ValueError(f"Unknown aggregation: {how}")
+
+    buckets = period_starts(dates, period)
+    order = np.lexsort((dates, buckets, groups))
+    buckets, groups, values = buckets[order], groups[order], values[order]
+    if not len(values):
+        return groups, buckets, values
+
+    starts = np.flatnonzero(np.r_[True, (buckets[1:] != buckets[:-1]) | (groups[1:] != groups[:-1])])
+    finite = np.isfinite(values)
+    count = np.add.reduceat(finite.astype(np.int64), starts)
+
+    if how == "count":
+        result = count.astype(float)
+    elif how == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = np.add.reduceat(np.where(finite, values, 0.0), starts) / count
+    elif how == "min":
+        result = np.fmin.reduceat(values, starts)
+    elif how == "max":
+        result = np.fmax.reduceat(values, starts)
+    else:
+        last = np.maximum.reduceat(np.where(finite, np.arange(len(values)), -1), starts)
+        result = np.where(last >= 0, values[last], np.nan)
+
+    return groups[starts], buckets[starts], result
+
+
+class SessionRecord:
+    """One session (day) of one animal."""
+
+    __slots__ = ("animal", "date", "weight", "day_folder")
+
+    def __init__(self, animal, date, weight, day_folder=None):
+        self.animal = animal
+        self.date = date
+        self.weight = weight
+        self.day_folder = day_folder
+
+    def __repr__(self):
+        return f"SessionRecord({self.animal!r}, {self.date}, {self.weight})"
+
+
+class SessionTable:
+    """Columnar table of sessions.
+
+    Dates are a datetime64[D] array, weights a float array and animals are
+    stored as integer codes into a tuple of interned animal IDs. Day folders
+    are kept alongside so values can still be loaded for each row.
+    """
+
+    __slots__ = ("dates", "weights", "animal_codes", "animal_names", "day_folders")
+
+    def __init__(self, dates, weights, animal_codes=None, animal_names=("",),
+                 day_folders=None):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.weights = np.asarray(weights)
+        if self.weights.dtype.kind != "f":
+            self.weights = self.weights.astype(np.float64)
+        if animal_codes is None:
+            animal_codes = np.zeros(len(self.dates), dtype=np.int32)
+        self.animal_codes = np.asarray(animal_codes, dtype=np.int32)
+        self.animal_names = tuple(sys.intern(str(a)) for a in animal_names)
+        self.day_folders = list(day_folders) if day_folders is not None else []
+
+        if not (len(self.dates) == len(self.weights) == len(self.animal_codes)):
+            raise ValueError("Dates, weights and animals must have the same length")
+
+    @classmethod
+    def from_day_folders(cls, day_folders, animal=None, weights=None, dtype=np.float64):
+        """Build a table for the given day folders of one animal.
+
+        Args:
+            day_folders: List of Path objects representing day folders
+            animal: Animal ID, defaults to the name of the parent folder
+            weights: Already loaded weights; loaded from the ExpDetails files if None
+            dtype: Float dtype of the weights column (np.float32 halves memory)
+        """
+        day_folders = list(day_folders)
+        if animal is None:
+            animal = Path(str(day_folders[0])).parent.name if day_folders else ""
+        if weights is None:
+            weights = load_weights_for_selected_days(day_folders)
+        return cls(
+            folder_dates(day_folders),
+            np.asarray(weights, dtype=dtype),
+            np.zeros(len(day_folders), dtype=np.int32),
+            (animal,),
+            day_folders,
+        )
+
+    @classmethod
+    def from_cohort(cls, cohort_path, dtype=np.float64):
+        """Build one table holding every animal folder of a cohort."""
+        return cls.concat(
+            cls.from_day_folders(find_day_folders(animal), animal.name, dtype=dtype)
+            for animal in find_animal_folders(cohort_path)
+        )
+
+    @classmethod
+    def concat(cls, tables):
+        """Stack several tables, merging their animal ID lists."""
+        tables = list(tables)
+        names = []
+        lookup = {}
+        codes = []
+        for table in tables:
+            remap = np.empty(len(table.animal_names), dtype=np.int32)
+            for i, name in enumerate(table.animal_names):
+                if name not in lookup:
+                    lookup[name] = len(names)
+                    names.append(name)
+                remap[i] = lookup[name]
+            codes.append(remap[table.animal_codes])
+
+        if not tables:
+            return cls([], [])
+        return cls(
+            np.concatenate([t.dates for t in tables]),
+            np.concatenate([t.weights for t in tables]),
+            np.concatenate(codes),
+            names,
+            [d for t in tables for d in t.day_folders],
+        )
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return SessionRecord(
+                self.animal_names[self.animal_codes[index]],
+                self.dates[index],
+                float(self.weights[index]),
+                self.day_folders[index] if self.day_folders else None,
+            )
+        rows = np.arange(len(self))[index]
+        return SessionTable(
+            self.dates[rows],
+            self.weights[rows],
+            self.animal_codes[rows],
+            self.animal_names,
+            [self.day_folders[i] for i in rows] if self.day_folders else None,
+        )
+
+    def resample(self, period="week", how="mean"):
+        """Weekly or monthly summary of every animal's weights.
+
+        Returns:
+            SessionTable with one row per animal and period, dated by the
+            period's first day; weights hold the aggregated values (session
+            counts for how='count')
+        """
+        codes, dates, values = resample_series(
+            self.dates, self.weights, period, how, self.animal_codes
+        )
+        return SessionTable(dates, values, codes, self.animal_names)
+
+    @property
+    def animals(self):
+        """Animal ID of every row (object array sharing the interned strings)."""
+        return np.array(self.animal_names, dtype=object)[self.animal_codes]
+
+    def for_animal(self, animal):
+        if animal not in self.animal_names:
+            return self[np.zeros(len(self), dtype=bool)]
+        return self[self.animal_codes == self.animal_names.index(animal)]
+
+    def date_labels(self):
+        """Dates as 'YYYYMMDD' strings, matching the day folder names."""
+        return np.char.replace(np.datetime_as_string(self.dates, unit="D"), "-", "")
+
+    def to_dict(self):
+        """Columns in the layout used by the .mat/.npy exports."""
+        data = {
+            "weights": self.weights,
+            "dates": np.array(self.date_labels(), dtype=object),
+        }
+        if len(self.animal_names) > 1:
+            data["animals"] = self.animals
+        return data
+
+
+def as_weights_and_dates(weights, dates=None):
+    """Unpack a SessionTable into weight and date arrays; pass anything else through."""
+    if isinstance(weights, SessionTable):
+        return weights.weights, weights.dates
+    return weights, dates
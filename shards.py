@@ -0,0 +1,323 @@
+import argparse
+import json
+import math
+import os
+import socket
+import time
+from pathlib import Path
+
+from archive_source import as_source_path
+from cache import content_hash
+from data_loader import find_animal_folders, find_day_folders, find_expdetails_file
+from exporters import HEADER, delimiter_for, write_delimited
+from external_values import load_daily_values_files
+from snapshot import day_from_json, day_to_json
+from weight_parser import extract_weight
+
+MANIFEST_VERSION = 1
+DEFAULT_SHARD_SIZE = 500
+
+
+def _write_json_atomic(path, data):
+    # Readers on other machines see the old file or the whole new one
+    tmp = path.with_name(f"{path.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _animal_folders(root):
+    try:
+        find_day_folders(root)
+        return [as_source_path(root)]
+    except FileNotFoundError:
+        return find_animal_folders(root)
+
+
+def _root_labels(roots):
+    """Shortest trailing part of every root path that no other root shares."""
+    paths = [Path(os.path.abspath(str(root))) for root in roots]
+    if len(set(paths)) < len(paths):
+        raise ValueError("A cohort folder is listed more than once")
+    parts = [path.parts[1:] for path in paths]
+    labels = []
+    for own in parts:
+        depth = 1
+        while depth < len(own) and sum(p[-depth:] == own[-depth:] for p in parts) > 1:
+            depth += 1
+        labels.append("/".join(own[-depth:]))
+    return labels
+
+
+def write_manifest(roots, manifest_path, shard_size=DEFAULT_SHARD_SIZE, daily_filename=None):
+    """List every day folder of one or more cohorts in a manifest file.
+
+    Days are sorted by animal and date and split into shards of shard_size
+    days. With several roots (e.g. one cohort per lab), animals are named
+    '<root folder>/<animal>' so equal animal IDs of different labs stay apart;
+    roots with the same folder name are told apart by their parent folders
+    ('labA/cohort/<animal>'). Listing one root twice raises ValueError.
+
+    Args:
+        roots: Cohort folder(s) or single animal folder(s)
+        manifest_path: Output .json file; its work folder is created next to it
+        shard_size: Number of days per shard
+        daily_filename: Optional per-day values file added as a 'value' column
+
+    Returns:
+        The manifest dict
+    """
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+    roots = [roots] if isinstance(roots, (str, os.PathLike)) else list(roots)
+
+    labels = _root_labels(roots)
+    days = []
+    for root, label in zip(roots, labels):
+        for animal_folder in _animal_folders(root):
+            animal = animal_folder.name
+            if len(roots) > 1:
+                animal = f"{label}/{animal}"
+            days += [(animal, day.name, day_to_json(day)) for day in find_day_folders(animal_folder)]
+    days.sort(key=lambda d: (d[0], d[1]))
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "roots": [str(root) for root in roots],
+        "shard_size": shard_size,
+        "daily_filename": daily_filename,
+        "days": [[animal, day] for animal, _, day in days],
+    }
+    manifest["id"] = content_hash(manifest["days"], shard_size=shard_size, daily_filename=daily_filename)
+
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_json_atomic(manifest_path, manifest)
+    return manifest
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Manifest not found: {manifest_path}") from None
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version in {manifest_path}")
+    return manifest
+
+
+def shard_count(manifest):
+    return math.ceil(len(manifest["days"]) / manifest["shard_size"])
+
+
+def shard_days(manifest, shard):
+    """(animal, day folder) pairs of one shard."""
+    size = manifest["shard_size"]
+    return [(animal, day_from_json(day)) for animal, day in manifest["days"][shard * size:(shard + 1) * size]]
+
+
+def work_dir(manifest_path, manifest):
+    """Folder next to the manifest holding the claims and partial results.
+
+    It is named by the manifest ID, so rewriting an unchanged manifest keeps
+    the finished shards while a changed one starts over.
+    """
+    manifest_path = Path(manifest_path)
+    return manifest_path.with_name(manifest_path.stem + ".shards") / manifest["id"][:16]
+
+
+def _claim_path(work, shard):
+    return work / "claims" / f"shard-{shard:05d}.claim"
+
+
+def _result_path(work, shard):
+    return work / "results" / f"shard-{shard:05d}.json"
+
+
+def claim_shard(work, shard, worker_id, reclaim_after=None):
+    """Claim a shard for this worker.
+
+    The claim file is created with O_EXCL, which succeeds for exactly one
+    worker, also across machines sharing the folder. A claim older than
+    reclaim_after seconds (a worker that died) is moved aside first; only
+    one worker can win that rename as well. Should two workers still end up
+    with the same shard, they write identical results.
+
+    Returns:
+        True if this worker now owns the shard
+    """
+    path = _claim_path(work, shard)
+    if reclaim_after is not None:
+        try:
+            if time.time() - path.stat().st_mtime > reclaim_after:
+                os.rename(path, path.with_name(f"{path.name}.stale-{worker_id}"))
+        except FileNotFoundError:
+            pass
+
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(f"{worker_id}\n")
+    return True
+
+
+def process_shard(manifest, shard):
+    """Parse the weights (and values) of one shard.
+
+    Days whose weight or value fails get None in that column and are listed
+    in 'errors' instead of stopping the shard.
+
+    Returns:
+        Partial result dict with 'rows' [animal, 'YYYY-MM-DD', weight(, value)]
+    """
+    daily_filename = manifest.get("daily_filename")
+    rows, errors = [], []
+    for animal, day in shard_days(manifest, shard):
+        try:
+            weight = extract_weight(find_expdetails_file(day))
+        except (OSError, ValueError) as e:
+            weight = None
+            errors.append([day_to_json(day), str(e)])
+        row = [animal, f"{day.name[:4]}-{day.name[4:6]}-{day.name[6:]}", weight]
+        if daily_filename:
+            try:
+                value = float(load_daily_values_files([day], daily_filename)[0])
+            except (OSError, ValueError) as e:
+                value = math.nan
+                errors.append([day_to_json(day), str(e)])
+            row.append(value if math.isfinite(value) else None)
+        rows.append(row)
+    return {"manifest": manifest["id"], "shard": shard, "rows": rows, "errors": errors}
+
+
+def run_worker(manifest_path, worker_id=None, reclaim_after=None):
+    """Process shards of a manifest until none are left to claim.
+
+    Any number of workers may run at once, as processes on one machine or
+    on several machines sharing the manifest folder. Each result is written
+    under a temporary name and renamed into place when complete.
+
+    Args:
+        manifest_path: Manifest written by write_manifest
+        worker_id: Name recorded in claim files (default host-pid)
+        reclaim_after: Take over claims older than this many seconds
+
+    Returns:
+        List of the shards processed by this worker
+    """
+    manifest = load_manifest(manifest_path)
+    work = work_dir(manifest_path, manifest)
+    (work / "claims").mkdir(parents=True, exist_ok=True)
+    (work / "results").mkdir(parents=True, exist_ok=True)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    done = []
+    for shard in range(shard_count(manifest)):
+        if _result_path(work, shard).exists():
+            continue
+        if not claim_shard(work, shard, worker_id, reclaim_after):
+            continue
+        _write_json_atomic(_result_path(work, shard), process_shard(manifest, shard))
+        done.append(shard)
+    return done
+
+
+def shard_status(manifest_path):
+    """Counts of 'done', 'claimed' (in progress) and 'pending' shards."""
+    manifest = load_manifest(manifest_path)
+    work = work_dir(manifest_path, manifest)
+    status = {"done": 0, "claimed": 0, "pending": 0}
+    for shard in range(shard_count(manifest)):
+        if _result_path(work, shard).exists():
+            status["done"] += 1
+        elif _claim_path(work, shard).exists():
+            status["claimed"] += 1
+        else:
+            status["pending"] += 1
+    return status
+
+
+def merge_results(manifest_path, out_path, delimiter=None):
+    """Combine the partial results of all shards into one CSV/TSV table.
+
+    The output only depends on the manifest and the parsed files, not on
+    which worker processed which shard or in what order: rows are sorted by
+    animal and date and the table is replaced atomically, so merging again
+    gives the same file.
+
+    Returns:
+        (rows, errors): number of rows written and list of [day, message]
+    """
+    manifest = load_manifest(manifest_path)
+    work = work_dir(manifest_path, manifest)
+
+    rows, errors, missing = [], [], []
+    for shard in range(shard_count(manifest)):
+        try:
+            with open(_result_path(work, shard)) as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            missing.append(shard)
+            continue
+        if result.get("manifest") != manifest["id"]:
+            raise ValueError(f"Result of shard {shard} belongs to a different manifest")
+        rows += [tuple(math.nan if v is None else v for v in row) for row in result["rows"]]
+        errors += result["errors"]
+    if missing:
+        raise ValueError(f"{len(missing)} of {shard_count(manifest)} shards are not done: {missing[:10]}")
+
+    rows.sort(key=lambda row: (row[0], row[1]))
+    header = HEADER + (("value",) if manifest.get("daily_filename") else ())
+    out_path = Path(out_path)
+    # The temporary name has no .tsv suffix, so pick the delimiter here
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    count = write_delimited(tmp, rows, header, delimiter or delimiter_for(out_path))
+    os.replace(tmp, out_path)
+    return count, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Process many cohorts in shards, with workers on several processes or machines."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    manifest = commands.add_parser("manifest", help="List all day folders in a manifest")
+    manifest.add_argument("roots", nargs="+", help="Cohort folders or single animal folders")
+    manifest.add_argument("--out", required=True, help="Manifest .json file")
+    manifest.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    manifest.add_argument("--daily-file", help="Per-day external values file name")
+
+    work = commands.add_parser("work", help="Claim and process shards until none are left")
+    work.add_argument("manifest")
+    work.add_argument("--worker-id")
+    work.add_argument("--reclaim-after", type=float, help="Take over claims older than this many seconds")
+
+    status = commands.add_parser("status", help="Show how many shards are done")
+    status.add_argument("manifest")
+
+    merge = commands.add_parser("merge", help="Combine the shard results into one table")
+    merge.add_argument("manifest")
+    merge.add_argument("output", help="Output .csv or .tsv file")
+    args = parser.parse_args(argv)
+
+    if args.command == "manifest":
+        result = write_manifest(args.roots, args.out, args.shard_size, args.daily_file)
+        print(f"{len(result['days'])} days in {shard_count(result)} shards written to {args.out}")
+    elif args.command == "work":
+        done = run_worker(args.manifest, args.worker_id, args.reclaim_after)
+        print(f"Processed {len(done)} shards")
+    elif args.command == "status":
+        print(", ".join(f"{n} {state}" for state, n in shard_status(args.manifest).items()))
+    else:
+        count, errors = merge_results(args.manifest, args.output)
+        print(f"Wrote {count} rows to {args.output} ({len(errors)} days failed)")
+        for day, message in errors:
+            print(f"  {day}: {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+from archive_source import ArchivePath, as_source_path
+from cache import file_fingerprint
+from data_loader import find_expdetails_file
+from sessions import SessionTable
+from weight_parser import extract_weight
+
+SNAPSHOT_PATH = Path.home() / ".mouse_weight_tracker" / "session.json"
+SNAPSHOT_VERSION = 1
+
+
+def day_to_json(day):
+    """Day folder as JSON: a path string, or [archive, member] inside archives."""
+    if isinstance(day, ArchivePath):
+        return [str(day.archive_path), day.member]
+    return str(day)
+
+
+def day_from_json(data):
+    # No file system access, so restoring stays instant
+    if isinstance(data, list):
+        return ArchivePath(*data)
+    return Path(data)
+
+
+class SessionSnapshot:
+    """The last GUI session: base path, selected days, settings and parsed data.
+
+    Weights are kept per day together with the size and mtime of the
+    ExpDetails file they were parsed from. External values are kept per
+    cache kind with the fingerprint of the files they came from. table()
+    rebuilds the weights without touching the files; verify() then checks
+    the fingerprints and re-parses only days whose files changed.
+    """
+
+    def __init__(self, base_path="", days=(), settings=None, weights=None, external=None):
+        self.base_path = base_path
+        self.days = list(days)
+        self.settings = dict(settings or {})
+        self.weights = dict(weights or {})
+        self.external = dict(external or {})
+
+    def record_table(self, table):
+        """Remember the weights of a loaded SessionTable, with the current
+        size and mtime of their ExpDetails files."""
+        for day, weight in zip(table.day_folders, table.weights):
+            try:
+                txt_file = find_expdetails_file(day)
+                st = txt_file.stat()
+            except (FileNotFoundError, OSError):
+                continue
+            self.weights[str(day)] = {
+                "file": day_to_json(txt_file),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "weight": None if math.isnan(weight) else float(weight),
+            }
+
+    def record_external(self, kind, fingerprint, values):
+        """Remember external values loaded from files with the given fingerprint."""
+        self.external[kind] = {
+            "fingerprint": [list(f) for f in fingerprint],
+            "values": np.asarray(values, dtype=float).tolist(),
+        }
+
+    def table(self):
+        """SessionTable of the recorded weights of the selected days.
+
+        Days without a recorded weight are NaN until verify() parses them.
+        """
+        weights = []
+        for day in self.days:
+            entry = self.weights.get(str(day))
+            weight = entry["weight"] if entry else None
+            weights.append(math.nan if weight is None else weight)
+        return SessionTable.from_day_folders(self.days, weights=weights)
+
+    def verify(self):
+        """Check the recorded files and re-parse the days whose file changed.
+
+        Days whose file is unchanged keep their recorded weight, also when it
+        is None because the file has no weight. A day whose file is missing
+        or fails to parse gets NaN instead of failing the whole restore.
+
+        Returns:
+            (table, fingerprint, refreshed): the up-to-date SessionTable, the
+            file_fingerprint of the days' existing ExpDetails files and the
+            list of re-parsed days
+        """
+        files = []
+        refreshed = []
+        for day in self.days:
+            try:
+                txt_file = find_expdetails_file(day)
+                st = txt_file.stat()
+            except OSError:
+                self.weights.pop(str(day), None)
+                continue
+            files.append(txt_file)
+            entry = self.weights.get(str(day))
+            if (
+                entry
+                and entry["file"] == day_to_json(txt_file)
+                and entry["size"] == st.st_size
+                and entry["mtime_ns"] == st.st_mtime_ns
+            ):
+                continue
+            try:
+                weight = extract_weight(txt_file)
+            except (OSError, ValueError):
+                weight = None
+            self.weights[str(day)] = {
+                "file": day_to_json(txt_file),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "weight": weight,
+            }
+            refreshed.append(day)
+
+        fingerprint = file_fingerprint(files)
+        return self.table(), fingerprint, refreshed
+
+    def verified_external(self):
+        """{kind: (fingerprint, values)} of external values whose files are unchanged.
+
+        Entries with changed or missing files are dropped from the snapshot.
+        """
+        valid = {}
+        for kind, entry in list(self.external.items()):
+            recorded = [tuple(f) for f in entry["fingerprint"]]
+            # Plain paths stay strings so the fingerprint matches the recorded one
+            paths = [as_source_path(f[0]) for f in recorded]
+            paths = [p if isinstance(p, ArchivePath) else f[0] for p, f in zip(paths, recorded)]
+            try:
+                current = file_fingerprint(paths)
+            except OSError:
+                current = None
+            if current == recorded:
+                valid[kind] = (current, entry["values"])
+            else:
+                del self.external[kind]
+        return valid
+
+    def to_dict(self):
+        return {
+            "version": SNAPSHOT_VERSION,
+            "base_path": self.base_path,
+            "days": [day_to_json(d) for d in self.days],
+            "settings": self.settings,
+            "weights": self.weights,
+            "external": self.external,
+        }
+
+    def save(self, path=SNAPSHOT_PATH):
+        """Write the snapshot atomically, so a crash never leaves half a file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH):
+        """Read a snapshot; returns None if there is none or it cannot be used."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            return None
+        return cls(
+            data.get("base_path", ""),
+            [day_from_json(d) for d in data.get("days", [])],
+            data.get("settings"),
+            data.get("weights"),
+            data.get("external"),
+        )
@@ -1,5 +1,60 @@
 import sys
 from pathlib import Path
 
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
 # Add parent directory to Python path so tests can import project modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def close_figures():
+    """Close pyplot figures left open by a test, so memory does not build up."""
+    yield
+    plt.close("all")
+
+
+@pytest.fixture
+def make_days():
+    """Factory writing one day folder per entry of weights into a folder.
+
+    Entries are a BW% number, the raw ExpDetails text, or None for a day
+    without an ExpDetails file. Days are named 20251201, 20251202, ...
+    unless names are given; fields adds per-day 'Name: value' header lines.
+    Every day also gets values_file with its entry of values (default: the
+    day index); values_file=None writes no values.
+    """
+    def make(base, weights, animal="IP75", names=None, fields=None, values=None,
+             values_file="daily_value.npy"):
+        names = names or [f"202512{i + 1:02d}" for i in range(len(weights))]
+        fields = fields or [{}] * len(weights)
+        days = []
+        for i, (name, weight) in enumerate(zip(names, weights)):
+            day = Path(base) / name
+            day.mkdir(parents=True)
+            content = weight
+            if weight is not None and not isinstance(weight, str):
+                content = f"{animal} (Training Operant)\n{name}\n\nBW: {weight}% 21.2g\n"
+                content += "".join(f"{key}: {value}\n" for key, value in fields[i].items())
+            if content is not None:
+                (day / f"{animal}_{name}_ExpDetails.txt").write_text(content)
+            if values_file:
+                value = [float(i)] if values is None else values[i]
+                np.save(day / values_file, np.asarray(value, dtype=float))
+            days.append(day)
+        return days
+    return make
+
+
+@pytest.fixture
+def make_cohort(make_days):
+    """Factory writing a cohort folder with the same days for every animal."""
+    def make(base, animals=("IP75", "IP76"), weights=(80.0, 81.0, 82.0), **options):
+        for animal in animals:
+            make_days(Path(base) / animal, weights, animal, **options)
+        return base
+    return make
@@ -0,0 +1,87 @@
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+import numpy as np
+import pytest
+from archive_source import ArchivePath, as_source_path
+from data_loader import find_day_folders, find_expdetails_file, find_animal_folders, load_weights_for_selected_days
+from external_values import load_daily_values_files
+from weight_parser import extract_weight
+
+
+def make_base(root):
+    base = root / "IP75"
+    for i, date in enumerate(["20251201", "20251202", "20251203"]):
+        day = base / date
+        day.mkdir(parents=True)
+        (day / f"IP75_{date}_ExpDetails.txt").write_text(f"IP75\n{date}\nBW: {80 + i}% 21.2g\n")
+        np.save(day / "daily_value.npy", np.array([float(i)]))
+    (base / "20251201" / "imaging.raw").write_bytes(b"\0" * 4096)
+    return base
+
+
+@pytest.fixture(params=["zip", "tar.gz", "tar"])
+def archive(request):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        base = make_base(tmp / "src")
+        path = tmp / f"IP75.{request.param}"
+        if request.param == "zip":
+            with zipfile.ZipFile(path, "w") as zf:
+                for f in base.rglob("*"):
+                    zf.write(f, f.relative_to(base.parent))
+        else:
+            mode = "w:gz" if request.param == "tar.gz" else "w"
+            with tarfile.open(path, mode) as tf:
+                tf.add(base, arcname="IP75")
+        yield path
+
+
+def test_find_day_folders_in_archive(archive):
+    """Test discovering day folders inside an archive's top-level folder."""
+    days = find_day_folders(archive)
+
+    assert [d.name for d in days] == ["20251201", "20251202", "20251203"]
+    assert all(isinstance(d, ArchivePath) for d in days)
+    assert find_day_folders(str(archive) + "/IP75") == days
+
+
+def test_load_from_archive_without_extracting(archive):
+    """Test reading weights and daily values straight from archive members."""
+    before = sorted(archive.parent.rglob("*"))
+    days = find_day_folders(archive)
+
+    txt = find_expdetails_file(days[0])
+    assert txt.name == "IP75_20251201_ExpDetails.txt"
+    assert extract_weight(txt) == 80.0
+    assert load_weights_for_selected_days(days) == [80.0, 81.0, 82.0]
+    assert load_daily_values_files(days, "daily_value.npy") == [0.0, 1.0, 2.0]
+    assert sorted(archive.parent.rglob("*")) == before
+
+
+def test_missing_member_raises(archive):
+    """Test that a missing daily values file inside an archive is reported."""
+    days = find_day_folders(archive)
+    with pytest.raises(FileNotFoundError, match="Missing values file"):
+        load_daily_values_files(days, "other.npy")
+
+
+def test_cohort_archive_animals():
+    """Test finding animal folders in an archived cohort."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        make_base(tmp / "cohort")
+        path = tmp / "cohort.zip"
+        with zipfile.ZipFile(path, "w") as zf:
+            for f in (tmp / "cohort").rglob("*"):
+                zf.write(f, f.relative_to(tmp))
+
+        animals = find_animal_folders(path)
+        assert [a.name for a in animals] == ["IP75"]
+
+
+def test_as_source_path_plain_folder():
+    """Test that regular folders stay Path objects."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert as_source_path(tmp_dir) == Path(tmp_dir)
@@ -0,0 +1,77 @@
+import tempfile
+from pathlib import Path
+import matplotlib.pyplot as plt
+from batch_render import render_animal, render_cohort, option_set_tag
+from data_loader import find_animal_folders
+
+
+def test_find_animal_folders(make_cohort):
+    """Test that only folders containing day folders are animals."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir))
+        (base / "notes").mkdir()
+
+        animals = find_animal_folders(base)
+        assert [a.name for a in animals] == ["IP75", "IP76"]
+
+
+def test_option_set_tag():
+    """Test file name tags of plot option sets."""
+    assert option_set_tag({"show_regression": False, "mark_outliers": False}) == "plain"
+    assert option_set_tag({"show_regression": True, "mark_outliers": True, "z_thresh": 2.5}) == "reg_outliers2.5"
+
+
+def test_render_animal_writes_files_without_pyplot(make_cohort):
+    """Test rendering one animal in PNG and SVG without opening pyplot figures."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", animals=("IP75",))
+        out = Path(tmp_dir) / "out"
+        open_figures = plt.get_fignums()
+
+        paths = render_animal(base / "IP75", out, formats=("png", "svg"), daily_filename="daily_value.npy")
+
+        # weight vs days + two default option sets, in two formats each
+        assert len(paths) == 6
+        assert all(p.exists() and p.stat().st_size > 0 for p in paths)
+        assert plt.get_fignums() == open_figures
+
+
+def test_render_cohort_process_pool(make_cohort):
+    """Test rendering a whole cohort in a process pool."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort")
+        out = Path(tmp_dir) / "out"
+
+        results, failures = render_cohort(base, out, max_workers=2)
+
+        assert set(results) == {"IP75", "IP76"}
+        assert failures == {}
+        assert (out / "IP76_weight_vs_days.png").exists()
+
+
+def test_render_cohort_continues_past_a_broken_animal(make_cohort):
+    """Test that one animal with a bad day is reported while the others are rendered."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", animals=("IP75", "IP76", "IP77"))
+        (base / "IP76" / "20251202" / "IP76_20251202_ExpDetails.txt").write_text("no weight")
+        out = Path(tmp_dir) / "out"
+
+        results, failures = render_cohort(base, out, max_workers=2)
+
+        assert set(results) == {"IP75", "IP77"}
+        assert list(failures) == ["IP76"] and "BW not found" in failures["IP76"]
+        assert (out / "IP77_weight_vs_days.png").exists()
+
+
+def test_render_animal_reuses_cached_figures(make_cohort):
+    """Test that unchanged figures are taken from the figure cache."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", animals=("IP75",))
+        cache_dir = Path(tmp_dir) / "cache"
+
+        first = render_animal(base / "IP75", Path(tmp_dir) / "out1", cache_dir=cache_dir)
+        cached = sorted(cache_dir.iterdir())
+        second = render_animal(base / "IP75", Path(tmp_dir) / "out2", cache_dir=cache_dir)
+
+        assert sorted(cache_dir.iterdir()) == cached
+        assert first[0].read_bytes() == second[0].read_bytes()
@@ -0,0 +1,57 @@
+import tempfile
+from pathlib import Path
+import numpy as np
+from cache import LRUCache, content_hash
+from plotter import compute_external_stats
+
+
+def test_content_hash_depends_on_data_and_options():
+    """Test that equal data gives equal keys and options change the key."""
+    a = np.array([1.0, 2.0, 3.0])
+
+    assert content_hash(a, mark_outliers=True) == content_hash(a.copy(), mark_outliers=True)
+    assert content_hash(a, mark_outliers=True) != content_hash(a, mark_outliers=False)
+    assert content_hash(a) != content_hash(a.astype(np.float32))
+
+
+def test_lru_eviction_and_counters():
+    """Test that the least recently used entry is evicted at the memory cap."""
+    cache = LRUCache(max_bytes=2 * 8 * 100)
+    cache.put("a", np.zeros(100))
+    cache.put("b", np.zeros(100))
+    cache.get("a")
+    cache.put("c", np.zeros(100))
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_spill_to_disk():
+    """Test that evicted entries are read back from the spill folder."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LRUCache(max_bytes=8 * 100, spill_dir=Path(tmp_dir))
+        cache.put("a", np.arange(100.0))
+        cache.put("b", np.zeros(100))
+
+        assert np.array_equal(cache.get("a"), np.arange(100.0))
+        assert cache.disk_hits == 1
+
+
+def test_external_stats_are_cached():
+    """Test that repeated statistics with the same data and options hit the cache."""
+    cache = LRUCache()
+    weights = np.array([80.0, 81.5, 82.0, 83.5, 120.0])
+    values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+
+    first = compute_external_stats(weights, values, mark_outliers=True, z_thresh=1.9, cache=cache)
+    second = compute_external_stats(weights, values, mark_outliers=True, z_thresh=1.9, cache=cache)
+    compute_external_stats(weights, values, mark_outliers=True, z_thresh=2.5, cache=cache)
+
+    assert first is second
+    # Stats miss twice; the z-scores are computed once and reused for the new threshold
+    assert cache.hits == 2
+    assert cache.misses == 3
+    assert first["out_mask"][4]
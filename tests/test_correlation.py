@@ -0,0 +1,170 @@
+import csv
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy.io import savemat
+from scipy.stats import false_discovery_control, pearsonr
+
+from correlation import (
+    WEIGHT_NAME,
+    correlate_variables,
+    correlation_figure,
+    export_correlations,
+    lagged_correlation,
+    lagged_figure,
+    pearson_matrix,
+)
+from external_values import join_by_date, load_multi_values_file, to_datetime64
+from sessions import SessionTable
+
+
+def _behaviour(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = rng.normal(80, 3, n)
+    values = np.column_stack([
+        2 * weights + rng.normal(0, 2, n),  # licks follow the weight
+        rng.normal(size=n),
+        rng.normal(size=n),
+    ])
+    return weights, values
+
+
+def test_matrix_matches_pairwise_pearsonr():
+    """Test r and p of every pair against scipy, with pairwise-complete NaN handling."""
+    weights, values = _behaviour()
+    weights[4] = np.nan
+    values[[1, 9], 1] = np.nan
+    data = np.column_stack([weights, values])
+
+    r, p, n = pearson_matrix(data)
+
+    for i in range(4):
+        for j in range(i + 1, 4):
+            keep = np.isfinite(data[:, i]) & np.isfinite(data[:, j])
+            expected = pearsonr(data[keep, i], data[keep, j])
+            assert r[i, j] == pytest.approx(expected[0])
+            assert r[j, i] == pytest.approx(expected[0])
+            assert p[i, j] == pytest.approx(expected[1])
+            assert n[i, j] == keep.sum()
+    assert np.allclose(np.diag(r), 1.0)
+
+
+def test_fdr_and_table_export():
+    """Test the BH correction over distinct pairs and the exported table."""
+    weights, values = _behaviour()
+    result = correlate_variables(weights, values, ("licks", "trials", "run"))
+
+    assert result.names == (WEIGHT_NAME, "licks", "trials", "run")
+    upper = np.triu_indices(4, 1)
+    assert np.allclose(result.q[upper], false_discovery_control(result.p[upper]))
+    assert np.allclose(result.q, result.q.T, equal_nan=True)
+    assert result.significant()[0, 1]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out = Path(tmp_dir) / "correlations.tsv"
+        assert export_correlations(result, out) == 6
+        with open(out, newline="") as f:
+            rows = list(csv.reader(f, delimiter="\t"))
+    assert rows[0] == ["variable_a", "variable_b", "n", "r", "p", "q"]
+    assert rows[1][:3] == [WEIGHT_NAME, "licks", "60"]
+
+
+def test_degenerate_columns_are_nan():
+    """Test that constant or too sparse variables give NaN instead of errors."""
+    data = np.column_stack([
+        np.arange(10.0),
+        np.ones(10),
+        [1.0, 2.0] + [np.nan] * 8,
+    ])
+    r, p, _ = pearson_matrix(data)
+
+    assert np.isnan(r[0, 1]) and np.isnan(p[0, 1])
+    assert np.isnan(r[0, 2])
+
+
+def test_load_multi_values_and_join_by_date():
+    """Test loading several dated variables and matching them to days."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "behaviour.mat"
+        savemat(path, {
+            "dates": np.array([20251203, 20251201, 20251202]),
+            "licks": np.array([30.0, 10.0, 20.0]),
+            "reward": np.array([[3.0, 0.3], [1.0, 0.1], [2.0, 0.2]]),
+        })
+        dates, names, values = load_multi_values_file(path)
+
+    assert names == ("licks", "reward_1", "reward_2")
+    assert values.shape == (3, 3)
+
+    days = to_datetime64(["20251201", "20251202", "20251204"])
+    keep, matched = join_by_date(days, dates, values)
+    assert keep.all()
+    assert matched[:2].tolist() == [[10.0, 1.0, 0.1], [20.0, 2.0, 0.2]]
+    assert np.isnan(matched[2]).all()
+
+
+def test_correlation_figure():
+    """Test that the annotated matrix is drawn with one label per variable."""
+    weights, values = _behaviour()
+    fig = correlation_figure(correlate_variables(weights, values, ("a", "b", "c")))
+    ax = fig.axes[0]
+
+    assert [t.get_text() for t in ax.get_yticklabels()] == [WEIGHT_NAME, "a", "b", "c"]
+    assert len(ax.texts) == 12
+
+
+def _delayed_cohort(seed=0):
+    """Two animals on irregular days; the value follows the weight by 2 days."""
+    rng = np.random.default_rng(seed)
+    tables, values = [], []
+    for animal in ("IP75", "IP76"):
+        days = np.sort(rng.choice(120, 80, replace=False))
+        weights = rng.normal(80, 3, 120)
+        delayed = 2 * np.roll(weights, 2) + rng.normal(0, 1, 120)
+        dates = np.datetime64("2025-01-01") + days
+        tables.append(SessionTable(dates, weights[days], animal_names=(animal,)))
+        values.append(delayed[days])
+    return SessionTable.concat(tables), np.concatenate(values)
+
+
+def test_lagged_correlation_matches_calendar_pairs():
+    """Test every lag against pearsonr over pairs that are lag calendar days apart."""
+    table, values = _delayed_cohort()
+    result = lagged_correlation(table, values, max_lag=4)
+
+    assert result.lags.tolist() == list(range(-4, 5))
+    assert result.best_lag == 2
+
+    by_day = {
+        (code, date): (weight, value)
+        for code, date, weight, value in zip(table.animal_codes, table.dates, table.weights, values)
+    }
+    for lag in result.lags:
+        pairs = [
+            (weight, by_day[(code, date + np.timedelta64(lag, "D"))][1])
+            for (code, date), (weight, _) in by_day.items()
+            if (code, date + np.timedelta64(lag, "D")) in by_day
+        ]
+        x, y = np.array(pairs).T
+        r, p, n = result.at(lag)
+        assert n == len(pairs)
+        assert r == pytest.approx(pearsonr(x, y)[0])
+        assert p == pytest.approx(pearsonr(x, y)[1])
+
+
+def test_lagged_correlation_edge_cases():
+    """Test missing values, lags without pairs and the figure."""
+    dates = to_datetime64(["20251201", "20251202", "20251203", "20251204", "20251220"])
+    weights = np.array([80.0, 81.0, np.nan, 83.0, 84.0])
+    result = lagged_correlation(weights, [1.0, 2.0, 3.0, 4.0, 5.0], dates, max_lag=10)
+
+    assert result.at(0)[2] == 4
+    assert np.isnan(result.at(10)[0])  # no two sessions 10 days apart
+
+    with pytest.raises(ValueError):
+        lagged_correlation(weights, [1.0, 2.0], dates)
+
+    fig = lagged_figure(lagged_correlation(*_delayed_cohort(), max_lag=3))
+    assert "lag +2 d" in fig.axes[0].texts[0].get_text()
@@ -1,6 +1,9 @@
+import os
 import tempfile
 from pathlib import Path
-from data_loader import find_day_folders, find_expdetails_file
+from unittest.mock import patch
+import data_loader
+from data_loader import find_day_folders, find_expdetails_file, scan_day_folders
 
 def test_find_valid_day_folders():
     """Test finding valid date-formatted folders."""
@@ -71,3 +74,42 @@ def test_missing_expdetails_file_raises():
             assert False, "Should have raised FileNotFoundError"
         except FileNotFoundError as e:
             assert "Missing ExpDetails file" in str(e)
+
+
+def test_day_folder_listing_is_cached_by_mtime():
+    """Test that unchanged directories are not listed again."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        (base / "20251201").mkdir()
+        (base / "20251201" / "IP75_20251201_ExpDetails.txt").write_text("BW: 83%")
+        # Backdate the folders so their listings are not considered racy
+        for folder in (base / "20251201", base):
+            os.utime(folder, ns=(0, 10**18))
+
+        data_loader.clear_listing_cache()
+        find_day_folders(str(base))
+        find_expdetails_file(base / "20251201")
+
+        with patch("data_loader.os.scandir", side_effect=AssertionError("listed again")):
+            assert find_day_folders(str(base)) == [base / "20251201"]
+            assert find_expdetails_file(base / "20251201").name == "IP75_20251201_ExpDetails.txt"
+
+        # Adding a folder changes the base mtime and invalidates the listing
+        (base / "20251202").mkdir()
+        assert len(find_day_folders(str(base))) == 2
+
+
+def test_scan_day_folders_collects_files():
+    """Test discovering ExpDetails and value files in one pass."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        (base / "20251201").mkdir()
+        (base / "20251201" / "IP75_20251201_ExpDetails.txt").write_text("BW: 83%")
+        (base / "20251201" / "daily_value.npy").write_bytes(b"")
+        (base / "20251202").mkdir()
+
+        days = scan_day_folders(base, value_filenames=["daily_value.npy"])
+
+        assert days[base / "20251201"]["expdetails"].name == "IP75_20251201_ExpDetails.txt"
+        assert "daily_value.npy" in days[base / "20251201"]["values"]
+        assert days[base / "20251202"]["expdetails"] is None
@@ -0,0 +1,70 @@
+import csv
+import tempfile
+from pathlib import Path
+from exporters import export_cohort, iter_cohort_rows, iter_table_rows, write_delimited
+from sessions import SessionTable
+
+
+def test_iter_table_rows():
+    """Test rows produced from a SessionTable."""
+    table = SessionTable(["2025-12-01", "2025-12-02"], [80.0, 81.5], animal_names=("IP75",))
+    assert list(iter_table_rows(table)) == [
+        ("IP75", "2025-12-01", 80.0),
+        ("IP75", "2025-12-02", 81.5),
+    ]
+
+
+def test_rows_are_streamed():
+    """Test that the writer consumes a generator lazily."""
+    produced = []
+
+    def rows():
+        for i in range(3):
+            produced.append(i)
+            yield ("IP75", f"2025-12-0{i + 1}", 80.0 + i)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        gen = rows()
+        assert produced == []
+        count = write_delimited(Path(tmp_dir) / "out.csv", gen)
+
+        assert count == 3
+        assert produced == [0, 1, 2]
+
+
+def test_export_cohort_tsv(make_cohort):
+    """Test a cohort-wide TSV export with daily values."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", weights=(80, 81))
+        out = Path(tmp_dir) / "cohort.tsv"
+
+        assert export_cohort(base, out, daily_filename="daily_value.npy") == 4
+
+        with open(out, newline="") as f:
+            rows = list(csv.reader(f, delimiter="\t"))
+        assert rows[0] == ["animal", "date", "weight", "value"]
+        assert rows[1] == ["IP75", "2025-12-01", "80.0", "0.0"]
+        assert rows[-1][0] == "IP76"
+
+
+def test_iter_cohort_rows_single_animal(make_cohort):
+    """Test that a single animal folder is also accepted."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir), weights=(80, 81))
+        rows = list(iter_cohort_rows(base / "IP76"))
+        assert [r[0] for r in rows] == ["IP76", "IP76"]
+
+
+def test_export_cohort_resampled(make_cohort):
+    """Test weekly rows with aggregated weights and values."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", weights=(80, 81))
+        out = Path(tmp_dir) / "weekly.csv"
+
+        assert export_cohort(base, out, daily_filename="daily_value.npy",
+                             period="week", how="mean") == 2
+
+        with open(out, newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[1] == ["IP75", "2025-12-01", "80.5", "0.5"]
+        assert [r[0] for r in rows[1:]] == ["IP75", "IP76"]
@@ -1,7 +1,19 @@
 import numpy as np
+import pytest
 import tempfile
 import pickle
-from external_values import load_single_values_file, detect_outliers
+from pathlib import Path
+from scipy.io import savemat
+from external_values import (
+    load_single_values_file,
+    load_daily_values_files,
+    reduce_values_file,
+    reduce_array,
+    detect_outliers,
+    to_datetime64,
+    join_by_date,
+    load_dated_values_file,
+)
 
 def test_load_npy_array():
     """Test loading a numpy array from .npy file."""
@@ -108,3 +120,135 @@ def test_detect_outliers_low_threshold():
     
     # Lower threshold should catch more or equal outliers
     assert np.sum(out_mask_low) >= np.sum(out_mask_high)
+
+
+def test_daily_reductions(make_days):
+    """Test reducing per-trial arrays to one value per day."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        days = make_days(Path(tmp_dir), [None, None], values=[[1, 2, 3, 10], [4, 4, np.nan, 5]],
+                         values_file="trials.npy")
+
+        assert load_daily_values_files(days, "trials.npy", reduce="mean") == [4.0, 13 / 3]
+        assert load_daily_values_files(days, "trials.npy", reduce="median") == [2.5, 4.0]
+        assert load_daily_values_files(days, "trials.npy", reduce="sum") == [16.0, 13.0]
+        assert load_daily_values_files(days, "trials.npy", reduce="fraction_above", threshold=3.5) == [0.25, 1.0]
+        assert load_daily_values_files(days, "trials.npy", reduce=np.nanmax) == [10.0, 5.0]
+
+
+def test_missing_day_folder_gives_missing_file_message():
+    """Test that a day folder that does not exist reports the missing values file."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with pytest.raises(FileNotFoundError, match="Missing values file 'daily.npy'"):
+            load_daily_values_files([Path(tmp_dir) / "20251201"], "daily.npy")
+
+
+def test_multi_value_file_without_reduction_raises(make_days):
+    """Test that per-trial files still need a reduction."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        days = make_days(Path(tmp_dir), [None], values=[[1, 2, 3]], values_file="trials.npy")
+        try:
+            load_daily_values_files(days, "trials.npy")
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "Expected exactly one value" in str(e)
+
+
+def test_chunked_reduction_matches_numpy():
+    """Test that chunked reductions of a memory-mapped file are exact."""
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(300, 101))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "trials.npy"
+        np.save(path, data)
+
+        assert np.isclose(reduce_values_file(path, "mean", chunk_size=1000), data.mean())
+        assert reduce_values_file(path, "median", chunk_size=1000) == np.median(data)
+
+
+def test_chunked_reduction_of_fortran_ordered_file():
+    """Test chunked reductions of Fortran-ordered and strided memory-mapped arrays."""
+    data = np.asfortranarray(np.random.default_rng(1).normal(size=(200, 51)))
+    data[3, 7] = np.nan
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "trials.npy"
+        np.save(path, data)
+
+        assert np.isclose(reduce_values_file(path, "mean", chunk_size=1000), np.nanmean(data))
+        assert reduce_values_file(path, "median", chunk_size=1000) == np.nanmedian(data)
+        strided = np.load(path, mmap_mode="r")[::3, 1::2]
+        assert np.isclose(reduce_array(strided, "sum", chunk_size=100), np.nansum(data[::3, 1::2]))
+
+
+def test_unknown_reduction_raises():
+    """Test that unknown reduction names are rejected."""
+    try:
+        reduce_array(np.arange(3.0), "mode")
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "Unknown reduction" in str(e)
+
+
+def test_to_datetime64_formats():
+    """Test converting numeric and string dates."""
+    dates = to_datetime64([20251201, "2025-12-31", "20240229"])
+    assert list(dates.astype(str)) == ["2025-12-01", "2025-12-31", "2024-02-29"]
+
+
+def test_to_datetime64_rejects_impossible_dates():
+    """Test that out-of-range months and days raise instead of rolling over."""
+    for bad in ("20251340", "20251232", "20250229", "20251200", "20250001"):
+        with pytest.raises(ValueError):
+            to_datetime64([20251201, bad])
+
+
+def test_join_by_date_nan_and_inner():
+    """Test matching unordered dated values to days with gaps."""
+    days = to_datetime64([20251201, 20251202, 20251204])
+    value_dates = to_datetime64([20251204, 20251201, 20251203])
+    values = [3.0, 1.0, 2.0]
+
+    keep, matched = join_by_date(days, value_dates, values, how="nan")
+    assert keep.all()
+    assert matched[0] == 1.0 and np.isnan(matched[1]) and matched[2] == 3.0
+
+    keep, matched = join_by_date(days, value_dates, values, how="inner")
+    assert list(keep) == [True, False, True]
+    assert list(matched) == [1.0, 3.0]
+
+
+def test_join_by_date_duplicate_dates_raise():
+    """Test that duplicate value dates are rejected."""
+    try:
+        join_by_date(to_datetime64([20251201]), to_datetime64([20251201, 20251201]), [1.0, 2.0])
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "duplicate" in str(e)
+
+
+def test_load_dated_values_npz_and_two_columns():
+    """Test loading dated values from .npz and a two-column .npy."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        npz = Path(tmp_dir) / "values.npz"
+        np.savez(npz, dates=np.array(["2025-12-02", "2025-12-01"]), values=np.array([2.0, 1.0]))
+        dates, values = load_dated_values_file(npz)
+        assert str(dates[0]) == "2025-12-02" and list(values) == [2.0, 1.0]
+
+        npy = Path(tmp_dir) / "values.npy"
+        np.save(npy, np.array([[20251201, 5.0], [20251203, 6.0]]))
+        dates, values = load_dated_values_file(npy)
+        assert str(dates[1]) == "2025-12-03" and list(values) == [5.0, 6.0]
+
+        plain = Path(tmp_dir) / "plain.npy"
+        np.save(plain, np.array([1.0, 2.0, 3.0]))
+        dates, values = load_dated_values_file(plain)
+        assert dates is None and len(values) == 3
+
+
+def test_load_dated_values_mat():
+    """Test loading dated values from a MATLAB file."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "values.mat"
+        savemat(path, {"dates": np.array([20251201, 20251202]), "licks": np.array([10.0, 20.0])})
+        dates, values = load_dated_values_file(path)
+        assert list(dates.astype(str)) == ["2025-12-01", "2025-12-02"]
+        assert list(values) == [10.0, 20.0]
@@ -0,0 +1,100 @@
+import tempfile
+from pathlib import Path
+import numpy as np
+from heatmap import cohort_matrix, downsample, heatmap_figure, latest_values, row_order
+from sessions import SessionTable
+
+
+def make_table():
+    # IP76 misses 2025-12-02, IP77 only has the last day
+    return SessionTable(
+        ["2025-12-01", "2025-12-02", "2025-12-03", "2025-12-01", "2025-12-03", "2025-12-03"],
+        [80.0, 81.0, 82.0, 90.0, 88.0, 70.0],
+        [0, 0, 0, 1, 1, 2],
+        ("IP75", "IP76", "IP77"),
+    )
+
+
+def test_cohort_matrix_has_nan_for_missing_sessions():
+    """Test the animals x calendar days layout."""
+    matrix, animals, first = cohort_matrix(make_table())
+
+    assert animals == ("IP75", "IP76", "IP77")
+    assert first == np.datetime64("2025-12-01")
+    assert np.array_equal(matrix, [
+        [80.0, 81.0, 82.0],
+        [90.0, np.nan, 88.0],
+        [np.nan, np.nan, 70.0],
+    ], equal_nan=True)
+
+
+def test_row_orders():
+    """Test sorting rows by name, latest weight and clustering."""
+    matrix, animals, _ = cohort_matrix(make_table())
+
+    assert latest_values(matrix).tolist() == [82.0, 88.0, 70.0]
+    assert row_order(matrix, animals, "name").tolist() == [0, 1, 2]
+    assert row_order(matrix, animals, "latest").tolist() == [1, 0, 2]
+    assert sorted(row_order(matrix, animals, "cluster").tolist()) == [0, 1, 2]
+
+
+def test_downsample_averages_blocks_ignoring_nan():
+    """Test block averaging of matrices larger than the display."""
+    matrix = np.arange(16, dtype=float).reshape(4, 4)
+    matrix[0, 0] = np.nan
+
+    small, row_step, col_step = downsample(matrix, max_rows=2, max_cols=2)
+
+    assert (row_step, col_step) == (2, 2)
+    assert small.tolist() == [[(1 + 4 + 5) / 3, 4.5], [10.5, 12.5]]
+    assert downsample(matrix, 4, 4)[0] is matrix
+
+
+def test_large_cohort_renders_as_one_downsampled_image():
+    """Test that hundreds of animals over years of sessions render in one image,
+    block-averaged when larger than the display limits."""
+    rng = np.random.default_rng(0)
+    n_animals, n_days = 300, 1000
+    codes = np.repeat(np.arange(n_animals), n_days)
+    dates = np.tile(np.datetime64("2023-01-01") + np.arange(n_days), n_animals)
+    keep = rng.random(codes.size) < 0.7
+    table = SessionTable(dates[keep], rng.normal(85, 5, codes.size)[keep], codes[keep],
+                         [f"A{i}" for i in range(n_animals)])
+
+    fig = heatmap_figure(table, sort="cluster")
+    images = fig.axes[0].get_images()
+    assert len(images) == 1
+    # By default there are no more cells than pixels of the axes
+    pixels = fig.axes[0].get_window_extent()
+    rows, cols = images[0].get_array().shape
+    assert rows == n_animals and cols <= pixels.width < n_days
+
+    fig = heatmap_figure(table, sort="cluster", max_rows=100, max_cols=450)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fig.savefig(Path(tmp_dir) / "heatmap.png")
+    ax = fig.axes[0]
+    images = ax.get_images()
+    assert len(images) == 1
+    assert images[0].get_array().shape == (100, 334)
+    # Blocks of 3 animals x 3 days; the padding of the last column of
+    # blocks lies past the last date, outside the axes limits
+    left, right, bottom, top = images[0].get_extent()
+    assert (right - left, bottom, top) == (1002, n_animals, 0)
+    assert ax.get_xlim() == (left, left + n_days)
+    assert ax.get_ylim() == (n_animals, 0)
+
+
+def test_cohort_table_from_folders():
+    """Test building one table from every animal folder of a cohort."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        for animal, weight in (("IP75", 80), ("IP76", 90)):
+            day = base / animal / "20251201"
+            day.mkdir(parents=True)
+            (day / f"{animal}_20251201_ExpDetails.txt").write_text(f"BW: {weight}% 21.2g")
+
+        table = SessionTable.from_cohort(base)
+
+        assert sorted(table.animal_names) == ["IP75", "IP76"]
+        matrix, animals, _ = cohort_matrix(table)
+        assert dict(zip(animals, matrix[:, 0])) == {"IP75": 80.0, "IP76": 90.0}
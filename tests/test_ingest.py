@@ -0,0 +1,121 @@
+import http.client
+import queue
+import tempfile
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from ingest import IngestClient, IngestHub, start_ingest_server
+from service import ServiceError
+from session_index import SessionIndex
+
+EXPDETAILS = "IP75 (Training Operant)\n20251204\n\nBW: 81.5% 21.2g\nFrame rate: 30\n"
+
+
+@pytest.fixture
+def ingest():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        hub = IngestHub(Path(tmp_dir) / "sessions.sqlite")
+        server = start_ingest_server(hub, port=0)
+        host, port = server.server_address
+        yield hub, IngestClient(f"http://{host}:{port}")
+        server.shutdown()
+        server.server_close()
+
+
+def test_submit_expdetails_text_notifies_listeners(ingest):
+    """Test that a submitted ExpDetails text is stored, indexed and announced."""
+    hub, client = ingest
+    received = queue.Queue()
+    hub.subscribe(received.put)
+
+    result = client.submit_text(EXPDETAILS)
+
+    assert result == {"animal": "IP75", "date": "20251204", "weight": 81.5}
+    record = received.get(timeout=1)
+    assert record["fields"]["frame_rate"] == ("30", 30.0)
+
+    table = hub.table("IP75")
+    assert str(table.dates[0]) == "2025-12-04"
+    assert table.weights.tolist() == [81.5]
+
+    with SessionIndex(hub.index_path) as index:
+        rows = index.query(animal="IP75", where=[("frame_rate", "=", 30)])
+    assert [row["date"] for row in rows] == ["2025-12-04"]
+
+
+def test_submit_records_replace_by_date(ingest):
+    """Test parsed records, re-submission of a day and reading sessions back."""
+    hub, client = ingest
+    client.submit_record("IP76", "2025-12-02", 80.0, fields={"AOM": 21})
+    client.submit_record("IP76", "20251201", 79.0)
+    client.submit_record("IP76", "20251202", 82.0)
+
+    assert client.animals() == ["IP76"]
+    table = client.table("IP76")
+    assert np.datetime_as_string(table.dates).tolist() == ["2025-12-01", "2025-12-02"]
+    assert table.weights.tolist() == [79.0, 82.0]
+    assert table.day_folders[0].name == "20251201"
+
+
+def test_invalid_sessions_are_rejected(ingest):
+    """Test that sessions with a missing or invalid weight, date or field are refused and not stored."""
+    hub, client = ingest
+    received = []
+    unsubscribe = hub.subscribe(received.append)
+
+    with pytest.raises(ServiceError, match="422"):
+        client.submit_text("IP75\n20251204\nno weight here\n")
+    with pytest.raises(ServiceError, match="date"):
+        client.submit_text("IP75\nBW: 80% 20g\n")
+    with pytest.raises(ServiceError, match="weight"):
+        client.submit_record("IP75", "20251204", "heavy")
+    with pytest.raises(ServiceError, match="422: Invalid session date"):
+        client.submit_record("IP75", "20251399", 80.0)
+    with pytest.raises(ServiceError, match="422"):
+        client.submit_record("IP75", "20251204", 80.0, fields=["frame_rate"])
+    with pytest.raises(ServiceError, match="422"):
+        client.submit_record("IP75", "20251204", 80.0, grams={"g": 20})
+    with pytest.raises(ServiceError, match="422"):
+        client.submit_record("IP75", "20251204", 80.0, day_folder=5)
+    with pytest.raises(ServiceError, match="422"):
+        client.submit_record(["IP75"], "20251204", 80.0)
+    with pytest.raises(ServiceError, match="422"):
+        client.submit_record("IP75", "20251204", True)
+
+    assert received == []
+    assert hub.animals() == []
+
+    unsubscribe()
+    client.submit_record("IP75", "20251204", 80.0)
+    assert received == []
+
+
+def test_negative_content_length_is_refused(ingest):
+    """Test that a negative Content-Length gets 400 instead of a blocking read."""
+    hub, client = ingest
+    host, port = client.base_url.rsplit("/", 1)[1].split(":")
+    connection = http.client.HTTPConnection(host, int(port), timeout=5)
+    connection.putrequest("POST", "/sessions")
+    connection.putheader("Content-Length", "-1")
+    connection.endheaders()
+
+    assert connection.getresponse().status == 400
+    connection.close()
+
+
+def test_locked_index_gives_503(ingest):
+    """Test that a locked session index is reported as temporarily unavailable."""
+    hub, client = ingest
+    client.submit_record("IP75", "20251201", 80.0)
+    with SessionIndex(hub.index_path) as index:
+        index.conn.execute("BEGIN EXCLUSIVE")
+        with patch("ingest.SessionIndex", partial(SessionIndex, timeout=0.1)):
+            with pytest.raises(ServiceError, match="503"):
+                client.submit_record("IP75", "20251202", 81.0)
+        index.conn.rollback()
+
+    assert hub.table("IP75").weights.tolist() == [80.0]
@@ -0,0 +1,96 @@
+import os
+import tempfile
+from pathlib import Path
+from merkle import HashCache, build_tree, changed_days, diff_trees, load_tree, save_tree
+
+VALUES = ("daily_value.npy",)
+
+
+def test_equal_content_gives_equal_hashes(make_cohort):
+    """Test that root hashes depend on content only and change with it."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        a = make_cohort(Path(tmp_dir) / "a", weights=(80, 81))
+        b = make_cohort(Path(tmp_dir) / "b", weights=(80, 81))
+        assert build_tree(a, value_patterns=VALUES).hash == build_tree(b, value_patterns=VALUES).hash
+
+        (b / "IP76" / "20251202" / "daily_value.npy").write_bytes(b"changed")
+        tree_a, tree_b = build_tree(a, value_patterns=VALUES), build_tree(b, value_patterns=VALUES)
+        assert tree_a.hash != tree_b.hash
+        assert tree_a.children["IP75"].hash == tree_b.children["IP75"].hash
+
+
+def test_only_expdetails_and_value_files_are_hashed(make_cohort):
+    """Test that other files in day folders, such as imaging data, are never read."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", weights=(80, 81))
+        old = build_tree(base, value_patterns=("*.npy",))
+        (base / "IP75" / "20251201" / "movie.tif").write_bytes(b"frames")
+
+        cache = HashCache()
+        new = build_tree(base, cache, value_patterns=("*.npy",))
+        assert new.hash == old.hash
+        assert cache.hashed == 8
+        assert sorted(new.children["IP75"].children["20251201"].children) == [
+            "IP75_20251201_ExpDetails.txt", "daily_value.npy"
+        ]
+        assert len(build_tree(base).children["IP75"].children["20251201"].children) == 1
+
+
+def test_diff_descends_only_into_changed_subtrees(make_cohort):
+    """Test the reported changes and that equal subtrees are not visited."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir), weights=(80, 81))
+        old = build_tree(base)
+
+        (base / "IP75" / "20251202" / "IP75_20251202_ExpDetails.txt").write_text("BW: 70% 19.0g")
+        new_day = base / "IP76" / "20251203"
+        new_day.mkdir()
+        (new_day / "IP76_20251203_ExpDetails.txt").write_text("BW: 82% 21.0g")
+        new = build_tree(base)
+
+        assert diff_trees(old, new) == [
+            ("changed", ("IP75", "20251202", "IP75_20251202_ExpDetails.txt")),
+            ("added", ("IP76", "20251203")),
+        ]
+        assert changed_days(old, new) == [("IP75", "20251202"), ("IP76", "20251203")]
+
+        # Unchanged animals are compared by their hash alone
+        del old.children["IP75"].children["20251201"].children
+        assert diff_trees(old, new)[0][1][0] == "IP75"
+        assert diff_trees(old, old) == []
+
+
+def test_copy_with_old_mtime_is_detected(make_cohort):
+    """Test that a rewrite keeping size and mtime is still seen as a change."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", weights=(80, 81))
+        cache = HashCache(Path(tmp_dir) / "hashes.json")
+        old = build_tree(base, cache, value_patterns=VALUES)
+        assert cache.hashed == 8
+
+        target = base / "IP75" / "20251201" / "IP75_20251201_ExpDetails.txt"
+        st = target.stat()
+        replacement = Path(tmp_dir) / "copy.txt"
+        replacement.write_text("BW: 99% 21.2g")  # same size as before
+        os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(replacement, target)
+
+        new = build_tree(base, cache, value_patterns=VALUES)
+        assert changed_days(old, new) == [("IP75", "20251201")]
+        assert cache.hashed == 9 and cache.reused == 7
+
+
+def test_cache_and_tree_persist(make_cohort):
+    """Test that hashes and trees survive a round trip to disk."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", weights=(80, 81))
+        cache = HashCache(Path(tmp_dir) / "hashes.json")
+        tree = build_tree(base, cache, value_patterns=VALUES)
+        cache.save()
+        save_tree(tree, Path(tmp_dir) / "tree.json")
+
+        reloaded = HashCache(Path(tmp_dir) / "hashes.json")
+        assert build_tree(base, reloaded, value_patterns=VALUES).hash == tree.hash
+        assert reloaded.hashed == 0 and reloaded.reused == 8
+        assert load_tree(Path(tmp_dir) / "tree.json").hash == tree.hash
+        assert load_tree(Path(tmp_dir) / "missing.json") is None
@@ -0,0 +1,36 @@
+import numpy as np
+
+from external_values import detect_outliers, detect_outliers_rolling, rolling_scores
+from plotter import compute_external_stats
+
+
+def test_rolling_outliers_follow_drifting_baseline():
+    """Test that rolling detection flags spikes but not a steadily drifting weight."""
+    days = np.arange(120)
+    weights = 100.0 - 0.25 * days + np.tile([0.3, -0.2, 0.1, -0.3, 0.2, 0.0], 20)
+    weights[60] += 6.0
+    external_values = np.tile([1.0, 1.2, 0.9, 1.1], 30)
+
+    _, global_out = detect_outliers(external_values, weights, z_thresh=1.5)
+    _, rolling_out = detect_outliers_rolling(external_values, weights, z_thresh=3.0)
+
+    assert global_out[0] and global_out[-1]  # ends flagged only for being far from the mean
+    assert np.flatnonzero(rolling_out).tolist() == [60]
+    assert rolling_scores([1.0, 1.0, 1.0, 5.0, 1.0])[3] == np.inf
+    assert np.isnan(rolling_scores([1.0, np.nan, 2.0, 3.0])[1])
+
+
+def test_stats_with_rolling_outliers_use_date_order():
+    """Test that rolling scores in the plot stats are computed in date order."""
+    # In date order the weight falls by 1 per day, with a spike on 2025-12-05
+    in_date_order = np.array([100.0, 99.0, 98.0, 97.0, 110.0, 95.0, 94.0, 93.0, 92.0])
+    shuffle = np.array([4, 0, 8, 2, 6, 1, 7, 3, 5])
+    weights = in_date_order[shuffle]
+    dates = np.datetime64("2025-12-01") + shuffle
+    external_values = np.linspace(1.0, 2.0, 9)
+
+    stats = compute_external_stats(weights, external_values, mark_outliers=True,
+                                   outlier_method="rolling", window=5, dates=dates, cache=None)
+
+    assert np.flatnonzero(stats["out_mask"]).tolist() == [0]
+    assert stats["zy"][0] > 3
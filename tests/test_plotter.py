@@ -0,0 +1,125 @@
+import gc
+import io
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from plotter import (
+    ExternalPlot,
+    compute_external_stats,
+    draw_weight_vs_external,
+    external_figure,
+    weights_figure,
+)
+
+
+def test_stats_ignore_failed_days():
+    """Test that NaN placeholders of failed days are left out of the stats."""
+    weights = np.array([80.0, np.nan, 82.0, 83.5, 85.0])
+    external_values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+
+    stats = compute_external_stats(weights, external_values, mark_outliers=True, cache=None)
+
+    assert not stats["in_mask"][1] and not stats["out_mask"][1]
+    assert stats["in_mask"].sum() == 4
+    assert np.isfinite(stats["r"])
+
+
+def test_point_inspector_nearest_point():
+    """Test looking up points by display position through the KD-tree."""
+    weights = np.array([80.0, 81.5, 82.0, 83.5, 120.0])
+    external_values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    dates = np.array(["2025-12-01", "2025-12-02", "2025-12-03", "2025-12-04", "2025-12-05"], dtype="datetime64[D]")
+    selected = []
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    draw_weight_vs_external(ax, weights, external_values, mark_outliers=True, z_thresh=1.9,
+                            dates=dates, inspect=True, on_select=selected.append)
+    fig.canvas.draw()
+    inspector = fig._point_inspectors[0]
+
+    x_pix, y_pix = ax.transData.transform((5.0, 120.0))
+    assert inspector.nearest(x_pix, y_pix) == 4
+    assert inspector.nearest(x_pix + 100, y_pix + 100) is None
+
+    text = inspector.describe(4)
+    assert "2025-12-05" in text and "Outlier" in text
+
+    # Zooming moves points on screen, so the tree must follow the new limits
+    ax.set_xlim(4.5, 5.5)
+    x_pix, y_pix = ax.transData.transform((5.0, 120.0))
+    assert inspector.nearest(x_pix, y_pix) == 4
+
+    class Click:
+        inaxes = ax
+        x, y = x_pix, y_pix
+
+    inspector._on_click(Click)
+    assert selected == [4]
+
+
+def test_threshold_updates_plot_in_place():
+    """Test that a new threshold re-marks outliers without redrawing the artists."""
+    weights = np.array([80.0, 81.5, 82.0, 83.5, 120.0])
+    external_values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    plot = ExternalPlot(ax, weights, external_values, show_regression=True,
+                        mark_outliers=True, z_thresh=1.9)
+    inliers, outliers, line = plot.inliers, plot.outliers, plot.line
+    assert len(outliers.get_offsets()) == 1
+    slope_without_outlier = plot.stats["slope"]
+
+    stats = plot.set_threshold(5.0)
+
+    assert (plot.inliers, plot.outliers, plot.line) == (inliers, outliers, line)
+    assert len(outliers.get_offsets()) == 0 and len(inliers.get_offsets()) == 5
+    assert stats["slope"] != slope_without_outlier
+    assert np.allclose(line.get_ydata()[0], stats["slope"] * 1.0 + stats["intercept"])
+    assert plot.text.get_text() == stats["text"]
+
+
+def test_figure_api_does_not_use_pyplot():
+    """Test that the figure builders return Figures unknown to pyplot."""
+    weights = np.array([80.0, 81.5, 82.0, 83.5, 120.0])
+    external_values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    open_figures = plt.get_fignums()
+
+    fig, stats = external_figure(weights, external_values, mark_outliers=True, z_thresh=1.9)
+    assert stats["out_mask"][4]
+    assert len(fig.axes) == 1
+
+    fig = weights_figure(weights, np.arange("2025-12-01", "2025-12-06", dtype="datetime64[D]"))
+    assert plt.get_fignums() == open_figures
+
+    # Drawing into a given Axes reuses its figure
+    fig2, stats2 = external_figure(weights, external_values, ax=fig.axes[0])
+    assert fig2 is fig and stats2["r"] is not None
+
+
+def test_figures_render_in_threads_without_leaking():
+    """Test concurrent rendering and that rendered figures are freed."""
+    refs = []
+
+    def render(i):
+        weights = np.random.default_rng(i).normal(80, 2, 30)
+        fig, _ = external_figure(weights, np.arange(30.0), show_regression=True)
+        refs.append(weakref.ref(fig))
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png")
+        return buf.getvalue()[:8]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        headers = list(pool.map(render, range(40)))
+
+    gc.collect()
+    assert headers == [b"\x89PNG\r\n\x1a\n"] * 40
+    assert all(ref() is None for ref in refs)
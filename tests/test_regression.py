@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from scipy.stats import siegelslopes, theilslopes
+
+from plotter import compute_external_stats
+from regression import fit_line, siegel, theil_sen
+
+
+def _line_with_artifacts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    y = 2.0 * x + 1.0 + rng.normal(scale=0.1, size=n)
+    y[: n // 5] += 30.0  # artifact days
+    return x, y
+
+
+def test_small_data_matches_scipy():
+    """Test that small inputs give the exact Theil-Sen and Siegel slopes."""
+    x, y = _line_with_artifacts(60)
+
+    assert theil_sen(x, y)[0] == pytest.approx(theilslopes(y, x)[0])
+    assert siegel(x, y)[0] == pytest.approx(siegelslopes(y, x)[0])
+
+
+def test_robust_fits_ignore_artifacts():
+    """Test that robust slopes stay near the true line while least squares does not."""
+    x, y = _line_with_artifacts(500)
+
+    assert theil_sen(x, y)[0] == pytest.approx(2.0, abs=0.05)
+    assert siegel(x, y)[0] == pytest.approx(2.0, abs=0.05)
+    assert siegel(x, y)[1] == pytest.approx(1.0, abs=0.1)
+    assert abs(fit_line(x, y, "linear")[0] - 2.0) > 0.1
+
+
+def test_large_data_uses_sampling():
+    """Test that pooled data with tens of thousands of points is fitted by sampling."""
+    x, y = _line_with_artifacts(50_000)
+
+    slope, _ = theil_sen(x, y)
+    assert slope == pytest.approx(2.0, abs=0.02)
+    assert theil_sen(x, y) == theil_sen(x, y)  # seeded, so repeatable
+    assert siegel(x, y)[0] == pytest.approx(2.0, abs=0.02)
+
+
+def test_degenerate_input():
+    """Test NaN handling and the error for points that share one x value."""
+    x = np.array([1.0, 2.0, np.nan, 3.0])
+    y = np.array([2.0, 4.0, 5.0, np.nan])
+    assert theil_sen(x, y)[0] == pytest.approx(2.0)
+
+    with pytest.raises(ValueError):
+        theil_sen([1.0, 1.0, 1.0], [1.0, 2.0, 3.0])
+    with pytest.raises(ValueError):
+        fit_line([1.0, 2.0], [1.0, 2.0], "huber")
+
+
+def test_stats_with_robust_regression():
+    """Test that the plot stats use the selected regression method."""
+    x, y = _line_with_artifacts(200)
+
+    stats = compute_external_stats(y, x, show_regression=True, regression="theil_sen", cache=None)
+    assert stats["slope"] == pytest.approx(theil_sen(x, y)[0])
+    assert "Theil-Sen" in stats["text"]
@@ -0,0 +1,83 @@
+import re
+import tempfile
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from cache import default_cache
+from report import load_animal, stats_rows, write_cohort_report
+
+
+def _page_count(path):
+    return len(re.findall(rb"/Type\s*/Page\b", Path(path).read_bytes()))
+
+
+def test_cohort_report_pages(make_cohort):
+    """Test three pages per animal, written by a process pool without pyplot figures."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort")
+        out = Path(tmp_dir) / "report.pdf"
+        open_figures = plt.get_fignums()
+
+        pages = write_cohort_report(base, out, daily_filename="daily_value.npy", max_workers=2)
+
+        assert pages == 6
+        assert out.read_bytes().startswith(b"%PDF")
+        assert _page_count(out) == 6
+        assert plt.get_fignums() == open_figures
+
+
+def test_report_does_not_fill_the_plot_cache(make_cohort):
+    """Test that drawing the report pages leaves the shared plot cache unchanged."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort")
+        default_cache.clear()
+
+        write_cohort_report(base, Path(tmp_dir) / "report.pdf", daily_filename="daily_value.npy", max_workers=1)
+
+        assert len(default_cache) == 0
+
+
+def test_report_without_external_values(make_cohort):
+    """Test a single animal folder without daily values: weight and summary pages only."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", animals=("IP75",))
+        out = Path(tmp_dir) / "IP75.pdf"
+
+        assert write_cohort_report(base / "IP75", out, max_workers=1) == 2
+        assert _page_count(out) == 2
+
+
+def test_stats_rows(make_cohort):
+    """Test the summary table of one animal."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", animals=("IP75",))
+        animal, table, values = load_animal(base / "IP75", "daily_value.npy")
+
+    rows = dict(stats_rows(table))
+    assert animal == "IP75"
+    assert rows["Sessions"] == "3 (0 failed)"
+    assert rows["First session"] == "2025-12-01"
+    assert rows["Latest weight"] == "82.00 %"
+
+    stats = {"out_mask": np.zeros(3, dtype=bool), "r": 1.0, "p": 0.0, "slope": None, "intercept": None}
+    rows = dict(stats_rows(table, values, stats))
+    assert rows["Pearson r"] == "1.000"
+    assert rows["Slope"] == "n/a"
+
+
+def test_missing_files_do_not_stop_the_report(make_cohort):
+    """Test that a missing values file or a broken ExpDetails file gives gaps, not an error."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort")
+        (base / "IP75" / "20251202" / "daily_value.npy").unlink()
+        (base / "IP76" / "20251203" / "IP76_20251203_ExpDetails.txt").write_text("no weight")
+
+        _, table, values = load_animal(base / "IP75", "daily_value.npy")
+        assert np.isnan(values[1]) and values[[0, 2]].tolist() == [0.0, 2.0]
+        _, table, _ = load_animal(base / "IP76")
+        assert dict(stats_rows(table))["Sessions"] == "3 (1 failed)"
+
+        out = Path(tmp_dir) / "report.pdf"
+        assert write_cohort_report(base, out, daily_filename="daily_value.npy", max_workers=2) == 6
@@ -125,6 +125,62 @@ class TestSaveWeights:
             # Should have saved the file
             assert output_file.exists()
     
+    def test_save_selected_weights_reuses_loaded_table(self, gui_app, sample_days):
+        """Test that saving reuses the table that was loaded for plotting."""
+        from sessions import SessionTable
+        gui_app.selected_days = sample_days
+        gui_app.loaded_table = SessionTable.from_day_folders(sample_days, weights=[80.0, 81.5, 82.0])
+        gui_app.loaded_fingerprint = gui_app._expdetails_fingerprint(sample_days)
+        gui_app.save_format.set("csv")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_file = Path(tmpdir) / "weights.csv"
+            
+            with patch('gui.filedialog.asksaveasfilename', return_value=str(output_file)):
+                with patch('gui.messagebox.showinfo'):
+                    with patch('gui.load_weights_for_selected_days') as mock_load:
+                        gui_app.save_selected_weights()
+            
+            mock_load.assert_not_called()
+            lines = output_file.read_text().splitlines()
+            assert lines[0] == "animal,date,weight"
+            assert len(lines) == 4
+    
+    def test_csv_layout_does_not_depend_on_reuse(self, gui_app, sample_days, sample_weights):
+        """Test that freshly loaded weights are written like a reused table."""
+        gui_app.save_format.set("csv")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_file = Path(tmpdir) / "weights.csv"
+
+            with patch('gui.filedialog.asksaveasfilename', return_value=str(output_file)):
+                with patch('gui.messagebox.showinfo'):
+                    gui_app.save_extracted_weights(sample_weights, sample_days)
+
+            lines = output_file.read_text().splitlines()
+            assert lines[0] == "animal,date,weight"
+            assert lines[1].split(",")[1:] == ["2025-01-01", "80.0"]
+
+    def test_save_selected_weights_rereads_changed_files(self, gui_app, sample_days):
+        """Test that a loaded table is not exported once its ExpDetails files changed."""
+        from sessions import SessionTable
+        gui_app.selected_days = sample_days
+        gui_app.loaded_table = SessionTable.from_day_folders(sample_days, weights=[80.0, 81.5, 82.0])
+        gui_app.loaded_fingerprint = gui_app._expdetails_fingerprint(sample_days)
+        (sample_days[0] / "IP75_20250101_ExpDetails.txt").write_text("BW: 79% 20g")
+        gui_app.save_format.set("csv")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_file = Path(tmpdir) / "weights.csv"
+
+            with patch('gui.filedialog.asksaveasfilename', return_value=str(output_file)):
+                with patch('gui.messagebox.showinfo'):
+                    with patch('gui.load_weights_for_selected_days', return_value=[79.0, 81.5, 82.0]) as mock_load:
+                        gui_app.save_selected_weights()
+
+            mock_load.assert_called_once()
+            assert output_file.read_text().splitlines()[1].endswith(",79.0")
+
     def test_save_with_different_weight_values(self, gui_app, sample_days):
         """Test saving with various weight values."""
         weights = np.array([75.5, 80.0, 85.5, 90.0, 78.3])
@@ -201,6 +257,23 @@ class TestSaveWeights:
             
             assert np.allclose(mat_data["weights"].flatten(), npy_data["weights"])
     
+    def test_save_session_table(self, gui_app):
+        """Test saving a SessionTable without a separate list of days."""
+        from sessions import SessionTable
+        table = SessionTable(["2025-01-01", "2025-01-02"], [80.0, 81.5])
+        gui_app.save_format.set("mat")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_file = Path(tmpdir) / "weights.mat"
+            
+            with patch('gui.filedialog.asksaveasfilename', return_value=str(output_file)):
+                with patch('gui.messagebox.showinfo'):
+                    gui_app.save_extracted_weights(table)
+            
+            loaded_data = loadmat(str(output_file))
+            assert np.allclose(loaded_data["weights"].flatten(), [80.0, 81.5])
+            assert list(np.asarray(loaded_data["dates"]).flatten()) == ["20250101", "20250102"]
+    
     def test_save_error_handling(self, gui_app, sample_days, sample_weights):
         """Test error handling during save."""
         gui_app.selected_days = sample_days
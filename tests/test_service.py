@@ -0,0 +1,97 @@
+import tempfile
+import urllib.error
+import urllib.request
+from pathlib import Path
+import numpy as np
+import pytest
+from service import start_server, ServiceClient, ServiceError, open_remote_table
+
+
+@pytest.fixture
+def cohort():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        for animal in ("IP75", "IP76"):
+            for i, date in enumerate(["20251201", "20251202", "20251203"]):
+                day = base / animal / date
+                day.mkdir(parents=True)
+                (day / f"{animal}_{date}_ExpDetails.txt").write_text(f"BW: {80 + i}% 21.2g")
+                np.save(day / "daily_value.npy", np.array([float(i)]))
+        yield base
+
+
+@pytest.fixture
+def server(cohort):
+    server = start_server(cohort, port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url_of(server):
+    host, port = server.server_address
+    return f"http://{host}:{port}"
+
+
+def test_list_animals_and_table(server):
+    """Test reading animals and a weight table from the service."""
+    client = ServiceClient(url_of(server))
+
+    assert client.animals() == ["IP75", "IP76"]
+    table = client.table("IP76")
+    assert np.allclose(table.weights, [80.0, 81.0, 82.0])
+    assert str(table.dates[0]) == "2025-12-01"
+    assert table.day_folders[0].name == "20251201"
+
+
+def test_etag_not_modified(server):
+    """Test that a matching If-None-Match header returns 304."""
+    url = url_of(server) + "/animals/IP75/weights"
+    with urllib.request.urlopen(url) as response:
+        etag = response.headers["ETag"]
+
+    request = urllib.request.Request(url, headers={"If-None-Match": etag})
+    with pytest.raises(urllib.error.HTTPError) as info:
+        urllib.request.urlopen(request)
+    assert info.value.code == 304
+
+    # The client transparently reuses its cached body
+    client = ServiceClient(url_of(server))
+    assert client.table("IP75").weights[0] == client.table("IP75").weights[0] == 80.0
+
+
+def test_npy_responses(server):
+    """Test the binary npy responses for weights and daily values."""
+    client = ServiceClient(url_of(server))
+
+    records = client.records("IP75")
+    assert records.dtype.names == ("date", "weight")
+    assert np.allclose(records["weight"], [80.0, 81.0, 82.0])
+    assert np.allclose(client.daily_values("IP75", "daily_value.npy"), [0.0, 1.0, 2.0])
+
+
+def test_unknown_animal_raises(server):
+    """Test that unknown animals give a ServiceError with the message."""
+    with pytest.raises(ServiceError, match="Unknown animal"):
+        ServiceClient(url_of(server)).table("IP99")
+
+
+def test_open_remote_table(server):
+    """Test loading a table from a GUI-style service URL."""
+    table = open_remote_table(url_of(server) + "/IP75")
+    assert len(table) == 3
+
+
+def test_paths_outside_the_folder_are_rejected(server):
+    """Test that encoded '..' and separators in file names never reach the loaders."""
+    for path in (
+        "/animals/IP75/values/..%2F..%2F..%2Fsecret.npy",
+        "/animals/IP75/values/%2E%2E",
+        "/animals/..%2FIP75/weights",
+    ):
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(url_of(server) + path)
+        assert e.value.code == 400
+
+    with pytest.raises(ServiceError, match="400"):
+        ServiceClient(url_of(server)).daily_values("IP75", "../x.pkl")
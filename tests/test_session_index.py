@@ -0,0 +1,85 @@
+import tempfile
+from datetime import date
+from pathlib import Path
+from weight_parser import parse_expdetails
+from session_index import SessionIndex, parse_query
+
+
+def test_parse_expdetails_fields(make_days):
+    """Test that header fields are parsed into a record."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        day, = make_days(Path(tmp_dir), [83], fields=[{"Frame rate": 30.0}], values_file=None)
+        record = parse_expdetails(next(day.iterdir()))
+
+        assert record["animal"] == "IP75"
+        assert record["date"] == "20251201"
+        assert record["weight"] == 83.0
+        assert record["grams"] == 21.2
+        assert record["fields"]["frame_rate"] == ("30.0", 30.0)
+
+
+def test_query_by_weight_and_field(make_days):
+    """Test combining a weight bound with a header field condition."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        rates = [{"Frame rate": 30.0}, {"Frame rate": 30.0}, {"Frame rate": 15.0}]
+        days = make_days(base, [83, 78, 75], fields=rates, values_file=None)
+
+        with SessionIndex(base / "index.sqlite") as index:
+            assert index.update(days) == 3
+            rows = index.query(where=[("frame_rate", "=", 30), ("weight", "<", 80)])
+            assert index.query(where=[("BW", "<", 80)]) == index.query(max_weight=79.9)
+
+        assert [Path(r["day_path"]).name for r in rows] == ["20251202"]
+
+
+def test_update_skips_unchanged_files(make_days):
+    """Test that unchanged sessions are not parsed again."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        days = make_days(base, [83], values_file=None)
+
+        with SessionIndex(base / "index.sqlite") as index:
+            assert index.update(days) == 1
+            assert index.update(days) == 0
+
+        # The index persists between connections
+        with SessionIndex(base / "index.sqlite") as index:
+            assert len(index.query(animal="IP75")) == 1
+
+
+def test_parse_query():
+    """Test parsing a filter string into query arguments."""
+    query = parse_query("frame_rate = 30, BW < 80%, last_days = 30", today=date(2025, 12, 31))
+
+    assert query["start"] == date(2025, 12, 1)
+    assert ("frame_rate", "=", 30.0) in query["where"]
+    assert ("weight", "<", 80.0) in query["where"]
+
+
+def test_parse_query_invalid_term_raises():
+    """Test that a term without an operator raises ValueError."""
+    try:
+        parse_query("frame_rate 30")
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "Invalid filter term" in str(e)
+
+
+def test_update_skips_bad_days(make_days):
+    """Test that a missing or BW-less ExpDetails file, or a folder not named by
+    a date, does not stop indexing the other days."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        names = ["20251201", "20251202", "20251203", "20251204", "notes"]
+        days = make_days(base, [83, 78, None, 75, 75], names=names, values_file=None)
+
+        with SessionIndex(base / "index.sqlite") as index:
+            index.update(days)
+            next(days[1].iterdir()).write_text("IP75\n20251202\nno weight\n")
+
+            assert index.update(days) == 0
+            assert [d.name for d, _ in index.failed] == ["20251202", "20251203", "notes"]
+            rows = index.query(animal="IP75")
+
+        assert [Path(r["day_path"]).name for r in rows] == ["20251201", "20251204"]
@@ -0,0 +1,108 @@
+import tempfile
+from pathlib import Path
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from sessions import SessionTable, SessionRecord, folder_dates, resample_series
+from data_loader import load_weights_for_selected_days
+from plotter import draw_weights_vs_days, compute_external_stats
+
+
+def test_folder_dates():
+    """Test converting folder names to datetime64 dates."""
+    dates = folder_dates([Path("20251201"), Path("20251231")])
+    assert dates.dtype == np.dtype("datetime64[D]")
+    assert (dates[1] - dates[0]).astype(int) == 30
+
+
+def test_from_day_folders(make_days):
+    """Test building a table from day folders."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        days = make_days(Path(tmp_dir) / "IP75", [83, 81.5, 80])
+        table = SessionTable.from_day_folders(days, dtype=np.float32)
+
+        assert len(table) == 3
+        assert table.weights.dtype == np.float32
+        assert table.animal_names == ("IP75",)
+        assert list(table.date_labels()) == ["20251201", "20251202", "20251203"]
+
+        record = table[1]
+        assert isinstance(record, SessionRecord)
+        assert record.weight == 81.5
+        assert record.day_folder == days[1]
+
+
+def test_concat_interns_animal_ids():
+    """Test that stacking tables shares one entry per animal."""
+    a = SessionTable(["2025-12-01", "2025-12-02"], [80.0, 81.0], animal_names=("IP75",))
+    b = SessionTable(["2025-12-01"], [90.0], animal_names=("IP76",))
+    c = SessionTable(["2025-12-03"], [82.0], animal_names=("IP75",))
+
+    table = SessionTable.concat([a, b, c])
+
+    assert table.animal_names == ("IP75", "IP76")
+    assert list(table.animal_codes) == [0, 0, 1, 0]
+    assert np.allclose(table.for_animal("IP75").weights, [80.0, 81.0, 82.0])
+    assert table.animals[0] is table.animals[3]
+
+
+def test_table_accepted_by_loader_and_plotter(make_days):
+    """Test that loaders and plotting functions accept a table directly."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        days = make_days(Path(tmp_dir) / "IP75", [83, 81.5, 80])
+        table = SessionTable.from_day_folders(days)
+
+        assert load_weights_for_selected_days(table) == [83.0, 81.5, 80.0]
+
+        fig = Figure()
+        draw_weights_vs_days(fig.add_subplot(), table)
+        stats = compute_external_stats(table, [1.0, 2.0, 3.0], cache=None)
+        assert stats["r"] < 0
+
+
+def test_to_dict_export_layout():
+    """Test the export layout of a table."""
+    table = SessionTable(["2025-12-01", "2025-12-02"], [80.0, 81.0])
+    data = table.to_dict()
+
+    assert list(data["dates"]) == ["20251201", "20251202"]
+    assert np.allclose(data["weights"], [80.0, 81.0])
+
+
+def test_resample_by_week_and_month():
+    """Test weekly and monthly summaries per animal, ignoring failed (NaN) days."""
+    table = SessionTable(
+        ["2025-12-01", "2025-12-03", "2025-12-08", "2025-12-31", "2026-01-02", "2025-12-02"],
+        [80.0, 82.0, np.nan, 84.0, 85.0, 90.0],
+        [0, 0, 0, 0, 0, 1],
+        ("IP75", "IP76"),
+    )
+
+    weekly = table.resample("week", "mean")
+    assert weekly.date_labels().tolist() == ["20251201", "20251208", "20251229", "20251201"]
+    assert np.array_equal(weekly.weights, [81.0, np.nan, 84.5, 90.0], equal_nan=True)
+    assert weekly.animals.tolist() == ["IP75", "IP75", "IP75", "IP76"]
+
+    assert table.resample("week", "count").weights.tolist() == [2.0, 0.0, 2.0, 1.0]
+    monthly_last = table.resample("month", "last")
+    assert monthly_last.date_labels().tolist() == ["20251201", "20260101", "20251201"]
+    assert monthly_last.weights.tolist() == [84.0, 85.0, 90.0]
+    assert table.resample("month", "min").weights.tolist() == [80.0, 85.0, 90.0]
+
+
+def test_resample_series_sorts_unordered_dates():
+    """Test that input order does not matter and unknown options raise."""
+    dates = np.array(["2025-12-10", "2025-12-01", "2025-12-09"], dtype="datetime64[D]")
+    _, starts, last = resample_series(dates, [3.0, 1.0, 2.0], "week", "last")
+
+    assert starts.astype(str).tolist() == ["2025-12-01", "2025-12-08"]
+    assert last.tolist() == [1.0, 3.0]
+
+    for period, how in (("year", "mean"), ("week", "median")):
+        try:
+            resample_series(dates, [1.0, 2.0, 3.0], period, how)
+        except ValueError:
+            pass
+        else:
+            assert False, f"{period}/{how} should be rejected"
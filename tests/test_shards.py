@@ -0,0 +1,140 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+from exporters import export_cohort
+from shards import (
+    claim_shard,
+    merge_results,
+    run_worker,
+    shard_status,
+    work_dir,
+    write_manifest,
+)
+
+SHARDS_SCRIPT = Path(__file__).parent.parent / "shards.py"
+WEIGHTS = [80 + i * 0.5 for i in range(12)]
+
+
+def test_workers_in_separate_processes(make_cohort):
+    """Test that several worker processes split the shards and the merge equals a direct export."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", weights=WEIGHTS)
+        manifest_path = Path(tmp_dir) / "manifest.json"
+        manifest = write_manifest(base, manifest_path, shard_size=5, daily_filename="daily_value.npy")
+        assert len(manifest["days"]) == 24
+
+        workers = [
+            subprocess.Popen(
+                [sys.executable, str(SHARDS_SCRIPT), "work", str(manifest_path), "--worker-id", f"w{i}"],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for i in range(3)
+        ]
+        processed = [int(w.communicate(timeout=120)[0].split()[1]) for w in workers]
+        assert all(w.returncode == 0 for w in workers)
+        assert sum(processed) == 5
+        assert shard_status(manifest_path) == {"done": 5, "claimed": 0, "pending": 0}
+
+        merged = Path(tmp_dir) / "merged.tsv"
+        direct = Path(tmp_dir) / "direct.tsv"
+        assert merge_results(manifest_path, merged) == (24, [])
+        export_cohort(base, direct, daily_filename="daily_value.npy")
+        assert merged.read_bytes() == direct.read_bytes()
+
+        first = merged.read_bytes()
+        merge_results(manifest_path, merged)
+        assert merged.read_bytes() == first
+
+
+def test_merge_requires_all_shards(make_cohort):
+    """Test that merging before every shard is done fails and leaves no output."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", animals=("IP75",), weights=WEIGHTS[:4])
+        manifest_path = Path(tmp_dir) / "manifest.json"
+        manifest = write_manifest(base, manifest_path, shard_size=2)
+        work = work_dir(manifest_path, manifest)
+        (work / "claims").mkdir(parents=True)
+
+        assert claim_shard(work, 0, "other")
+        assert not claim_shard(work, 0, "me")
+        assert run_worker(manifest_path) == [1]
+        assert shard_status(manifest_path) == {"done": 1, "claimed": 1, "pending": 0}
+
+        with pytest.raises(ValueError):
+            merge_results(manifest_path, Path(tmp_dir) / "merged.csv")
+        assert not (Path(tmp_dir) / "merged.csv").exists()
+
+
+def test_stale_claims_are_taken_over(make_cohort):
+    """Test that a claim left by a dead worker is reclaimed after the timeout."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = make_cohort(Path(tmp_dir) / "cohort", animals=("IP75",), weights=WEIGHTS[:2])
+        manifest_path = Path(tmp_dir) / "manifest.json"
+        manifest = write_manifest(base, manifest_path)
+        work = work_dir(manifest_path, manifest)
+        (work / "claims").mkdir(parents=True)
+        assert claim_shard(work, 0, "dead")
+        old = time.time() - 3600
+        os.utime(work / "claims" / "shard-00000.claim", (old, old))
+
+        assert run_worker(manifest_path, reclaim_after=600) == [0]
+        assert merge_results(manifest_path, Path(tmp_dir) / "merged.csv")[0] == 2
+
+
+def test_manifest_of_several_labs_and_failed_days(make_cohort):
+    """Test prefixed animal names, failed weights and values, and rewritten manifests."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lab_a = make_cohort(Path(tmp_dir) / "labA", animals=("IP75",), weights=WEIGHTS[:2])
+        lab_b = make_cohort(Path(tmp_dir) / "labB", animals=("IP75",), weights=WEIGHTS[:2])
+        bad = lab_b / "IP75" / "20251202" / "IP75_20251202_ExpDetails.txt"
+        bad.write_text("no weight here")
+        manifest_path = Path(tmp_dir) / "manifest.json"
+
+        manifest = write_manifest([lab_a, lab_b], manifest_path, shard_size=3)
+        assert [animal for animal, _ in manifest["days"]] == ["labA/IP75"] * 2 + ["labB/IP75"] * 2
+        assert run_worker(manifest_path) == [0, 1]
+
+        count, errors = merge_results(manifest_path, Path(tmp_dir) / "merged.csv")
+        assert count == 4
+        assert len(errors) == 1 and "BW not found" in errors[0][1]
+        rows = (Path(tmp_dir) / "merged.csv").read_text().splitlines()
+        assert rows[-1] == "labB/IP75,2025-12-02,nan"
+
+        (lab_a / "IP75" / "20251201" / "daily_value.npy").unlink()
+        values_manifest = Path(tmp_dir) / "values.json"
+        write_manifest([lab_a, lab_b], values_manifest, daily_filename="daily_value.npy")
+        assert run_worker(values_manifest) == [0]
+        count, errors = merge_results(values_manifest, Path(tmp_dir) / "values.csv")
+        assert count == 4 and len(errors) == 2
+        rows = (Path(tmp_dir) / "values.csv").read_text().splitlines()
+        assert rows[1] == "labA/IP75,2025-12-01,80.0,nan"
+
+        write_manifest([lab_a, lab_b], manifest_path, shard_size=3)
+        assert run_worker(manifest_path) == []
+        write_manifest([lab_a, lab_b], manifest_path, shard_size=2)
+        assert run_worker(manifest_path) == [0, 1]
+
+
+def test_roots_with_the_same_folder_name(make_cohort):
+    """Test that cohorts named alike are told apart by their parent folder and
+    that a cohort listed twice is rejected."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        a = make_cohort(Path(tmp_dir) / "labA" / "cohort", animals=("IP75",), weights=WEIGHTS[:1])
+        b = make_cohort(Path(tmp_dir) / "labB" / "cohort", animals=("IP75",), weights=WEIGHTS[:1])
+        c = make_cohort(Path(tmp_dir) / "other", animals=("IP75",), weights=WEIGHTS[:1])
+        manifest_path = Path(tmp_dir) / "manifest.json"
+
+        manifest = write_manifest([a, b, c], manifest_path)
+        assert [animal for animal, _ in manifest["days"]] == [
+            "labA/cohort/IP75", "labB/cohort/IP75", "other/IP75"
+        ]
+
+        with pytest.raises(ValueError, match="more than once"):
+            write_manifest([a, c, a], manifest_path)
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+from cache import file_fingerprint
+from data_loader import load_weights_tolerant
+from sessions import SessionTable
+from snapshot import SessionSnapshot
+
+
+def saved_snapshot(base, days, path):
+    snapshot = SessionSnapshot(str(base), days, {"mark_outliers": True})
+    snapshot.record_table(SessionTable.from_day_folders(days))
+    files = [d / "daily_value.npy" for d in days]
+    snapshot.record_external("daily_values:None:None", file_fingerprint(files), [0.0, 1.0, 2.0])
+    snapshot.save(path)
+    return SessionSnapshot.load(path)
+
+
+def saved_snapshot_tolerant(base, days, path):
+    weights, _ = load_weights_tolerant(days)
+    snapshot = SessionSnapshot(str(base), days)
+    snapshot.record_table(SessionTable.from_day_folders(days, weights=weights))
+    snapshot.save(path)
+    return SessionSnapshot.load(path)
+
+
+def test_snapshot_round_trip_restores_without_parsing(make_days):
+    """Test that a saved snapshot restores days, settings and weights."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir) / "IP75"
+        days = make_days(base, [80.0, 81.5, 82.0])
+        restored = saved_snapshot(base, days, Path(tmp_dir) / "session.json")
+
+        assert restored.base_path == str(base)
+        assert restored.days == days
+        assert restored.settings == {"mark_outliers": True}
+
+        # table() only uses the recorded values, even if the files are gone
+        for day in days:
+            for f in day.iterdir():
+                f.unlink()
+        assert restored.table().weights.tolist() == [80.0, 81.5, 82.0]
+
+
+def test_verify_rereads_only_changed_days(make_days):
+    """Test that verification re-parses changed files and keeps the rest."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir) / "IP75"
+        days = make_days(base, [80.0, 81.5, 82.0])
+        restored = saved_snapshot(base, days, Path(tmp_dir) / "session.json")
+
+        changed = days[1] / "IP75_20251202_ExpDetails.txt"
+        changed.write_text("BW: 79.0% 20.9g")
+        st = changed.stat()
+        os.utime(changed, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        table, fingerprint, refreshed = restored.verify()
+
+        assert refreshed == [days[1]]
+        assert table.weights.tolist() == [80.0, 79.0, 82.0]
+        assert fingerprint == file_fingerprint([d / f"IP75_{d.name}_ExpDetails.txt" for d in days])
+
+
+def test_verify_keeps_going_past_bad_days(make_days):
+    """Test that a day without BW or without its file gives NaN instead of failing the restore."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir) / "IP75"
+        days = make_days(base, [80.0, 81.5, 82.0])
+        (days[0] / "IP75_20251201_ExpDetails.txt").write_text("no weight here")
+        restored = saved_snapshot_tolerant(base, days, Path(tmp_dir) / "session.json")
+        (days[2] / "IP75_20251203_ExpDetails.txt").unlink()
+
+        table, fingerprint, refreshed = restored.verify()
+
+        assert refreshed == []  # the day without BW is unchanged, so not re-parsed
+        assert np.isnan(table.weights[0]) and np.isnan(table.weights[2])
+        assert table.weights[1] == 81.5
+        assert len(fingerprint) == 2
+
+
+def test_changed_external_values_are_dropped(make_days):
+    """Test that external values are only reused while their files are unchanged."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir) / "IP75"
+        days = make_days(base, [80.0, 81.5, 82.0])
+        path = Path(tmp_dir) / "session.json"
+
+        restored = saved_snapshot(base, days, path)
+        assert restored.verified_external()["daily_values:None:None"][1] == [0.0, 1.0, 2.0]
+
+        np.save(days[0] / "daily_value.npy", np.array([5.0, 6.0]))
+        restored = SessionSnapshot.load(path)
+        assert restored.verified_external() == {}
+        assert restored.external == {}
+
+
+def test_missing_or_corrupt_snapshot():
+    """Test that unusable snapshot files are ignored."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "session.json"
+        assert SessionSnapshot.load(path) is None
+
+        path.write_text("{not json")
+        assert SessionSnapshot.load(path) is None
@@ -1,5 +1,8 @@
+import math
 import tempfile
+from pathlib import Path
 from weight_parser import extract_weight
+from data_loader import load_weights_tolerant, LoadReport
 
 def write_tmp(content):
     f = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".txt")
@@ -62,3 +65,48 @@ def test_large_weight_value():
     """Test extraction of weights greater than 100."""
     path = write_tmp("BW: 125.8%")
     assert extract_weight(path) == 125.8
+
+
+def test_tolerant_loading_reports_failures(make_days):
+    """Test that failing days become NaN and are listed in the report."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        days = make_days(Path(tmp_dir), ["BW: 83%", None, "No weight here", "BW: 80%"])
+
+        weights, report = load_weights_tolerant(days)
+
+        assert weights[0] == 83.0 and weights[3] == 80.0
+        assert math.isnan(weights[1]) and math.isnan(weights[2])
+        assert [e.kind for e in report.errors] == [LoadReport.MISSING_FILE, LoadReport.NO_BW]
+        assert report.failed_days == [days[1], days[2]]
+
+
+def test_tolerant_loading_reports_undecodable_files_as_unreadable(make_days):
+    """Test that a file that is not valid text is 'unreadable', not missing its BW."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        days = make_days(Path(tmp_dir), ["BW: 83%", None])
+        (days[1] / "IP75_20251202_ExpDetails.txt").write_bytes(b"\xff\xfeB\x00W\x00\x81\x8d")
+
+        weights, report = load_weights_tolerant(days)
+
+        assert weights[0] == 83.0 and math.isnan(weights[1])
+        assert [e.kind for e in report.errors] == [LoadReport.UNREADABLE]
+
+
+def test_tolerant_loading_resumes_from_checkpoint(make_days):
+    """Test that a rerun only re-parses failed or changed days."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(tmp_dir)
+        days = make_days(base, ["BW: 83%", "BW: 81%", "No weight here"])
+        checkpoint = base / "checkpoint.json"
+
+        _, report = load_weights_tolerant(days, checkpoint_path=checkpoint)
+        assert report.parsed == 2 and len(report.errors) == 1
+
+        # Fix the broken day and rerun
+        next(days[2].iterdir()).write_text("BW: 79%")
+        weights, report = load_weights_tolerant(days, checkpoint_path=checkpoint)
+
+        assert report.ok
+        assert report.reused == 2
+        assert report.parsed == 1
+        assert weights == [83.0, 81.0, 79.0]
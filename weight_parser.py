@@ -1,13 +1,94 @@
 import re
 
-def extract_weight(txt_path):
-    # Matches integers or decimals before % (case-insensitive)
-    pattern = re.compile(r"BW.*?(\d+(?:\.\d+)?)\s*%", re.IGNORECASE)
+# Matches integers or decimals before % (case-insensitive)
+BW_PATTERN = re.compile(r"BW.*?(\d+(?:\.\d+)?)\s*%", re.IGNORECASE)
+GRAMS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*g\b", re.IGNORECASE)
+FIELD_PATTERN = re.compile(r"^\s*([A-Za-z][\w ()/.-]*?)\s*:\s*(.+?)\s*$")
+NUMBER_PATTERN = re.compile(r"[-+]?\d+(?:\.\d+)?")
+DATE_LINE_PATTERN = re.compile(r"^\s*(\d{8})\s*$")
+
+
+def _open_text(txt_path):
+    # Members of zip/tar archives (ArchivePath) provide their own open()
+    if hasattr(txt_path, "read_bytes"):
+        return txt_path.open("r")
+    return open(txt_path, "r")
 
-    with open(txt_path, "r") as f:
+
+def extract_weight(txt_path):
+    with _open_text(txt_path) as f:
         for line in f:
-            match = pattern.search(line)
+            match = BW_PATTERN.search(line)
             if match:
                 return float(match.group(1))
 
     raise ValueError(f"BW not found in file: {txt_path}")
+
+
+def field_key(name):
+    """Normalize a header field name, e.g. 'Frame rate' -> 'frame_rate'."""
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def parse_expdetails(txt_path):
+    """Parse the header fields of an ExpDetails file.
+
+    Args:
+        txt_path: Path to an ExpDetails .txt file
+
+    Returns:
+        Dict with 'animal', 'date', 'weight', 'grams' and 'fields', where
+        'fields' maps normalized field names to (text, number) tuples.
+        The number is None when the value does not start with a number.
+    """
+    with _open_text(txt_path) as f:
+        text = f.read()
+    return parse_expdetails_text(text, txt_path)
+
+
+def parse_expdetails_text(text, source="ExpDetails text"):
+    """Parse the header fields of ExpDetails content that is not in a file,
+    e.g. as submitted by the rig software. See parse_expdetails.
+
+    Args:
+        text: Contents of an ExpDetails file
+        source: Name used in error messages
+    """
+    lines = text.splitlines()
+
+    record = {"animal": None, "date": None, "weight": None, "grams": None, "fields": {}}
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        if record["animal"] is None:
+            record["animal"] = stripped.split()[0]
+            continue
+
+        date_match = DATE_LINE_PATTERN.match(stripped)
+        if date_match and record["date"] is None:
+            record["date"] = date_match.group(1)
+            continue
+
+        bw_match = BW_PATTERN.search(stripped)
+        if bw_match and record["weight"] is None:
+            record["weight"] = float(bw_match.group(1))
+            grams_match = GRAMS_PATTERN.search(stripped)
+            if grams_match:
+                record["grams"] = float(grams_match.group(1))
+            continue
+
+        field_match = FIELD_PATTERN.match(stripped)
+        if field_match:
+            key = field_key(field_match.group(1))
+            text = field_match.group(2)
+            number = NUMBER_PATTERN.match(text)
+            if key and key not in record["fields"]:
+                record["fields"][key] = (text, float(number.group()) if number else None)
+
+    if record["weight"] is None:
+        raise ValueError(f"BW not found in file: {source}")
+
+    return record